@@ -6,7 +6,8 @@ import os
 import sys
 import time
 import logging
-from rag.rag import RAGSystem
+import functools
+from rag.rag import RAGSystem, VectorStoreEmptyError
 from dotenv import load_dotenv
 import json
 from blog.blog_extractor import BlogContentExtractor
@@ -18,6 +19,9 @@ from characters.keywords_list_character import KeywordListCharacter
 from characters.refine_query_character import RefineQueryCharacter
 from blog.keywords_finder import KeywordsFinder
 from agent.agent_memory import AgentMemory
+from agent.pipeline import StageGraph
+from agent.context_builder import ContextBuilder
+from metrics import span, observe
 from blog.get_link import BlogLinkFetcher
 
 
@@ -32,7 +36,8 @@ class BlogAgent:
     """
     Agent for generating blog content using LLMs and RAG.
     """
-    def __init__(self, model_name="gpt-4-turbo", rag_system=None, temperature=0.7, session_id=None):
+    def __init__(self, model_name="gpt-4-turbo", rag_system=None, temperature=0.7, session_id=None, llm=None, llm_cache=None, context_builder=None,
+                 ingest_queue=None, ingest_deadline=15):
         """
         Initialize the blog agent.
         
@@ -41,17 +46,33 @@ class BlogAgent:
             rag_system: Optional RAG system instance
             temperature: Temperature for LLM responses
             session_id: Optional session ID for memory persistence
+            llm: Optional already-initialized LLM client to reuse (skips the test call)
+            llm_cache: Optional LLMResponseCache for the helper prompts (the blog itself is never cached)
+            context_builder: Optional ContextBuilder bounding the prompt's RAG, URL and memory tokens
+            ingest_queue: Optional IngestQueue that crawls and ingests in the background
+                instead of in the request
+            ingest_deadline: Seconds a request waits for its ingest job before using what is
+                already indexed
         """
         self.model_name = model_name
         self.temperature = temperature
         self.rag_system = rag_system or RAGSystem()
+        self.llm_cache = llm_cache
+        self.context_builder = context_builder or ContextBuilder()
+        self.ingest_queue = ingest_queue
+        self.ingest_deadline = ingest_deadline
+        self.last_context_report = None
+        self.last_timings = None
         
         # Initialize memory
         self.memory = AgentMemory(session_id=session_id)
         
         # Initialize LLM
-        api_key = os.getenv("OPENAI_API_KEY", "").strip()
-        self._initialize_llm(api_key)
+        if llm is not None:
+            self.llm = llm
+        else:
+            api_key = os.getenv("OPENAI_API_KEY", "").strip()
+            self._initialize_llm(api_key)
         
     def _initialize_llm(self, api_key):
         """Initialize the LLM."""
@@ -91,7 +112,183 @@ class BlogAgent:
         ]
         self.llm = FakeListLLM(responses=responses)
 
+    def _discard_cached(self, prompt):
+        """Forget a cached response that failed validation."""
+        if self.llm_cache is not None:
+            self.llm_cache.discard(self.model_name, self.temperature, prompt)
+
+    async def _apredict(self, prompt, template=None, variable=None):
+        """
+        Run a helper prompt through the LLM, using the response cache if set.
+        
+        Args:
+            prompt: Prompt text
+            template: Name of the template the prompt was rendered from
+            variable: The input filled into the template (e.g. the topic); a cached
+                answer for a similar input of the same template may be reused.
+                If None, only an answer to the exact prompt is reused
+            
+        Returns:
+            str: The LLM response
+        """
+        if self.llm_cache is None:
+            with span("llm.helper"):
+                return await self.llm.apredict(prompt)
+        
+        # The similarity tier embeds the variable input with a blocking call
+        cache_args = (self.model_name, self.temperature, prompt)
+        semantic = self.llm_cache.embeddings is not None and variable is not None
+        if semantic:
+            response = await self._run_blocking(self.llm_cache.get, *cache_args, template=template, variable=variable)
+        else:
+            response = self.llm_cache.get(*cache_args, template=template, variable=variable)
+        if response is not None:
+            return response
+        
+        with span("llm.helper"):
+            response = await self.llm.apredict(prompt)
+        if semantic:
+            await self._run_blocking(self.llm_cache.put, *cache_args, response, template=template, variable=variable)
+        else:
+            self.llm_cache.put(*cache_args, response, template=template, variable=variable)
+        return response
+
     def User_input(self, user_input):
+        """
+        Synchronous wrapper around aUser_input for scripts.
+        
+        Args:
+            user_input: User input string containing blog topic ideas
+            
+        Returns:
+            str: Extracted blog topic from user input
+        """
+        return asyncio.run(self.aUser_input(user_input))
+    
+    def find_relevant_keyword(self, topic, top_related_topics):
+        """
+        Synchronous wrapper around afind_relevant_keyword for scripts.
+        
+        Args:
+            topic: The main blog topic
+            top_related_topics: List of potential topics
+            
+        Returns:
+            tuple: The most relevant keyword and the relevant keywords
+        """
+        return asyncio.run(self.afind_relevant_keyword(topic, top_related_topics))
+
+    def select_relevant_keyword(self, topic, top_related_topics):
+        """
+        Synchronous wrapper around aselect_relevant_keyword for scripts.
+        
+        Args:
+            topic: The main blog topic
+            top_related_topics: List of potential topics
+            
+        Returns:
+            str: The most relevant keyword
+        """
+        return asyncio.run(self.aselect_relevant_keyword(topic, top_related_topics))
+
+    def generate_keyword_list(self, topic, top_related_topics):
+        """
+        Synchronous wrapper around agenerate_keyword_list for scripts.
+        
+        Args:
+            topic: The main blog topic
+            top_related_topics: List of potential topics
+            
+        Returns:
+            str: The relevant keywords
+        """
+        return asyncio.run(self.agenerate_keyword_list(topic, top_related_topics))
+
+    def refine_query(self, topic):
+        """
+        Synchronous wrapper around arefine_query for scripts.
+        
+        Args:
+            topic: The main blog topic
+            
+        Returns:
+            str: The refined search query
+        """
+        return asyncio.run(self.arefine_query(topic))
+
+    def create_system_prompt(self, topic, blogs_urls, keywords, tone, target_audience, crawled_content, refined_query=None):
+        """
+        Synchronous wrapper around acreate_system_prompt for scripts.
+        
+        Args:
+            topic: The main blog topic
+            keywords: The keywords to incorporate
+            crawled_content: Optional crawled content (text or per-page Documents) to add to RAG
+            refined_query: Optional already-refined search query (refined with the LLM if None)
+            
+        Returns:
+            str: A system prompt for the LLM
+        """
+        return asyncio.run(self.acreate_system_prompt(topic, blogs_urls, keywords, tone, target_audience,
+                                                      crawled_content, refined_query=refined_query))
+
+    def _retrieve_chunks(self, query, k=8, fetch_k=30, max_per_domain=2):
+        """
+        Retrieve diverse candidate chunks for the prompt with their relevance.
+        
+        Args:
+            query: The search query
+            k: Number of candidates (the context builder decides how many fit)
+            fetch_k: Nearest chunks reranked for diversity
+            max_per_domain: Maximum chunks from the same source domain
+            
+        Returns:
+            list: (text, relevance) tuples, higher relevance is better; empty if the
+                  vector store is empty (e.g. the first ingest job has not finished).
+                  Other retrieval errors are raised
+        """
+        with span("rag.retrieve"):
+            try:
+                results = self.rag_system.mmr_search(query, k=k, fetch_k=fetch_k, max_per_domain=max_per_domain)
+            except VectorStoreEmptyError:
+                logger.warning("Vector store is empty, generating without retrieved content")
+                return []
+        logger.info(f"Retrieved {len(results)} candidate chunks")
+        # Keep the MMR order, so the builder drops the least marginally relevant chunks first
+        return [(doc.page_content, -rank) for rank, (doc, _) in enumerate(results)]
+
+    def _build_system_prompt(self, topic, blogs_urls, keywords, tone, target_audience, chunks):
+        """
+        Fill the blog character prompt with RAG content, reference URLs and
+        memory context, fitted into the context builder's token budget.
+        """
+        with span("prompt.build"):
+            # Get up to the last 5 messages for context
+            recent_messages = self.memory.get_recent_messages(5) if self.memory.conversation_history else []
+            context = self.context_builder.build(chunks, blogs_urls, recent_messages)
+            
+            system_prompt = BlogCharacter(topic, context["blogs_urls"], keywords, tone, target_audience,
+                                          context["rag_content"], context["memory_context"]).get_character()
+            
+            context["tokens"]["prompt"] = self.context_builder.count_tokens(system_prompt)
+        self.last_context_report = {key: value for key, value in context.items()
+                                    if key not in ("rag_content", "blogs_urls", "memory_context")}
+        logger.info(f"Prompt context: {context['chunks_used']} chunks ({context['chunks_truncated']} truncated, "
+                    f"{context['chunks_dropped']} dropped), tokens {context['tokens']}")
+        return system_prompt
+
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run blocking I/O in the default thread pool so the event loop stays free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    def _check_related_topics(self, top_related_topics):
+        """Raise if there are no related topics to pick keywords from."""
+        if not top_related_topics:
+            logger.warning("No topics provided, cannot extract relevant keyword")
+            raise ValueError("No topics provided")
+
+    async def aUser_input(self, user_input):
         """
         Process user input to extract a blog topic using LLM.
         
@@ -107,94 +304,204 @@ class BlogAgent:
             
             prompt = TopicCharacter(user_input).get_character()
             
-            topic = self.llm.predict(prompt).strip()
+            topic = (await self._apredict(prompt, template="topic", variable=user_input)).strip()
             logger.info(f"Extracted topic from user input: {topic}")
             return topic
         except Exception as e:
             logger.error(f"Error extracting topic from user input: {e}")
             return user_input
-    
-    def find_relevant_keyword(self, topic, top_related_topics):
+
+    async def afind_relevant_keyword(self, topic, top_related_topics):
         """
-        Extract the most relevant keyword from a list of topics.
+        Extract the most relevant keyword and the keywords to incorporate; both
+        LLM calls run concurrently.
         
         Args:
+            topic: The main blog topic
             top_related_topics: List of potential topics
             
         Returns:
-            str: The most relevant keyword
+            tuple: The most relevant keyword and the relevant keywords
         """
-        if not top_related_topics or len(top_related_topics) == 0:
-            logger.warning("No topics provided, cannot extract relevant keyword")
-            raise ValueError("No topics provided")
+        return tuple(await asyncio.gather(
+            self.aselect_relevant_keyword(topic, top_related_topics),
+            self.agenerate_keyword_list(topic, top_related_topics)
+        ))
+
+    async def aselect_relevant_keyword(self, topic, top_related_topics):
+        """
+        Use the LLM to select the most relevant topic.
+        
+        Args:
+            topic: The main blog topic
+            top_related_topics: List of potential topics
             
-        # Use LLM to select the most relevant topic
-        prompt = KeywordsCharacter(topic, top_related_topics).get_character()
-        keywords_prompt = KeywordListCharacter(topic,top_related_topics).get_character();
+        Returns:
+            str: The most relevant keyword
+        """
+        self._check_related_topics(top_related_topics)
         
-        response = self.llm.predict(prompt)
-        keywordListResponse = self.llm.predict(keywords_prompt)
-        relevant_topic = response.strip()
-        relevantKeywords = keywordListResponse.strip()
+        # The answer must be one of these topics, so only reuse exact matches
+        prompt = KeywordsCharacter(topic, top_related_topics).get_character()
+        relevant_topic = (await self._apredict(prompt)).strip()
         
         # Validate the response
         if relevant_topic not in top_related_topics:
             logger.warning(f"LLM returned '{relevant_topic}' which is not in the provided topics")
+            self._discard_cached(prompt)
             raise ValueError("Invalid keyword selection")
             
         logger.info(f"Selected relevant topic: {relevant_topic}")
-        return relevant_topic, relevantKeywords
+        return relevant_topic
 
-    def create_system_prompt(self, topic, blogs_urls, keywords, tone, target_audience, crawled_content):
+    async def agenerate_keyword_list(self, topic, top_related_topics):
         """
-        Create a system prompt with RAG content for blog generation.
+        Use the LLM to build the list of keywords to incorporate.
+        
+        Args:
+            topic: The main blog topic
+            top_related_topics: List of potential topics
+            
+        Returns:
+            str: The relevant keywords
+        """
+        self._check_related_topics(top_related_topics)
+        
+        # The list depends on the related topics as well as the topic, so only reuse exact matches
+        keywords_prompt = KeywordListCharacter(topic, top_related_topics).get_character()
+        return (await self._apredict(keywords_prompt)).strip()
+
+    async def arefine_query(self, topic):
+        """
+        Use the LLM to turn the topic into a similarity search query.
+        
+        Args:
+            topic: The main blog topic
+            
+        Returns:
+            str: The refined search query
+        """
+        query_refinement_prompt = RefineQueryCharacter(topic).get_character()
+        refined_query = (await self._apredict(query_refinement_prompt, template="refine_query", variable=topic)).strip()
+        logger.info(f"Refined search query: {refined_query}")
+        return refined_query
+
+    async def acreate_system_prompt(self, topic, blogs_urls, keywords, tone, target_audience, crawled_content,
+                                    refined_query=None, ingest_job=None):
+        """
+        Create a system prompt with RAG content for blog generation. Embedding
+        and vector store work runs in the thread pool.
         
         Args:
             topic: The main blog topic
             keywords: The keywords to incorporate
-            crawled_content: Optional crawled content to add to RAG
+            crawled_content: Optional crawled content (text or per-page Documents) to add to RAG
+            refined_query: Optional already-refined search query (refined with the LLM if None)
+            ingest_job: Optional background IngestJob to wait for (up to ingest_deadline)
+                instead of ingesting crawled_content here
             
         Returns:
             str: A system prompt for the LLM
         """
         start_time = time.time()
         
-        # Add crawled content to RAG system
-        if crawled_content:
-            self.rag_system.add_documents(crawled_content)
-        
-        # Create an expanded query using the topic and keywords
-        expanded_query = f"{topic}"
+        # Refine the query while the crawled content is being embedded
+        ingest = None
+        if ingest_job is not None:
+            ingest = asyncio.ensure_future(self.ingest_queue.wait(ingest_job, timeout=self.ingest_deadline))
+        elif crawled_content:
+            ingest = asyncio.ensure_future(self._run_blocking(self.rag_system.add_documents, crawled_content))
         
-        # Use LLM to refine the search query
-        query_refinement_prompt = RefineQueryCharacter(topic).get_character()
-        
-        # Extract list of relevant keywords
         logger.info(f"Keywords: {keywords}")
         
-        refined_query = self.llm.predict(query_refinement_prompt).strip()
-        logger.info(f"Refined search query: {refined_query}")
+        try:
+            if refined_query is None:
+                refined_query = await self.arefine_query(topic)
+            if ingest is not None:
+                await ingest
+        except BaseException:
+            if ingest is not None:
+                ingest.cancel()
+            raise
         
         # Retrieve relevant content using the refined query
-        rag_content = self.rag_system.retrieve_relevant_content(refined_query, k=5)
-        logger.info(f"Retrieved {len(rag_content.split())} words of relevant content")
-        
-        # Add memory context if available
-        memory_context = ""
-        if self.memory.conversation_history:
-            # Get up to the last 5 messages for context
-            recent_messages = self.memory.get_recent_messages(5)
-            memory_context = "Previous conversation context:\n"
-            for msg in recent_messages:
-                memory_context += f"- {msg['role']}: {msg['content']}\n"
+        chunks = await self._run_blocking(self._retrieve_chunks, refined_query)
         
-        # Include memory context in the character prompt
-        system_prompt = BlogCharacter(topic, blogs_urls, keywords, tone, target_audience, rag_content, memory_context).get_character()
+        system_prompt = self._build_system_prompt(topic, blogs_urls, keywords, tone, target_audience, chunks)
         
         logger.info(f"System prompt created in {time.time() - start_time:.2f}s")
         return system_prompt
  
 
+    def build_pipeline(self, tone="Helpful & Value-Driven", target_audience="general"):
+        """
+        Build the dependency graph of the stages that run before generation.
+        
+        Query refinement only needs the topic, and keyword selection and the
+        keyword list only need the related topics, so they overlap with the
+        slower search and crawl stages. LLM calls are awaited on the event loop;
+        the blocking SerpAPI and Google search clients run in the thread pool.
+        With an ingest queue, the crawl is submitted as a background job and the
+        prompt waits for it at most `ingest_deadline` seconds.
+
+        Args:
+            tone: Tone of the blog
+            target_audience: Target audience of the blog
+            
+        Returns:
+            StageGraph: Graph taking a `topic` input and producing `system_prompt`
+        """
+        def find_related_topics(topic):
+            top_related_topics = KeywordsFinder().find_keywords(topic)
+            logger.info(f"Found {len(top_related_topics)} related topics")
+            return top_related_topics
+        
+        async def select_keyword(topic, related_topics):
+            return await self.aselect_relevant_keyword(topic, related_topics)
+        
+        async def keyword_list(topic, related_topics):
+            return await self.agenerate_keyword_list(topic, related_topics)
+        
+        def fetch_blog_urls(relevant_keyword):
+            logger.info(f"Fetching content for keyword: {relevant_keyword}")
+            # Links stay in memory; concurrent requests would race on blog/link.json
+            return BlogLinkFetcher().fetch_all_blogs(relevant_keyword)
+        
+        async def crawl(blogs_urls, topic, relevant_keyword):
+            # One Document per page, so chunks keep their url, domain, crawl time, topic and keyword
+            crawled_content = await BlogContentExtractor().fetch_blog_documents_async(
+                blogs_urls, topic=topic, keyword=relevant_keyword)
+            logger.info(f"Fetched {len(crawled_content)} pages")
+            return crawled_content
+        
+        async def queue_ingest(blogs_urls, topic, relevant_keyword):
+            # Crawling and embedding happen in the background; the prompt only waits up to the deadline
+            return await self.ingest_queue.submit(blogs_urls, topic=topic, keyword=relevant_keyword)
+        
+        async def system_prompt(topic, blogs_urls, keyword_list, crawled_content, refined_query):
+            return await self.acreate_system_prompt(topic, blogs_urls, keyword_list, tone, target_audience,
+                                                    crawled_content, refined_query=refined_query)
+        
+        async def system_prompt_after_ingest(topic, blogs_urls, keyword_list, ingest_job, refined_query):
+            return await self.acreate_system_prompt(topic, blogs_urls, keyword_list, tone, target_audience,
+                                                    None, refined_query=refined_query, ingest_job=ingest_job)
+        
+        graph = StageGraph()
+        graph.add("related_topics", find_related_topics, ["topic"])
+        graph.add("refined_query", self.arefine_query, ["topic"])
+        graph.add("relevant_keyword", select_keyword, ["topic", "related_topics"])
+        graph.add("keyword_list", keyword_list, ["topic", "related_topics"])
+        graph.add("blogs_urls", fetch_blog_urls, ["relevant_keyword"])
+        if self.ingest_queue is not None:
+            graph.add("ingest_job", queue_ingest, ["blogs_urls", "topic", "relevant_keyword"])
+            graph.add("system_prompt", system_prompt_after_ingest,
+                      ["topic", "blogs_urls", "keyword_list", "ingest_job", "refined_query"])
+        else:
+            graph.add("crawled_content", crawl, ["blogs_urls", "topic", "relevant_keyword"])
+            graph.add("system_prompt", system_prompt,
+                      ["topic", "blogs_urls", "keyword_list", "crawled_content", "refined_query"])
+        return graph
+
     async def generate_blog_stream(self, topic, user_input):
         """
         Generate a blog based on the given topic with streaming support.
@@ -209,35 +516,27 @@ class BlogAgent:
         start_time = time.time()
         logger.info(f"Generating blog on topic: {topic}")
         
-        # Process the topic to find related queries
-        top_related_topics = KeywordsFinder().find_keywords(topic)
-        logger.info(f"Found {len(top_related_topics)} related topics")
-        
-        # Find the most relevant keyword
-        relevant_keyword, keyword_list = self.find_relevant_keyword(topic, top_related_topics)
-        logger.info(f"Selected relevant keyword: {relevant_keyword}")
-        
-        # Fetch blogs urls
-        logger.info(f"Fetching content for keyword: {relevant_keyword}")
-        blogs_urls = BlogLinkFetcher().fetch_all_blogs(relevant_keyword)
-        BlogLinkFetcher().save_results(blogs_urls, "blog/link.json")
-        
-        # Fetch blog content
-        crawled_content = BlogContentExtractor().fetch_blog_content(blogs_urls)
-        logger.info(f"Fetched {len(crawled_content) if crawled_content else 0} chars of content")
-        
-        # Create system prompt with RAG content
-        tone = "Helpful & Value-Driven"
-        target_audience = "general"
-        system_prompt = self.create_system_prompt(topic, blogs_urls, keyword_list, tone, target_audience, crawled_content)
+        # Run the independent pre-generation stages concurrently
+        pipeline = self.build_pipeline()
+        results = await pipeline.run(topic=topic)
+        system_prompt = results["system_prompt"]
+        pipeline_time = time.time() - start_time
+        logger.info(f"Generation pipeline ready in {pipeline_time:.2f}s")
+        self.last_timings = {
+            "stages": {name: round(seconds, 2) for name, seconds in pipeline.timings.items()},
+            "pipeline": round(pipeline_time, 2)
+        }
         
         # Create message objects
         system_message = SystemMessage(content=system_prompt)
         human_message = HumanMessage(content=user_input)
         
         AI_message = []
-        # Stream the response
+        # Stream the response (bypasses the helper-prompt cache)
         async for chunk in self.llm.astream([system_message, human_message]):
+            if not AI_message:
+                observe("generate.first_token", time.time() - start_time)
+                self.last_timings["first_token"] = round(time.time() - start_time, 2)
             if hasattr(chunk, 'content'):
                 yield chunk.content
                 AI_message.append(chunk.content)
@@ -252,6 +551,47 @@ class BlogAgent:
         self.memory.add_ai_message(collected_chunks)
         
         generation_time = time.time() - start_time
+        observe("generate.total", generation_time)
+        observe("generate.stream", generation_time - pipeline_time)
+        self.last_timings["total"] = round(generation_time, 2)
         logger.info(f"Blog generated in {generation_time:.2f}s")
 
+    async def agenerate_blog(self, user_input, extract_topic=True):
+        """
+        Generate a complete blog from user input without streaming.
+        
+        Args:
+            user_input: User input containing the blog topic
+            extract_topic: Whether to extract the topic from user_input with the LLM;
+                if False, user_input is used as the topic as is
+            
+        Returns:
+            dict: topic, content and user_input (as expected by BlogTools.save_blog),
+                  plus the timings and context report of the generation
+        """
+        topic = await self.aUser_input(user_input) if extract_topic else user_input
+        chunks = []
+        async for chunk in self.generate_blog_stream(topic, user_input):
+            chunks.append(chunk)
+        return {
+            "topic": topic,
+            "content": "".join(chunks),
+            "user_input": user_input,
+            "timings": self.last_timings,
+            "context": self.last_context_report
+        }
+
+    def generate_blog(self, user_input, extract_topic=True):
+        """
+        Synchronous wrapper around agenerate_blog for scripts.
+        
+        Args:
+            user_input: User input containing the blog topic
+            extract_topic: Whether to extract the topic from user_input with the LLM
+            
+        Returns:
+            dict: The generated blog (see agenerate_blog)
+        """
+        return asyncio.run(self.agenerate_blog(user_input, extract_topic=extract_topic))
+
  
\ No newline at end of file
@@ -0,0 +1,177 @@
+#Token-budgeted prompt context
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('context_builder')
+
+# Chunks shorter than this after truncation are dropped instead
+MIN_CHUNK_TOKENS = 32
+
+# Loaded encodings (None if unavailable), shared by all builders
+_encodings = {}
+
+class ContextBuilder:
+    """
+    Assembles the variable parts of the blog prompt within a token budget.
+
+    The budget is split between RAG content, reference URLs and conversation
+    memory. URLs and memory take at most their share and RAG content gets the
+    rest, including whatever URLs and memory leave unused. Chunks are added
+    from most to least relevant; the first one that does not fit is truncated
+    and the rest are dropped. Memory keeps the most recent messages.
+    """
+    def __init__(self, max_tokens=3000, urls_share=0.1, memory_share=0.2, encoding_name="cl100k_base"):
+        """
+        Initialize the context builder.
+
+        Args:
+            max_tokens: Token budget for RAG content, URLs and memory together
+            urls_share: Fraction of the budget reserved for reference URLs
+            memory_share: Fraction of the budget reserved for conversation memory
+            encoding_name: tiktoken encoding used to count tokens
+        """
+        self.max_tokens = max_tokens
+        self.urls_share = urls_share
+        self.memory_share = memory_share
+        self.encoding_name = encoding_name
+
+    def _get_encoding(self):
+        if self.encoding_name not in _encodings:
+            try:
+                import tiktoken
+                _encodings[self.encoding_name] = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                logger.warning(f"tiktoken encoding '{self.encoding_name}' unavailable, estimating 4 characters per token: {e}")
+                _encodings[self.encoding_name] = None
+        return _encodings[self.encoding_name]
+
+    def count_tokens(self, text):
+        """
+        Count the tokens of a text.
+
+        Args:
+            text: Text to count
+
+        Returns:
+            int: Number of tokens
+        """
+        if not text:
+            return 0
+        encoding = self._get_encoding()
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text, max_tokens):
+        """
+        Cut a text down to at most max_tokens tokens.
+
+        Args:
+            text: Text to truncate
+            max_tokens: Maximum number of tokens to keep
+
+        Returns:
+            str: The truncated text
+        """
+        if max_tokens <= 0:
+            return ""
+        encoding = self._get_encoding()
+        if encoding is None:
+            return text[:max_tokens * 4]
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+
+    def _fit_urls(self, blogs_urls, budget):
+        urls = []
+        used = 0
+        for url in blogs_urls or []:
+            # Each URL is rendered as a list item in the prompt
+            tokens = self.count_tokens(f"'{url}', ")
+            if used + tokens > budget:
+                break
+            urls.append(url)
+            used += tokens
+        return urls, used
+
+    def _fit_memory(self, messages, budget):
+        header = "Previous conversation context:\n"
+        if not messages or budget <= self.count_tokens(header):
+            return "", 0
+        used = self.count_tokens(header)
+        lines = []
+        # Keep the newest messages, truncating the oldest one that still fits
+        for msg in reversed(messages):
+            line = f"- {msg['role']}: {msg['content']}\n"
+            tokens = self.count_tokens(line)
+            if used + tokens > budget:
+                remaining = budget - used
+                if remaining >= MIN_CHUNK_TOKENS:
+                    line = self.truncate(line, remaining).rstrip("\n") + "\n"
+                    lines.append(line)
+                    used += self.count_tokens(line)
+                break
+            lines.append(line)
+            used += tokens
+        if not lines:
+            return "", 0
+        return header + "".join(reversed(lines)), used
+
+    def _fit_chunks(self, chunks, budget):
+        selected = []
+        used = 0
+        truncated = 0
+        for text, _ in sorted(chunks, key=lambda chunk: chunk[1], reverse=True):
+            # Chunks are joined with a blank line
+            tokens = self.count_tokens(text) + (1 if selected else 0)
+            if used + tokens <= budget:
+                selected.append(text)
+                used += tokens
+                continue
+            remaining = budget - used
+            if remaining >= MIN_CHUNK_TOKENS:
+                text = self.truncate(text, remaining - (1 if selected else 0))
+                selected.append(text)
+                used += self.count_tokens(text) + (1 if len(selected) > 1 else 0)
+                truncated += 1
+            break
+        return selected, used, truncated
+
+    def build(self, chunks, blogs_urls=None, memory_messages=None):
+        """
+        Fit retrieved chunks, reference URLs and memory into the budget.
+
+        Args:
+            chunks: List of (text, relevance) tuples, higher relevance first to be kept
+            blogs_urls: Reference URLs for the prompt
+            memory_messages: Conversation messages (dicts with role and content), oldest first
+
+        Returns:
+            dict: rag_content, blogs_urls and memory_context to put in the prompt, plus a
+                  `tokens` breakdown (rag, urls, memory, total, budget) and chunk counts
+        """
+        urls, url_tokens = self._fit_urls(blogs_urls, int(self.max_tokens * self.urls_share))
+        memory_context, memory_tokens = self._fit_memory(memory_messages, int(self.max_tokens * self.memory_share))
+
+        # RAG content gets its share plus whatever URLs and memory left unused
+        rag_budget = self.max_tokens - url_tokens - memory_tokens
+        selected, rag_tokens, truncated = self._fit_chunks(chunks or [], rag_budget)
+
+        return {
+            "rag_content": "\n\n".join(selected),
+            "blogs_urls": urls,
+            "memory_context": memory_context,
+            "chunks_used": len(selected),
+            "chunks_truncated": truncated,
+            "chunks_dropped": len(chunks or []) - len(selected),
+            "urls_dropped": len(blogs_urls or []) - len(urls),
+            "tokens": {
+                "rag": rag_tokens,
+                "urls": url_tokens,
+                "memory": memory_tokens,
+                "total": rag_tokens + url_tokens + memory_tokens,
+                "budget": self.max_tokens
+            }
+        }
@@ -0,0 +1,433 @@
+#Background crawl and ingestion queue
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from blog.async_crawler import AsyncCrawler
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks on Windows; every process then owns its log
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('ingest_queue')
+
+# Root of the project, so the job log does not depend on the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Jobs in these states are resumed when the queue starts again
+PENDING_STATUSES = ("queued", "crawling", "embedding")
+
+class IngestJob:
+    """A crawl+ingest job for a set of URLs."""
+    def __init__(self, urls, metadata=None, job_id=None, created_at=None):
+        """
+        Initialize the job.
+
+        Args:
+            urls: URLs to crawl
+            metadata: Metadata added to every crawled page (e.g. topic, keyword)
+            job_id: Job id (generated if None)
+            created_at: Submission time (now if None)
+        """
+        self.id = job_id or uuid.uuid4().hex
+        self.urls = list(urls)
+        self.metadata = metadata or {}
+        self.created_at = created_at or time.time()
+        self.status = "queued"
+        self.error = None
+        self.documents = 0
+        self.finished_at = None
+        self._done = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status not in PENDING_STATUSES
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "urls": self.urls,
+            "metadata": self.metadata,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "documents": self.documents,
+            "error": self.error
+        }
+
+class IngestQueue:
+    """
+    Background crawl and ingestion, decoupled from the request path.
+
+    Crawl workers fetch each job's pages as per-page Documents and hand them
+    to a single embedding worker, which collects the pages of every job that
+    is ready within `batch_window` seconds and adds them to the RAG system in
+    one call, so embedding requests are batched across jobs. Every status
+    change is appended to a JSONL job log; jobs that had not finished when
+    the process stopped are resumed on the next start.
+
+    Several processes (e.g. uvicorn workers) can share one log. Only the
+    process holding the log's owner lock replays and rewrites it at start,
+    so unfinished jobs are resumed once; appends from all processes are
+    serialized with a file lock. A single writer task appends the status
+    changes in the thread pool, so waiting for the file lock never blocks
+    the event loop.
+    """
+    def __init__(self, rag_system, log_path=".cache/ingest_jobs.jsonl", crawl_workers=2,
+                 batch_window=0.5, max_batch_documents=50, max_jobs=1000):
+        """
+        Initialize the queue.
+
+        Args:
+            rag_system: RAG system the crawled pages are added to
+            log_path: JSONL file the job log is appended to, relative to the project root
+                (None to keep jobs in memory only)
+            crawl_workers: Number of jobs crawled concurrently
+            batch_window: Seconds the embedding worker waits for more jobs before embedding
+            max_batch_documents: Pages that trigger embedding without waiting for the window
+            max_jobs: Jobs kept in memory for lookups; the oldest finished ones are dropped
+        """
+        self.rag_system = rag_system
+        self.log_path = os.path.join(PROJECT_ROOT, log_path) if log_path else None
+        self.crawl_workers = crawl_workers
+        self.batch_window = batch_window
+        self.max_batch_documents = max_batch_documents
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.batches = 0
+        self.documents_ingested = 0
+        self._crawl_queue = None
+        self._ready_queue = None
+        self._tasks = []
+        self._starting = None
+        self._log_queue = None
+        self._log_writer_task = None
+        self._log_lock = threading.Lock()
+        self._owner_fd = None
+        self.owner = False
+
+    @property
+    def running(self):
+        return self._starting is not None
+
+    @contextmanager
+    def _locked_log(self):
+        """Hold the log lock of this process and, where supported, of all processes."""
+        with self._log_lock:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(f"{self.log_path}.lock", os.O_CREAT | os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield
+            finally:
+                os.close(fd)
+
+    def _acquire_ownership(self):
+        """
+        Try to become the process that replays the job log.
+
+        Returns:
+            bool: True if this process owns the log (kept until stop)
+        """
+        if not self.log_path or fcntl is None:
+            return True
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        fd = os.open(f"{self.log_path}.owner", os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._owner_fd = fd
+        return True
+
+    def _release_ownership(self):
+        if self._owner_fd is not None:
+            os.close(self._owner_fd)
+            self._owner_fd = None
+        self.owner = False
+
+    def _append_log(self, lines):
+        """Append lines to the job log under the log lock (blocking)."""
+        with self._locked_log():
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    def _log(self, job):
+        if not self.log_path:
+            return
+        # Serialize now, so the line records the status at this point
+        line = json.dumps(job.to_dict(), ensure_ascii=False) + "\n"
+        if self._log_queue is None:
+            self._append_log([line])
+        else:
+            self._log_queue.put_nowait(line)
+
+    async def _log_writer(self):
+        """Append queued log lines in the thread pool until a None line arrives."""
+        loop = asyncio.get_running_loop()
+        while True:
+            lines = [await self._log_queue.get()]
+            while not self._log_queue.empty():
+                lines.append(self._log_queue.get_nowait())
+            finished = None in lines
+            lines = [line for line in lines if line is not None]
+            if lines:
+                try:
+                    await loop.run_in_executor(None, self._append_log, lines)
+                except Exception as e:
+                    logger.error(f"Could not append {len(lines)} lines to {self.log_path}: {e}")
+            if finished:
+                return
+
+    def _set_status(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        if job.finished:
+            job.finished_at = time.time()
+            job._done.set()
+            self._prune()
+        self._log(job)
+
+    def _prune(self):
+        excess = len(self.jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished][:excess]:
+            del self.jobs[job_id]
+
+    def _replay(self):
+        """Load unfinished jobs from the log and rewrite it with only those."""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return []
+        # Other processes keep appending; hold the lock so none of their lines are lost
+        with self._locked_log():
+            records = {}
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    record = json.loads(line)
+                    records[record["id"]] = record
+
+            pending = []
+            for record in records.values():
+                if record["status"] in PENDING_STATUSES:
+                    pending.append(IngestJob(record["urls"], record.get("metadata"),
+                                             job_id=record["id"], created_at=record.get("created_at")))
+
+            # Finished jobs are not needed after a restart, so the log starts over
+            tmp_path = f"{self.log_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for job in pending:
+                    f.write(json.dumps(job.to_dict(), ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.log_path)
+        return pending
+
+    async def start(self):
+        """Start the workers and resume unfinished jobs from the log."""
+        # Concurrent callers wait for the same start
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start())
+        starting = self._starting
+        try:
+            await asyncio.shield(starting)
+        except BaseException:
+            if starting.done() and self._starting is starting:
+                self._starting = None
+            raise
+
+    async def _start(self):
+        loop = asyncio.get_running_loop()
+        self._crawl_queue = asyncio.Queue()
+        self._ready_queue = asyncio.Queue()
+        self._log_queue = asyncio.Queue()
+        self._log_writer_task = asyncio.create_task(self._log_writer())
+
+        # Taking the locks and rewriting the log block, so they run in the thread pool
+        self.owner = await loop.run_in_executor(None, self._acquire_ownership)
+        if self.owner:
+            pending = await loop.run_in_executor(None, self._replay)
+        else:
+            logger.info(f"Another process owns {self.log_path}, not resuming its jobs")
+            pending = []
+        for job in pending:
+            self.jobs[job.id] = job
+            self._crawl_queue.put_nowait(job)
+        if pending:
+            logger.info(f"Resuming {len(pending)} unfinished ingest jobs")
+
+        self._tasks = [asyncio.create_task(self._crawl_worker()) for _ in range(self.crawl_workers)]
+        self._tasks.append(asyncio.create_task(self._embed_worker()))
+        logger.info(f"Ingest queue started with {self.crawl_workers} crawl workers")
+
+    async def stop(self):
+        """Stop the workers. Unfinished jobs stay in the log and resume on the next start."""
+        if self._starting is None:
+            return
+        self._starting.cancel()
+        await asyncio.gather(self._starting, return_exceptions=True)
+        self._starting = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Let the writer append the status changes queued so far, then log directly again
+        if self._log_writer_task is not None:
+            self._log_queue.put_nowait(None)
+            await asyncio.gather(self._log_writer_task, return_exceptions=True)
+            self._log_writer_task = None
+        self._log_queue = None
+        self._release_ownership()
+        logger.info("Ingest queue stopped")
+
+    async def submit(self, urls, **metadata):
+        """
+        Queue URLs to be crawled and ingested.
+
+        Args:
+            urls: URLs to crawl
+            **metadata: Metadata added to every page (e.g. topic, keyword)
+
+        Returns:
+            IngestJob: The queued job
+        """
+        await self.start()
+        job = IngestJob(urls, {key: value for key, value in metadata.items() if value is not None})
+        self.jobs[job.id] = job
+        if not job.urls:
+            self._set_status(job, "done")
+            return job
+        self._log(job)
+        self._crawl_queue.put_nowait(job)
+        logger.info(f"Queued ingest job {job.id} for {len(job.urls)} URLs")
+        return job
+
+    async def wait(self, job, timeout=None):
+        """
+        Wait for a job to be ingested, up to a deadline.
+
+        The job keeps running in the background if the deadline passes.
+
+        Args:
+            job: IngestJob to wait for
+            timeout: Seconds to wait (None waits until the job finishes)
+
+        Returns:
+            bool: Whether the job's pages are indexed
+        """
+        try:
+            await asyncio.wait_for(job._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.info(f"Ingest job {job.id} still {job.status} after {timeout}s, continuing with the indexed content")
+            return False
+        return job.status == "done"
+
+    def get(self, job_id):
+        """
+        Look up a job submitted since the queue started.
+
+        Args:
+            job_id: Job id
+
+        Returns:
+            IngestJob: The job, or None if unknown
+        """
+        return self.jobs.get(job_id)
+
+    def stats(self):
+        """
+        Job counts and batching metrics.
+
+        Returns:
+            dict: Jobs per status, queue depths, batches and pages ingested
+        """
+        statuses = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "running": self.running,
+            "owner": self.owner,
+            "jobs": statuses,
+            "crawl_queue": self._crawl_queue.qsize() if self._crawl_queue else 0,
+            "ready_queue": self._ready_queue.qsize() if self._ready_queue else 0,
+            "batches": self.batches,
+            "documents_ingested": self.documents_ingested,
+            "documents_per_batch": round(self.documents_ingested / self.batches, 2) if self.batches else 0.0
+        }
+
+    async def _crawl_worker(self):
+        # Each worker keeps one crawler, so its connection pool is reused across jobs
+        async with AsyncCrawler() as crawler:
+            while True:
+                job = await self._crawl_queue.get()
+                self._set_status(job, "crawling")
+                try:
+                    documents = await crawler.crawl_documents(job.urls, **job.metadata)
+                except Exception as e:
+                    logger.error(f"Crawl failed for ingest job {job.id}: {e}")
+                    self._set_status(job, "failed", error=str(e))
+                    continue
+                job.documents = len(documents)
+                if not documents:
+                    self._set_status(job, "done")
+                    continue
+                self._set_status(job, "embedding")
+                self._ready_queue.put_nowait((job, documents))
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._ready_queue.get()]
+        count = len(batch[0][1])
+        deadline = loop.time() + self.batch_window
+        while count < self.max_batch_documents:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            # Not wait_for: it can swallow a cancellation that races with a new item, so stop() would hang
+            getter = asyncio.ensure_future(self._ready_queue.get())
+            try:
+                await asyncio.wait([getter], timeout=remaining)
+            finally:
+                if not getter.done():
+                    # A cancelled getter leaves its item in the queue
+                    getter.cancel()
+            if not getter.done():
+                break
+            item = getter.result()
+            batch.append(item)
+            count += len(item[1])
+        return batch
+
+    async def _embed_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            documents = [document for _, job_documents in batch for document in job_documents]
+            try:
+                # One add_documents call embeds the new chunks of every job in the batch together
+                await loop.run_in_executor(None, self.rag_system.add_documents, documents)
+            except Exception as e:
+                logger.error(f"Ingesting {len(documents)} pages failed: {e}")
+                for job, _ in batch:
+                    self._set_status(job, "failed", error=str(e))
+                continue
+
+            self.batches += 1
+            self.documents_ingested += len(documents)
+            logger.info(f"Ingested {len(documents)} pages from {len(batch)} jobs in one batch")
+            for job, _ in batch:
+                self._set_status(job, "done")
@@ -0,0 +1,179 @@
+#LLM response cache
+from collections import OrderedDict
+import time
+import hashlib
+import threading
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('llm_cache')
+
+class LLMResponseCache:
+    """
+    In-memory cache of LLM responses for the short helper prompts.
+
+    Responses are keyed by (model, temperature, prompt hash). If `embeddings`
+    is given, a miss on the exact key falls back to the cached response whose
+    variable input (e.g. the topic) is most similar, provided its cosine
+    similarity reaches `similarity_threshold`. Only entries of the same model,
+    temperature and template are compared. Entries expire after `ttl` seconds
+    and the least recently used ones are evicted beyond `max_entries`.
+
+    Only the variable input is embedded: the helper prompts share long
+    templates, so whole-prompt embeddings of e.g. "home loan" and "personal
+    loan" would be nearly identical.
+    """
+    def __init__(self, max_entries=1024, ttl=86400, embeddings=None, similarity_threshold=0.97):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached responses
+            ttl: Seconds a response stays valid
+            embeddings: Optional embeddings used for the similarity tier (e.g. the RAG embeddings)
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, model, temperature, prompt):
+        return hashlib.sha256(f"{model}\x00{temperature}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def _embed(self, text):
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict(self, now):
+        """Drop expired entries and the least recently used ones beyond max_entries."""
+        for key in [key for key, entry in self._entries.items() if entry["expires"] <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, model, temperature, prompt, template=None, variable=None):
+        """
+        Look up a cached response.
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            prompt: Prompt text
+            template: Name of the template the prompt was rendered from
+            variable: The input filled into the template; if None, only the
+                exact prompt may answer
+
+        Returns:
+            str: The cached response, or None on a miss
+        """
+        key = self._key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires"] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["response"]
+            if self.embeddings is None or template is None or variable is None:
+                self.misses += 1
+                return None
+            candidates = [
+                (candidate_key, entry["vector"]) for candidate_key, entry in self._entries.items()
+                if entry["scope"] == (model, temperature, template) and entry["vector"] is not None
+                and entry["expires"] > now
+            ]
+
+        if candidates:
+            try:
+                vector = self._embed(variable)
+                similarities = np.stack([candidate for _, candidate in candidates]) @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    with self._lock:
+                        entry = self._entries.get(candidates[best][0])
+                        if entry is not None:
+                            self._entries.move_to_end(candidates[best][0])
+                            self.semantic_hits += 1
+                            logger.info(f"Semantic cache hit (similarity {similarities[best]:.3f})")
+                            return entry["response"]
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, model, temperature, prompt, response, template=None, variable=None):
+        """
+        Cache a response.
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            prompt: Prompt text
+            response: Response text
+            template: Name of the template the prompt was rendered from
+            variable: The input filled into the template; if None, the response
+                is only reused for the exact prompt
+        """
+        vector = None
+        if self.embeddings is not None and template is not None and variable is not None:
+            try:
+                vector = self._embed(variable)
+            except Exception as e:
+                logger.warning(f"Could not embed input for the semantic cache: {e}")
+
+        key = self._key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {
+                "response": response,
+                "expires": now + self.ttl,
+                "scope": (model, temperature, template),
+                "vector": vector
+            }
+            self._entries.move_to_end(key)
+            self._evict(now)
+
+    def discard(self, model, temperature, prompt):
+        """
+        Remove a cached response, e.g. one that failed validation.
+
+        Args:
+            model: Model name
+            temperature: Sampling temperature
+            prompt: Prompt text
+        """
+        with self._lock:
+            self._entries.pop(self._key(model, temperature, prompt), None)
+
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Get hit/miss metrics.
+
+        Returns:
+            dict: Entry count, exact hits, semantic hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0
+            }
@@ -0,0 +1,130 @@
+import threading
+import logging
+from langchain_community.llms.fake import FakeListLLM
+from rag.rag import RAGSystem
+from agent.base import BlogAgent
+from agent.llm_cache import LLMResponseCache
+from agent.ingest_queue import IngestQueue
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('agent_pool')
+
+class AgentPool:
+    """
+    Process-wide registry of warm LLM clients and a shared RAG system.
+
+    LLM clients are created (and tested) once per (model, temperature) pair and
+    the vector store is loaded once, so handing out an agent for a request only
+    costs a new AgentMemory session. Responses to the helper prompts are cached
+    in one LLMResponseCache shared by all agents. With background ingestion,
+    agents hand crawling and embedding to one shared IngestQueue.
+    """
+    def __init__(self, rag_system=None, llm_cache=None, semantic_cache=False, background_ingest=False):
+        """
+        Initialize the agent pool.
+
+        Args:
+            rag_system: Optional RAG system instance to share (created lazily if None)
+            llm_cache: Optional LLMResponseCache shared by all agents (created if None)
+            semantic_cache: Whether the created cache also matches prompts with a similar topic
+                using the RAG embeddings
+            background_ingest: Whether agents crawl and ingest through the shared IngestQueue
+                (started with `await pool.ingest_queue.start()`) instead of inline
+        """
+        self._rag_system = rag_system
+        self._llm_cache = llm_cache
+        self.semantic_cache = semantic_cache
+        self.background_ingest = background_ingest
+        self._ingest_queue = None
+        self._llms = {}
+        self._llm_locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rag_system(self):
+        """The shared RAG system, loaded on first use."""
+        if self._rag_system is None:
+            with self._lock:
+                if self._rag_system is None:
+                    logger.info("Loading shared RAG system")
+                    self._rag_system = RAGSystem()
+        return self._rag_system
+
+    @property
+    def llm_cache(self):
+        """The shared helper-prompt response cache, created on first use."""
+        if self._llm_cache is None:
+            embeddings = self.rag_system.embeddings if self.semantic_cache else None
+            with self._lock:
+                if self._llm_cache is None:
+                    self._llm_cache = LLMResponseCache(embeddings=embeddings)
+        return self._llm_cache
+
+    @property
+    def ingest_queue(self):
+        """The shared background ingestion queue, created on first use."""
+        if self._ingest_queue is None:
+            rag_system = self.rag_system
+            with self._lock:
+                if self._ingest_queue is None:
+                    self._ingest_queue = IngestQueue(rag_system)
+        return self._ingest_queue
+
+    def get_agent(self, model_name="gpt-4o", temperature=0.7, session_id=None):
+        """
+        Get an agent backed by the shared LLM client and RAG system.
+
+        Args:
+            model_name: LLM model to use
+            temperature: Temperature for LLM responses
+            session_id: Optional session ID for the agent's memory
+
+        Returns:
+            BlogAgent: Agent with its own AgentMemory session
+        """
+        rag_system = self.rag_system
+        llm_cache = self.llm_cache
+        ingest_queue = self.ingest_queue if self.background_ingest else None
+        key = (model_name, float(temperature))
+
+        with self._lock:
+            llm = self._llms.get(key)
+            llm_lock = self._llm_locks.setdefault(key, threading.Lock())
+
+        if llm is None:
+            # Only callers for the same key wait while its client is created and tested
+            with llm_lock:
+                llm = self._llms.get(key)
+                if llm is None:
+                    logger.info(f"Creating LLM client for model={model_name}, temperature={temperature}")
+                    agent = BlogAgent(
+                        model_name=model_name,
+                        rag_system=rag_system,
+                        temperature=temperature,
+                        session_id=session_id,
+                        llm_cache=llm_cache,
+                        ingest_queue=ingest_queue
+                    )
+                    # A fallback means the provider was unreachable; retry on the next request
+                    if isinstance(agent.llm, FakeListLLM):
+                        logger.warning(f"Not caching fallback LLM for model={model_name}")
+                    else:
+                        with self._lock:
+                            self._llms[key] = agent.llm
+                    return agent
+
+        return BlogAgent(
+            model_name=model_name,
+            rag_system=rag_system,
+            temperature=temperature,
+            session_id=session_id,
+            llm=llm,
+            llm_cache=llm_cache,
+            ingest_queue=ingest_queue
+        )
+
+    def clear(self):
+        """Drop all cached LLM clients."""
+        with self._lock:
+            self._llms.clear()
@@ -0,0 +1,206 @@
+#Prefetching for hot topics
+import os
+import sys
+import time
+import asyncio
+import argparse
+import functools
+import logging
+from collections import Counter
+from dotenv import load_dotenv
+
+# Add project root to path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from agent.pool import AgentPool
+from agent.tools import BlogTools
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('prefetch')
+
+def popular_topics(output_dirs=("blog_contents", "generated_blogs"), limit=5):
+    """
+    Most frequently generated topics, from the metadata of saved blogs.
+
+    Args:
+        output_dirs: Directories holding saved blogs, relative to the project root
+        limit: Maximum number of topics
+
+    Returns:
+        list: Topics, most frequent first
+    """
+    tools = BlogTools()
+    counts = Counter()
+    names = {}
+    for output_dir in output_dirs:
+        output_dir = os.path.join(PROJECT_ROOT, output_dir)
+        if not os.path.isdir(output_dir):
+            continue
+        for blog in tools.list_generated_blogs(output_dir):
+            topic = (blog.get("topic") or "").strip()
+            if topic:
+                counts[topic.lower()] += 1
+                names.setdefault(topic.lower(), topic)
+    return [names[topic] for topic, _ in counts.most_common(limit)]
+
+class TopicPrefetcher:
+    """
+    Runs the pre-generation pipeline for seed topics ahead of time.
+
+    For each seed, the topic extraction and the full pipeline (trends, keyword
+    selection, link search, crawl, ingest, query refinement and retrieval) run
+    through an agent from the pool, exactly as a request would. This fills the
+    trends and link lookup caches, the page cache, the embedding cache, the
+    vector store and, in the same process, the LLM response cache, so requests
+    on hot topics go straight to retrieval and generation.
+    """
+    def __init__(self, agent_pool, topics, interval=6 * 3600, model_name="gpt-4o", temperature=0.7, concurrency=2):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            agent_pool: AgentPool whose agents (and caches) serve the requests
+            topics: Seed topics, phrased as a user would
+            interval: Seconds between prefetch runs in `run_forever`
+            model_name: Model of the agent used, matching the one requests use
+            temperature: Temperature of the agent used, matching the one requests use
+            concurrency: Maximum topics prefetched at once
+        """
+        self.agent_pool = agent_pool
+        self.topics = list(topics)
+        self.interval = interval
+        self.model_name = model_name
+        self.temperature = temperature
+        self.concurrency = concurrency
+        self.last_run = None
+
+    async def prefetch(self, seed):
+        """
+        Run the pipeline for one seed topic.
+
+        Args:
+            seed: Seed topic
+
+        Returns:
+            dict: Seed, extracted topic, URL count, per-stage timings and total seconds
+        """
+        start_time = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        agent = await loop.run_in_executor(None, functools.partial(
+            self.agent_pool.get_agent, model_name=self.model_name, temperature=self.temperature))
+
+        topic = await agent.aUser_input(seed)
+        graph = agent.build_pipeline()
+        results = await graph.run(topic=topic)
+
+        # Unlike a request, wait until the background job has ingested everything
+        ingest_job = results.get("ingest_job")
+        if ingest_job is not None:
+            await agent.ingest_queue.wait(ingest_job)
+
+        return {
+            "seed": seed,
+            "topic": topic,
+            "urls": len(results.get("blogs_urls") or []),
+            "stages": {name: round(seconds, 2) for name, seconds in graph.timings.items()},
+            "seconds": round(time.perf_counter() - start_time, 2)
+        }
+
+    async def run_once(self):
+        """
+        Prefetch every seed topic.
+
+        Returns:
+            list: One result per topic (with an `error` instead for failed topics)
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def prefetch_one(seed):
+            async with semaphore:
+                try:
+                    result = await self.prefetch(seed)
+                    logger.info(f"Prefetched '{seed}' in {result['seconds']}s")
+                    return result
+                except Exception as e:
+                    logger.error(f"Prefetching '{seed}' failed: {e}")
+                    return {"seed": seed, "error": str(e)}
+
+        start_time = time.time()
+        results = await asyncio.gather(*(prefetch_one(seed) for seed in self.topics))
+        self.last_run = {"started_at": start_time, "seconds": round(time.time() - start_time, 2), "results": results}
+        return results
+
+    async def run_forever(self):
+        """Prefetch every `interval` seconds until cancelled."""
+        while True:
+            await self.run_once()
+            logger.info(f"Next prefetch in {self.interval}s")
+            await asyncio.sleep(self.interval)
+
+async def run_prefetcher(prefetcher, once=False):
+    """
+    Run a prefetcher with its pool's ingest queue started.
+
+    Args:
+        prefetcher: TopicPrefetcher whose pool uses background ingestion
+        once: Whether to prefetch once instead of every interval
+
+    Returns:
+        list: Results of the run if `once`
+    """
+    ingest_queue = prefetcher.agent_pool.ingest_queue
+    await ingest_queue.start()
+    try:
+        if once:
+            return await prefetcher.run_once()
+        await prefetcher.run_forever()
+    finally:
+        await ingest_queue.stop()
+
+def main():
+    """
+    Prefetch hot topics (run as: python -m agent.prefetch)
+
+    Pages are ingested through an IngestQueue, so this process adds them to
+    the vector store from a single embedding worker as segments, which the
+    API picks up on its next search. When the API runs, prefer its built-in
+    prefetcher (PREFETCH_TOPICS), which also warms the API's in-process LLM
+    response cache.
+    """
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='Warm the caches and vector store for hot topics')
+
+    parser.add_argument('topics', nargs='*', help='Seed topics (default: the most generated topics)')
+    parser.add_argument('--topics-file', type=str, help='File with one seed topic per line')
+    parser.add_argument('--limit', type=int, default=5, help='Number of popular topics used when none are given (default: 5)')
+    parser.add_argument('--interval', type=float, default=6 * 3600, help='Seconds between runs (default: 21600)')
+    parser.add_argument('--once', action='store_true', help='Run once and exit')
+    parser.add_argument('--model', type=str, default='gpt-4o', help='Model requests use (default: gpt-4o)')
+    parser.add_argument('--temperature', type=float, default=0.7, help='Temperature requests use (default: 0.7)')
+    parser.add_argument('--concurrency', type=int, default=2, help='Topics prefetched at once (default: 2)')
+
+    args = parser.parse_args()
+
+    topics = list(args.topics)
+    if args.topics_file:
+        with open(args.topics_file, "r", encoding="utf-8") as f:
+            topics.extend(line.strip() for line in f if line.strip())
+    if not topics:
+        topics = popular_topics(limit=args.limit)
+    if not topics:
+        print("No seed topics given and no generated blogs to pick popular topics from")
+        return
+    print(f"Prefetching: {', '.join(topics)}")
+
+    prefetcher = TopicPrefetcher(AgentPool(background_ingest=True), topics, interval=args.interval,
+                                 model_name=args.model, temperature=args.temperature, concurrency=args.concurrency)
+    if args.once:
+        for result in asyncio.run(run_prefetcher(prefetcher, once=True)):
+            print(result)
+    else:
+        asyncio.run(run_prefetcher(prefetcher))
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,19 @@
 #API
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 import os
 import sys
 import time
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 import uvicorn
 import json
 import asyncio
+import functools
+import logging
 
 # Add project root to path to import modules
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -19,10 +21,15 @@ sys.path.append(project_root)
 print(f"Project root added to sys.path: {project_root}")
 
 # Import local modules after adding the project root to sys.path
-from agent.base import BlogAgent
+from agent.pool import AgentPool
 from agent.tools import BlogTools
 from agent.image_generator import ImageGenerator
+from agent.prefetch import TopicPrefetcher, popular_topics
+import metrics
 
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('api')
 
 load_dotenv()
 
@@ -45,11 +52,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize the agent and tools
-blog_agent = BlogAgent(temperature=0.7, model_name="gpt-4o")  # Using a more reliable model by default
+# Initialize the shared agent pool and tools
+agent_pool = AgentPool(
+    semantic_cache=os.getenv("LLM_SEMANTIC_CACHE", "").lower() == "true",
+    background_ingest=os.getenv("BACKGROUND_INGEST", "true").lower() == "true"
+)
+agent_pool.get_agent(temperature=0.7, model_name="gpt-4o")  # Warm up the default model and vector store
 blog_tools = BlogTools()
 image_generator = ImageGenerator()
 
+# Optional prefetching of hot topics: PREFETCH_TOPICS is a comma-separated list,
+# or "auto" for the most generated topics
+prefetch_topics = os.getenv("PREFETCH_TOPICS", "").strip()
+if prefetch_topics.lower() == "auto":
+    prefetch_topics = popular_topics()
+    if not prefetch_topics:
+        logger.warning("PREFETCH_TOPICS=auto found no generated blogs, prefetching is disabled")
+else:
+    prefetch_topics = [topic.strip() for topic in prefetch_topics.split(",") if topic.strip()]
+prefetcher = TopicPrefetcher(agent_pool, prefetch_topics,
+                             interval=float(os.getenv("PREFETCH_INTERVAL", 6 * 3600))) if prefetch_topics else None
+prefetch_task = None
+
 # Global variable to store the current topic
 current_topic = "personal loan"
 
@@ -60,6 +84,12 @@ class BlogRequest(BaseModel):
     model: Optional[str] = "gpt-4o"
     save_to_file: Optional[bool] = False
     output_dir: Optional[str] = "generated_blogs"
+    session_id: Optional[str] = None
+
+class IngestRequest(BaseModel):
+    urls: List[str]
+    topic: Optional[str] = None
+    keyword: Optional[str] = None
 
 class BlogResponse(BaseModel):
     topic: str
@@ -69,6 +99,41 @@ class BlogResponse(BaseModel):
     generation_time: float
 
 
+@app.on_event("startup")
+async def start_ingest_queue():
+    """
+    Start the background ingestion workers, resuming unfinished jobs
+    """
+    if agent_pool.background_ingest:
+        await agent_pool.ingest_queue.start()
+
+@app.on_event("startup")
+async def start_prefetcher():
+    """
+    Start prefetching the configured hot topics in the background
+    """
+    global prefetch_task
+    if prefetcher is not None:
+        prefetch_task = asyncio.create_task(prefetcher.run_forever())
+
+@app.on_event("shutdown")
+async def stop_prefetcher():
+    """
+    Stop the prefetch loop
+    """
+    if prefetch_task is not None:
+        prefetch_task.cancel()
+        await asyncio.gather(prefetch_task, return_exceptions=True)
+
+@app.on_event("shutdown")
+async def stop_ingest_queue():
+    """
+    Stop the background ingestion workers (unfinished jobs resume on the next start)
+    """
+    # POST /ingest starts the queue even when background ingestion is disabled
+    if agent_pool.ingest_queue.running:
+        await agent_pool.ingest_queue.stop()
+
 @app.post("/generate")
 async def generate_blog(request: BlogRequest):
     """
@@ -78,15 +143,19 @@ async def generate_blog(request: BlogRequest):
         # Record start time
         start_time = time.time()
         
-        # Initialize the agent with requested parameters
-        agent = BlogAgent(
+        # Get an agent for the requested parameters from the shared pool
+        # (a new model is tested with a blocking call, so keep it off the event loop)
+        loop = asyncio.get_running_loop()
+        agent = await loop.run_in_executor(None, functools.partial(
+            agent_pool.get_agent,
             model_name=request.model,
-            temperature=request.temperature
-        )
+            temperature=request.temperature,
+            session_id=request.session_id
+        ))
         
         # Generate the blog and store topic globally
         global current_topic
-        current_topic = agent.User_input(request.topic)
+        current_topic = await agent.aUser_input(request.topic)
         print(f"Extracted topic: {current_topic}")
         
         async def generate_stream():
@@ -104,13 +173,13 @@ async def generate_blog(request: BlogRequest):
             # Save to file if requested
             file_path = None
             if request.save_to_file:
-                file_path = blog_tools.save_blog({
+                file_path = await loop.run_in_executor(None, blog_tools.save_blog, {
                     "topic": current_topic,
                     "content": "".join(collected_chunks),
                 }, request.output_dir)
             
             # Send final metadata
-            yield f"data: {json.dumps({'done': True, 'metadata': {'generation_time': round(generation_time, 2), 'file_path': file_path}})}\n\n"
+            yield f"data: {json.dumps({'done': True, 'metadata': {'generation_time': round(generation_time, 2), 'file_path': file_path, 'context': agent.last_context_report}})}\n\n"
         
         return StreamingResponse(
             generate_stream(),
@@ -120,6 +189,54 @@ async def generate_blog(request: BlogRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Blog generation failed: {str(e)}")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Per-stage latency histograms in the Prometheus text format
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm-cache/stats")
+async def llm_cache_stats():
+    """
+    Hit/miss metrics of the helper-prompt response cache
+    """
+    return agent_pool.llm_cache.stats()
+
+@app.post("/ingest")
+async def ingest(request: IngestRequest):
+    """
+    Queue URLs to be crawled and added to the vector store in the background
+    """
+    job = await agent_pool.ingest_queue.submit(request.urls, topic=request.topic, keyword=request.keyword)
+    return job.to_dict()
+
+@app.get("/ingest/stats")
+async def ingest_stats():
+    """
+    Job counts and embedding batch metrics of the ingestion queue
+    """
+    return agent_pool.ingest_queue.stats()
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    """
+    Status of an ingestion job
+    """
+    job = agent_pool.ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job: {job_id}")
+    return job.to_dict()
+
+@app.get("/prefetch/status")
+async def prefetch_status():
+    """
+    Seed topics and results of the last prefetch run
+    """
+    if prefetcher is None:
+        return {"enabled": False}
+    return {"enabled": True, "topics": prefetcher.topics, "interval": prefetcher.interval, "last_run": prefetcher.last_run}
+
 @app.get("/list-blogs")
 async def list_blogs(output_dir: Optional[str] = "generated_blogs"):
     """
@@ -143,7 +260,8 @@ async def generate_image(request: dict = None):
             raise HTTPException(status_code=400, detail="No topic available. Please generate a blog first.")
             
         # Generate the image using the current topic as the title
-        image_url = image_generator.generate_image(title=current_topic)
+        loop = asyncio.get_running_loop()
+        image_url = await loop.run_in_executor(None, functools.partial(image_generator.generate_image, title=current_topic))
         
         if not image_url:
             raise HTTPException(status_code=500, detail="Failed to generate image")
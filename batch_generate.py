@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import functools
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Import agent pool and tools
+from agent.pool import AgentPool
+from agent.tools import BlogTools
+
+def load_requests(path):
+    """
+    Read topic requests from a JSONL file.
+
+    Each line is a JSON object with a `topic` (or `title`) and optionally an
+    `id` (or `request_id`), `model`, `temperature` and `output_dir`.
+
+    Args:
+        path (str): JSONL file to read
+
+    Returns:
+        list: Request dicts, each with an `id` (the line number if none is given)
+    """
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            topic = entry.get("topic") or entry.get("title")
+            if not topic:
+                print(f"Skipping line {line_number}: no topic")
+                continue
+            entry["topic"] = topic
+            entry["id"] = str(entry.get("id") or entry.get("request_id") or line_number)
+            requests.append(entry)
+    return requests
+
+def load_checkpoint(path):
+    """
+    Read the results of a previous run.
+
+    Args:
+        path (str): Checkpoint JSONL file
+
+    Returns:
+        dict: Request id -> latest result
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            # A crash can leave the last line incomplete
+            if not line.endswith("\n"):
+                break
+            result = json.loads(line)
+            results[result["id"]] = result
+    return results
+
+class BatchRunner:
+    """
+    Generates blogs for many requests with bounded concurrency.
+
+    All requests share one AgentPool, so LLM clients, the response cache, the
+    embedding cache and the vector store are loaded once. With a pool using
+    background ingestion, crawled pages of all requests are embedded by the
+    queue's single embedding worker, and each request waits until its pages
+    are indexed. Each finished request is appended to a checkpoint file;
+    requests already completed there are skipped, so a crashed run resumes
+    where it stopped.
+    """
+    def __init__(self, agent_pool, tools, checkpoint_path, concurrency=3, model_name="gpt-4o",
+                 temperature=0.7, output_dir="generated_blogs"):
+        """
+        Initialize the batch runner.
+
+        Args:
+            agent_pool (AgentPool): Pool the agents are taken from
+            tools (BlogTools): Tools used to save the blogs
+            checkpoint_path (str): JSONL file results are appended to
+            concurrency (int): Maximum blogs generated at once
+            model_name (str): Default model for requests without one
+            temperature (float): Default temperature for requests without one
+            output_dir (str): Default output directory for requests without one
+        """
+        self.agent_pool = agent_pool
+        self.tools = tools
+        self.checkpoint_path = checkpoint_path
+        self.concurrency = concurrency
+        self.model_name = model_name
+        self.temperature = temperature
+        self.output_dir = output_dir
+
+    def _repair_checkpoint(self):
+        """Drop a partial last line left by a crash, so new results start on a line of their own."""
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _checkpoint(self, result):
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    async def generate(self, request):
+        """
+        Generate and save the blog for one request.
+
+        Args:
+            request (dict): Request with id and topic
+
+        Returns:
+            dict: Result with id, status, topic, file path and timings
+        """
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            agent = await loop.run_in_executor(None, functools.partial(
+                self.agent_pool.get_agent,
+                model_name=request.get("model", self.model_name),
+                temperature=request.get("temperature", self.temperature)
+            ))
+            if agent.ingest_queue is not None:
+                # Generate from the full crawl rather than whatever is indexed by the deadline
+                agent.ingest_deadline = None
+            # The requested topic is used as is, without LLM topic extraction
+            blog_data = await agent.agenerate_blog(request["topic"], extract_topic=False)
+            file_path = await loop.run_in_executor(None, self.tools.save_blog, blog_data,
+                                                   request.get("output_dir", self.output_dir))
+            result = {
+                "id": request["id"],
+                "status": "done",
+                "topic": blog_data["topic"],
+                "file_path": file_path,
+                "timings": dict(blog_data["timings"] or {}, seconds=round(time.time() - start_time, 2))
+            }
+        except Exception as e:
+            result = {
+                "id": request["id"],
+                "status": "failed",
+                "topic": request["topic"],
+                "error": str(e),
+                "timings": {"seconds": round(time.time() - start_time, 2)}
+            }
+        self._checkpoint(result)
+        print(f"[{result['status']}] {request['id']}: {result['topic']} ({result['timings']['seconds']}s)")
+        return result
+
+    async def run(self, requests):
+        """
+        Generate blogs for every request not completed in the checkpoint.
+
+        Args:
+            requests (list): Requests from load_requests
+
+        Returns:
+            list: Results of this run, in request order
+        """
+        self._repair_checkpoint()
+        completed = {request_id for request_id, result in load_checkpoint(self.checkpoint_path).items()
+                     if result["status"] == "done"}
+        pending = [request for request in requests if request["id"] not in completed]
+        if len(pending) < len(requests):
+            print(f"Resuming: {len(requests) - len(pending)} of {len(requests)} requests already done")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def generate_one(request):
+            async with semaphore:
+                return await self.generate(request)
+
+        ingest_queue = self.agent_pool.ingest_queue if self.agent_pool.background_ingest else None
+        if ingest_queue is not None:
+            await ingest_queue.start()
+        try:
+            return await asyncio.gather(*(generate_one(request) for request in pending))
+        finally:
+            if ingest_queue is not None:
+                await ingest_queue.stop()
+
+def print_summary(results, wall_time):
+    """Print per-request timings and totals."""
+    if not results:
+        print("Nothing to do")
+        return
+    print(f"\n{'id':<12} {'status':<7} {'total':>7} {'pipeline':>9} {'1st tok':>8}  topic")
+    for result in results:
+        timings = result["timings"]
+        print(f"{result['id']:<12} {result['status']:<7} {timings['seconds']:>7.2f} "
+              f"{timings.get('pipeline', float('nan')):>9.2f} {timings.get('first_token', float('nan')):>8.2f}  "
+              f"{result['topic']}")
+
+    done = [result["timings"]["seconds"] for result in results if result["status"] == "done"]
+    print(f"\n{len(done)} done, {len(results) - len(done)} failed in {wall_time:.2f}s wall time")
+    if done:
+        done.sort()
+        print(f"Per blog: mean {sum(done) / len(done):.2f}s, median {done[len(done) // 2]:.2f}s, max {done[-1]:.2f}s")
+
+def main():
+    """Generate blogs for every topic in a JSONL file"""
+    parser = argparse.ArgumentParser(description='Generate blog posts for a batch of topics')
+
+    parser.add_argument('requests_file', type=str, help='JSONL file with one topic request per line')
+    parser.add_argument('--concurrency', '-c', type=int, default=3, help='Blogs generated at once (default: 3)')
+    parser.add_argument('--checkpoint', type=str,
+                        help='Checkpoint file for resuming (default: <requests_file>.progress.jsonl)')
+    parser.add_argument('--model', type=str, default='gpt-4o', help='Default model (default: gpt-4o)')
+    parser.add_argument('--temperature', type=float, default=0.7, help='Default temperature (default: 0.7)')
+    parser.add_argument('--output-dir', '-o', type=str, default='generated_blogs',
+                        help='Default directory to save blogs to (default: generated_blogs)')
+
+    args = parser.parse_args()
+
+    requests = load_requests(args.requests_file)
+    runner = BatchRunner(
+        # Ingest through the pool's queue, so concurrent requests never embed into the store at once
+        AgentPool(background_ingest=True),
+        BlogTools(default_output_dir=args.output_dir),
+        args.checkpoint or f"{args.requests_file}.progress.jsonl",
+        concurrency=args.concurrency,
+        model_name=args.model,
+        temperature=args.temperature,
+        output_dir=args.output_dir
+    )
+
+    print(f"Generating {len(requests)} blogs with concurrency {args.concurrency}")
+    start_time = time.time()
+    results = asyncio.run(runner.run(requests))
+    print_summary(results, time.time() - start_time)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+# Asynchronous web content crawler
+import asyncio
+import functools
+import time
+import logging
+from urllib.parse import urlparse
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, ClientError
+from .crawler import Crawler
+from .parse_pool import get_parse_pool
+from metrics import span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('async_crawler')
+
+class DomainRateLimiter:
+    """Keeps requests to the same domain at least `delay` seconds apart."""
+
+    def __init__(self, delay=1.0):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            delay (float): Minimum seconds between requests to one domain
+        """
+        self.delay = delay
+        self._locks = {}
+        self._next_slot = {}
+
+    async def wait(self, domain):
+        """
+        Wait until a request to the given domain is allowed.
+
+        Args:
+            domain (str): Domain about to be requested
+        """
+        lock = self._locks.setdefault(domain, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = self._next_slot.get(domain, now)
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            self._next_slot[domain] = max(slot, now) + self.delay
+
+class AsyncCrawler:
+    """
+    Concurrent crawler that fetches pages with a shared keep-alive connection pool.
+
+    Total in-flight requests are bounded by `max_concurrency`, and requests to the
+    same domain are spaced by `per_domain_delay` instead of a global sleep.
+    """
+
+    def __init__(self, max_concurrency=8, per_domain_delay=1.0, timeout=15, crawler=None, parse_pool=None):
+        """
+        Initialize the async crawler.
+
+        Args:
+            max_concurrency (int): Maximum number of concurrent requests
+            per_domain_delay (float): Minimum seconds between requests to the same domain
+            timeout (int): Request timeout in seconds
+            crawler (Crawler): Crawler used for formatting content (optional)
+            parse_pool (ParsePool): Process pool used for HTML parsing (defaults to the shared pool)
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.crawler = crawler or Crawler()
+        self.parse_pool = parse_pool or get_parse_pool()
+        self.rate_limiter = DomainRateLimiter(per_domain_delay)
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        """Create the pooled HTTP session on first use."""
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(limit=self.max_concurrency, ttl_dns_cache=300)
+            self._session = ClientSession(
+                connector=connector,
+                headers=self.crawler.headers,
+                timeout=ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def close(self):
+        """Close the pooled HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def fetch_html(self, url, headers=None):
+        """
+        Fetch the raw HTML of a URL.
+
+        Args:
+            url (str): URL to fetch
+            headers (dict): Extra request headers (e.g. cache validators)
+
+        Returns:
+            tuple: (status, html, response headers); html is None for 304 or non-HTML responses
+        """
+        session = self._get_session()
+        await self.rate_limiter.wait(urlparse(url).netloc)
+
+        async with self._semaphore:
+            logger.info(f"Fetching URL: {url}")
+            with span("crawl.fetch"):
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304:
+                        return response.status, None, response.headers
+                    response.raise_for_status()
+
+                    # Check content type
+                    content_type = response.headers.get('Content-Type', '')
+                    if 'text/html' not in content_type:
+                        logger.info(f"Skipping non-HTML content: {content_type}")
+                        return response.status, None, response.headers
+
+                    return response.status, await response.text(errors='replace'), response.headers
+
+    async def _cache_call(self, func, *args, **kwargs):
+        """Run a blocking page cache operation in the default executor, off the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def crawl_content(self, url):
+        """
+        Crawl a URL and extract textual content.
+
+        Args:
+            url (str): URL to crawl
+
+        Returns:
+            str: Cleaned content or None if failed
+        """
+        # Validate URL
+        if not url or not url.startswith(('http://', 'https://')):
+            logger.warning(f"Invalid URL: {url}")
+            return None
+
+        # Serve fresh pages straight from the cache
+        cache = self.crawler.get_cache()
+        cached = await self._cache_call(cache.get, url) if cache else None
+        if cached and cache.is_fresh(cached):
+            logger.info(f"Cache hit for {url}")
+            return cached["content"]
+
+        try:
+            # Fetch the page, revalidating any stale cached copy
+            status, html, headers = await self.fetch_html(url, cache.validators(cached) if cache else None)
+            if status == 304 and cached:
+                logger.info(f"Not modified, reusing cached content for {url}")
+                await self._cache_call(cache.touch, url, cached)
+                return cached["content"]
+            if html is None:
+                return None
+
+            with span("crawl.parse"):
+                content = await self.parse_pool.parse(url, html)
+            if cache:
+                await self._cache_call(cache.put, url, html, content,
+                                       etag=headers.get('ETag'),
+                                       last_modified=headers.get('Last-Modified'))
+            return content
+
+        except asyncio.TimeoutError:
+            logger.error(f"Timeout fetching {url}")
+            return None
+
+        except ClientError as e:
+            logger.error(f"Error fetching {url}: {e}")
+            return None
+
+        except Exception as e:
+            logger.error(f"Unexpected error processing {url}: {e}")
+            return None
+
+    async def iter_crawl(self, urls):
+        """
+        Crawl URLs concurrently, yielding each result as soon as it completes.
+
+        Args:
+            urls (list): URLs to crawl
+
+        Yields:
+            tuple: (url, content) where content is None if crawling failed
+        """
+        async def crawl(url):
+            with span("crawl.page"):
+                return url, await self.crawl_content(url)
+
+        tasks = [asyncio.create_task(crawl(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def process_urls(self, urls):
+        """
+        Crawl URLs concurrently and concatenate their content.
+
+        Args:
+            urls (list): URLs to process
+
+        Returns:
+            str: Concatenated content from all URLs
+        """
+        if not urls:
+            logger.warning("No URLs provided for processing")
+            return ""
+
+        logger.info(f"Processing {len(urls)} URLs")
+
+        all_content = []
+        async for url, content in self.iter_crawl(urls):
+            if content:
+                all_content.append(self.crawler.format_content(url, content))
+            else:
+                logger.warning(f"No content extracted from {url}")
+
+        return self.crawler.join_content(all_content, len(urls))
+
+    async def crawl_documents(self, urls, **metadata):
+        """
+        Crawl URLs concurrently and keep each page as its own Document.
+
+        Args:
+            urls (list): URLs to process
+            **metadata: Metadata added to every page (e.g. topic, keyword)
+
+        Returns:
+            list: One Document per successfully crawled page, with url, domain,
+                  crawled_at and the given metadata
+        """
+        if not urls:
+            logger.warning("No URLs provided for processing")
+            return []
+
+        logger.info(f"Processing {len(urls)} URLs")
+
+        cache = self.crawler.get_cache()
+        documents = []
+        async for url, content in self.iter_crawl(urls):
+            if not content:
+                logger.warning(f"No content extracted from {url}")
+                continue
+            # Pages served from the cache keep the time they were actually fetched
+            entry = await self._cache_call(cache.get, url) if cache else None
+            crawled_at = entry.get("fetched_at") if entry else None
+            documents.append(self.crawler.page_document(url, content, crawled_at=crawled_at, **metadata))
+
+        logger.info(f"Crawled {len(documents)}/{len(urls)} pages")
+        return documents
@@ -2,6 +2,7 @@ from .get_topic import TopTopics
 from .get_link import BlogLinkFetcher
 from .get_topic_v2 import TopicExtractor
 from .crawler import Crawler
+from .async_crawler import AsyncCrawler
 from .trend_api import GoogleTrendsScraper
 import os
 import logging
@@ -33,6 +34,36 @@ class BlogContentExtractor:
         except Exception as e:
             logger.error(f"Error in fetch_blog_content: {e}")
             return ""
+
+    async def fetch_blog_content_async(self, blogs_urls):
+        # Concurrent crawling on the event loop
+        try:
+            logger.info(f"Found {len(blogs_urls)} URLs to crawl")
+
+            if blogs_urls:
+                async with AsyncCrawler() as crawler:
+                    return await crawler.process_urls(blogs_urls)
+            else:
+                logger.warning("No URLs found to crawl")
+                return ""
+        except Exception as e:
+            logger.error(f"Error in fetch_blog_content_async: {e}")
+            return ""
+
+    async def fetch_blog_documents_async(self, blogs_urls, topic=None, keyword=None):
+        # One Document per page so chunks keep their source metadata
+        try:
+            logger.info(f"Found {len(blogs_urls)} URLs to crawl")
+
+            if blogs_urls:
+                async with AsyncCrawler() as crawler:
+                    return await crawler.crawl_documents(blogs_urls, topic=topic, keyword=keyword)
+            else:
+                logger.warning("No URLs found to crawl")
+                return []
+        except Exception as e:
+            logger.error(f"Error in fetch_blog_documents_async: {e}")
+            return []
         
     
 
@@ -1,29 +1,62 @@
 # Web content crawler
 import requests
 from bs4 import BeautifulSoup
+from langchain_core.documents import Document
 from urllib.parse import urlparse
 import re
 import time
 import logging
+from .page_cache import get_page_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('crawler')
 
+# Elements kept as separate blocks of the extracted text
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+BLOCK_TAGS = HEADING_TAGS + ['p', 'li', 'blockquote', 'pre']
+
+def resolve_parser(parser="auto"):
+    """
+    Pick the BeautifulSoup parser backend.
+    
+    Args:
+        parser (str): 'auto', 'lxml', 'html5lib' or 'html.parser'
+        
+    Returns:
+        str: Parser name to pass to BeautifulSoup
+    """
+    if parser != "auto":
+        return parser
+    try:
+        import lxml  # noqa: F401
+        return "lxml"
+    except ImportError:
+        return "html.parser"
+
 class Crawler:
     """Web content crawler that extracts text from web pages."""
     
-    def __init__(self, urls=None):
+    def __init__(self, urls=None, per_domain_delay=1.0, parser="auto", cache=None, use_cache=True):
         """
         Initialize the crawler with a list of URLs.
         
         Args:
             urls (list): List of URLs to crawl (optional)
+            per_domain_delay (float): Minimum seconds between requests to the same domain
+            parser (str): BeautifulSoup parser backend ('auto' prefers lxml when installed)
+            cache (PageCache): Page cache to use (defaults to the shared cache)
+            use_cache (bool): Whether to cache crawled pages at all
         """
         self.urls = urls or []
+        self.per_domain_delay = per_domain_delay
+        self.parser = resolve_parser(parser)
+        self.cache = cache
+        self.use_cache = use_cache
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self._last_request = {}
         
     def clean_text(self, text):
         """
@@ -46,6 +79,50 @@ class Crawler:
         
         return '\n'.join(lines)
 
+    def structured_text(self, element):
+        """
+        Extract text from an element keeping its block structure.
+        
+        Headings become markdown headings, list items become "- " lines and
+        paragraphs are separated by blank lines, so chunking can split on
+        structure instead of character counts.
+        
+        Args:
+            element: BeautifulSoup element to extract from
+            
+        Returns:
+            str: Structured text, or None if it holds too little of the element's text
+        """
+        blocks = []
+        for block in element.find_all(BLOCK_TAGS):
+            # Only leaf blocks, so nested blocks are not emitted twice
+            if block.find(BLOCK_TAGS):
+                continue
+            text = re.sub(r'\s+', ' ', block.get_text()).strip()
+            if not text:
+                continue
+            if block.name in HEADING_TAGS:
+                blocks.append(('#' * int(block.name[1]) + ' ' + text, False))
+            elif block.name == 'li':
+                blocks.append(('- ' + text, True))
+            elif len(text) > 40:
+                # Very short paragraphs are likely navigation or widgets
+                blocks.append(('> ' + text if block.name == 'blockquote' else text, False))
+        
+        if not blocks:
+            return None
+        
+        # Pages that keep their text in bare divs lose most of it here
+        structured_length = sum(len(text) for text, _ in blocks)
+        if structured_length < 0.5 * len(self.clean_text(element.get_text())):
+            return None
+        
+        parts = [blocks[0][0]]
+        for (text, is_item), (_, previous_is_item) in zip(blocks[1:], blocks):
+            # Consecutive list items stay together as one list
+            parts.append(('\n' if is_item and previous_is_item else '\n\n') + text)
+        return ''.join(parts)
+
     def extract_article_content(self, soup):
         """
         Extract the main article content using common patterns.
@@ -59,12 +136,12 @@ class Crawler:
         # Strategy 1: Look for article tag
         article = soup.find('article')
         if article:
-            return self.clean_text(article.get_text())
+            return self.structured_text(article) or self.clean_text(article.get_text())
         
         # Strategy 2: Look for main tag
         main = soup.find('main')
         if main:
-            return self.clean_text(main.get_text())
+            return self.structured_text(main) or self.clean_text(main.get_text())
         
         # Strategy 3: Look for common content div classes/ids
         content_selectors = [
@@ -75,17 +152,49 @@ class Crawler:
         for selector in content_selectors:
             content = soup.select_one(selector)
             if content:
-                return self.clean_text(content.get_text())
+                return self.structured_text(content) or self.clean_text(content.get_text())
         
         # Strategy 4: Extract meaningful paragraphs
         paragraphs = soup.find_all('p')
         if paragraphs:
-            meaningful_paragraphs = [p.get_text() for p in paragraphs if len(p.get_text()) > 50]
+            meaningful_paragraphs = [re.sub(r'\s+', ' ', p.get_text()).strip()
+                                     for p in paragraphs if len(p.get_text()) > 50]
             if meaningful_paragraphs:
-                return self.clean_text('\n'.join(meaningful_paragraphs))
+                return '\n\n'.join(meaningful_paragraphs)
         
         return None
 
+    def parse_html(self, url, html):
+        """
+        Parse an HTML page and extract its main textual content.
+        
+        Args:
+            url (str): URL the page was fetched from
+            html (str): Raw HTML of the page
+            
+        Returns:
+            str: Cleaned content
+        """
+        # Parse HTML
+        soup = BeautifulSoup(html, self.parser)
+        
+        # Remove non-content elements
+        for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe']):
+            element.decompose()
+        
+        # Extract content
+        article_content = self.extract_article_content(soup)
+        
+        if article_content:
+            domain = urlparse(url).netloc
+            logger.info(f"Extracted {len(article_content)} chars from {domain}")
+            return article_content
+        
+        # Fallback to all text
+        logger.info("No structured content found, extracting all text")
+        texts = list(soup.stripped_strings)
+        return self.clean_text('\n'.join(texts))
+
     def crawl_content(self, url, timeout=15):
         """
         Crawl a URL and extract textual content.
@@ -102,10 +211,25 @@ class Crawler:
             logger.warning(f"Invalid URL: {url}")
             return None
         
+        # Serve fresh pages straight from the cache
+        cache = self.get_cache()
+        cached = cache.get(url) if cache else None
+        if cached and cache.is_fresh(cached):
+            logger.info(f"Cache hit for {url}")
+            return cached["content"]
+        
         try:
-            # Fetch the page
+            # Fetch the page, revalidating any stale cached copy
+            self._wait_for_domain(urlparse(url).netloc)
             logger.info(f"Fetching URL: {url}")
-            response = requests.get(url, headers=self.headers, timeout=timeout)
+            headers = dict(self.headers, **(cache.validators(cached) if cache else {}))
+            response = requests.get(url, headers=headers, timeout=timeout)
+            
+            if response.status_code == 304 and cached:
+                logger.info(f"Not modified, reusing cached content for {url}")
+                cache.touch(url, cached)
+                return cached["content"]
+            
             response.raise_for_status()
             
             # Check content type
@@ -114,25 +238,12 @@ class Crawler:
                 logger.info(f"Skipping non-HTML content: {content_type}")
                 return None
             
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove non-content elements
-            for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'iframe']):
-                element.decompose()
-            
-            # Extract content
-            article_content = self.extract_article_content(soup)
-            
-            if article_content:
-                domain = urlparse(url).netloc
-                logger.info(f"Extracted {len(article_content)} chars from {domain}")
-                return article_content
-            
-            # Fallback to all text
-            logger.info("No structured content found, extracting all text")
-            texts = list(soup.stripped_strings)
-            return self.clean_text('\n'.join(texts))
+            content = self.parse_html(url, response.text)
+            if cache:
+                cache.put(url, response.text, content,
+                          etag=response.headers.get('ETag'),
+                          last_modified=response.headers.get('Last-Modified'))
+            return content
             
         except requests.exceptions.Timeout:
             logger.error(f"Timeout fetching {url}")
@@ -169,34 +280,101 @@ class Crawler:
         logger.info(f"Processing {len(urls_to_process)} URLs")
         
         all_content = []
-        successful_crawls = 0
         
         for url in urls_to_process:
             try:
                 content = self.crawl_content(url)
                 
                 if content:
-                    domain = urlparse(url).netloc
-                    content_length = len(content)
-                    logger.info(f"Successfully crawled {domain} ({content_length} chars)")
-                    
-                    # Add domain as context before the content
-                    formatted_content = f"Source: {domain}\n\n{content}"
-                    all_content.append(formatted_content)
-                    successful_crawls += 1
+                    all_content.append(self.format_content(url, content))
                 else:
                     logger.warning(f"No content extracted from {url}")
                 
             except Exception as e:
                 logger.error(f"Error processing URL {url}: {e}")
+        
+        return self.join_content(all_content, len(urls_to_process))
+
+    def get_cache(self):
+        """
+        Get the page cache used by this crawler.
+        
+        Returns:
+            PageCache: The page cache, or None if caching is disabled
+        """
+        if not self.use_cache:
+            return None
+        if self.cache is None:
+            self.cache = get_page_cache()
+        return self.cache
+
+    def _wait_for_domain(self, domain):
+        """
+        Sleep only as long as needed to keep requests to one domain apart (be nice to servers).
+        
+        Args:
+            domain (str): Domain about to be requested
+        """
+        last_request = self._last_request.get(domain)
+        if last_request is not None:
+            remaining = self.per_domain_delay - (time.monotonic() - last_request)
+            if remaining > 0:
+                time.sleep(remaining)
+        self._last_request[domain] = time.monotonic()
+
+    def format_content(self, url, content):
+        """
+        Prefix crawled content with its source domain.
+        
+        Args:
+            url (str): URL the content came from
+            content (str): Extracted content
             
-            # Be nice to servers
-            time.sleep(1)
+        Returns:
+            str: Content with a source header
+        """
+        domain = urlparse(url).netloc
+        logger.info(f"Successfully crawled {domain} ({len(content)} chars)")
+        
+        # Add domain as context before the content
+        return f"Source: {domain}\n\n{content}"
+
+    def page_document(self, url, content, crawled_at=None, **metadata):
+        """
+        Wrap one crawled page as a Document carrying its source metadata.
+        
+        Args:
+            url (str): URL the content came from
+            content (str): Extracted content
+            crawled_at (float): Unix time the page was fetched (defaults to now)
+            **metadata: Extra metadata such as topic and keyword
+            
+        Returns:
+            Document: Page content with url, domain and crawled_at metadata
+        """
+        metadata = {key: value for key, value in metadata.items() if value is not None}
+        metadata.update({
+            "url": url,
+            "domain": urlparse(url).netloc,
+            "crawled_at": crawled_at if crawled_at is not None else time.time()
+        })
+        return Document(page_content=content, metadata=metadata)
+
+    def join_content(self, all_content, total_urls):
+        """
+        Join formatted page contents into a single string.
         
+        Args:
+            all_content (list): Formatted content of each successfully crawled page
+            total_urls (int): Number of URLs that were attempted
+            
+        Returns:
+            str: Concatenated content from all pages
+        """
         # Join all content with separators
         final_content = "\n\n" + "-" * 40 + "\n\n".join(all_content) if all_content else ""
         
-        logger.info(f"Total content: {len(final_content)} chars from {successful_crawls}/{len(urls_to_process)} URLs")
+        logger.info(f"Total content: {len(final_content)} chars from {len(all_content)}/{total_urls} URLs")
         return final_content
 
     # if __name__ == '__main__':
@@ -1,9 +1,9 @@
 import json
 
 class TopicExtractor:
-    def __init__(self, json_file):
+    def __init__(self, json_file=None, data=None):
         self.json_file = json_file
-        self.data = self._load_json()
+        self.data = data if data is not None else self._load_json()
 
     def _load_json(self):
         with open(self.json_file, 'r', encoding='utf-8') as file:
@@ -1,32 +1,119 @@
 import os
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from .lookup_cache import LookupCache, SingleFlight, normalize_query
+from metrics import span
 
 load_dotenv()
 
+# The Custom Search API returns at most 10 results per request
+PAGE_SIZE = 10
+
+# Shared across instances so connections to googleapis.com are reused
+_session = None
+_session_lock = threading.Lock()
+_links_cache = None
+_links_flight = SingleFlight()
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("https://", adapter)
+        return _session
+
+def get_links_cache():
+    global _links_cache
+    with _session_lock:
+        if _links_cache is None:
+            _links_cache = LookupCache("google_custom_search", ttl=6 * 3600)
+        return _links_cache
+
 class GoogleQuerySearch:
-    def __init__(self, num_of_res=10):
+    def __init__(self, num_of_res=10, timeout=10, use_cache=True):
         self.google_api_key = os.getenv("GOOGLE_SEARCH_API")
         self.google_cx = os.getenv("GOOGLE_CX")
         self.num_of_res = num_of_res
+        self.timeout = timeout
+        self.use_cache = use_cache
     
     def google_search(self, query):
+        """
+        Search blog links for a query.
+
+        More than 10 results are fetched as pages of 10 in parallel. Results
+        are cached per query, and concurrent identical searches share one set
+        of requests.
+
+        Args:
+            query (str): Keyword to search blogs for
+
+        Returns:
+            list: Result links in ranking order
+        """
+        key = f"{self.num_of_res}:{normalize_query(query)}"
+        cache = get_links_cache() if self.use_cache else None
+        if cache:
+            results = cache.get(key)
+            if results is not None:
+                print(f"Found {len(results)} cached results for query: {query}")
+                return results
+        return _links_flight.do(key, self._search_and_cache, query, key, cache)
+
+    def _search_and_cache(self, query, key, cache):
+        # A caller that waited for another search may find it cached now
+        if cache:
+            results = cache.get(key)
+            if results is not None:
+                return results
+
         search_query = f'"{query}" (intitle:"{query}" OR intext:"{query}") (inurl:blog OR site:medium.com OR site:wordpress.com OR site:blogspot.com OR site:hashnode.com OR site:dev.to) -inurl:/tag/ -inurl:/category/ -inurl:/topics/ -inurl:/labels/ -inurl:/groups/ -inurl:/collections/  -inurl:/blog/  -inurl:/blogs/'
-        
+
+        # Result offsets are 1-based: 1, 11, 21, ...
+        pages = [(start, min(PAGE_SIZE, self.num_of_res - start + 1))
+                 for start in range(1, self.num_of_res + 1, PAGE_SIZE)]
+        if len(pages) == 1:
+            page_results = [self._fetch_page(query, search_query, *pages[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=len(pages)) as executor:
+                page_results = list(executor.map(lambda page: self._fetch_page(query, search_query, *page), pages))
+
+        results = []
+        for links in page_results:
+            for link in links or []:
+                if link and link not in results:
+                    results.append(link)
+        print(f"Found {len(results)} results for query: {query}")
+
+        # Only cache complete answers so failed pages are retried next time
+        if cache and results and all(links is not None for links in page_results):
+            cache.set(key, results)
+        return results
+
+    def _fetch_page(self, query, search_query, start, num):
         url = "https://www.googleapis.com/customsearch/v1"
         params = {
             "key": self.google_api_key, 
             "cx": self.google_cx,
             "q": search_query,
-            "num": self.num_of_res
+            "num": num,
+            "start": start
         } 
 
-        response = requests.get(url, params=params)
+        try:
+            with span("search.cse_page"):
+                response = get_session().get(url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"Failed for query: {query} (start={start}) | Error: {e}")
+            return None
         if response.status_code == 200:
             res = response.json().get("items",[])
-            results = [item.get("link") for item in res]
-            print(f"Found {len(results)} results for query: {query}")
-            return results
+            return [item.get("link") for item in res]
         else:
-            print(f"Failed for query: {query} | Status Code: {response.status_code}")
-            return []
+            print(f"Failed for query: {query} (start={start}) | Status Code: {response.status_code}")
+            return None
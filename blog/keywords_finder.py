@@ -4,12 +4,15 @@ import os
 import json
 
 class KeywordsFinder:
-    def __init__(self):
+    def __init__(self, save_results=False):
         self.scraper = GoogleTrendsScraper()
+        self.save_results = save_results
     
     def find_keywords(self, query):        
-        self.scraper.fetch_related_topics(query)
-        extractor = TopicExtractor("./blog/related_topics.json")
+        # Topics come back in memory; the JSON file is only written on request
+        output_file = "./blog/related_topics.json" if self.save_results else None
+        related_topics = self.scraper.fetch_related_topics(query, output_file=output_file)
+        extractor = TopicExtractor(data=related_topics)
         top_topics = extractor.get_top_topics()
         return top_topics
 
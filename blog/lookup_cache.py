@@ -0,0 +1,170 @@
+# TTL cache and request coalescing for search API lookups
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('lookup_cache')
+
+# Root of the project, so the cache does not depend on the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class LookupCache:
+    """
+    Two-tier TTL cache for JSON-serializable lookup results.
+
+    Entries live in a bounded in-memory LRU and in a SQLite table shared by all
+    processes, so a restart (or another worker) does not pay for the same
+    upstream call again. Each cache has a `namespace` so several lookups can
+    share one database file.
+    """
+
+    def __init__(self, namespace, ttl=24 * 3600, cache_path=".cache/lookups.sqlite", max_memory_entries=1024):
+        """
+        Initialize the lookup cache.
+
+        Args:
+            namespace (str): Name separating this cache's keys from others in the same file
+            ttl (int): Seconds an entry stays valid
+            cache_path (str): SQLite file for the persistent tier, relative to the project root
+                (None for memory only)
+            max_memory_entries (int): Maximum number of entries kept in memory
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.cache_path = os.path.join(PROJECT_ROOT, cache_path) if cache_path else None
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if self.cache_path:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.cache_path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS lookups (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._conn.commit()
+
+    def _remember(self, key, value, expires):
+        self._memory[key] = (value, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """
+        Get a cached value.
+
+        Args:
+            key (str): Lookup key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    return entry[0]
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT value, expires FROM lookups WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def set(self, key, value):
+        """
+        Cache a value.
+
+        Args:
+            key (str): Lookup key
+            value: JSON-serializable value
+        """
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value, ensure_ascii=False), expires)
+                )
+                self._conn.execute("DELETE FROM lookups WHERE expires <= ?", (time.time(),))
+                self._conn.commit()
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one upstream call.
+
+    The first caller runs the function; callers arriving while it is in flight
+    wait for it and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Run `func` for `key` unless a call for it is already in flight.
+
+        Args:
+            key: Key identifying the call
+            func: Function to run
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            The function's result
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"done": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+
+        if not leader:
+            logger.info(f"Waiting for in-flight lookup of {key!r}")
+            call["done"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func(*args, **kwargs)
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["done"].set()
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive cache key for a search query."""
+    return " ".join(query.lower().split())
@@ -0,0 +1,253 @@
+# On-disk cache for crawled pages
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('page_cache')
+
+# Relative cache directories are resolved against the project root, not the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class PageCache:
+    """
+    Content-addressed on-disk cache of crawled pages.
+
+    Each URL is stored under the SHA-256 of the URL as two files: the raw HTML
+    and a JSON entry holding the extracted text plus the ETag/Last-Modified
+    validators. Fresh entries (younger than `ttl`) are served without touching
+    the network; stale ones are revalidated with a conditional GET. The least
+    recently used entries are evicted once the cache exceeds `max_bytes`.
+    The cache size is tracked as entries are written, so the directory is only
+    scanned when eviction is actually needed; eviction then frees space down
+    to `low_watermark` of `max_bytes` so it does not rerun on every write.
+    """
+
+    def __init__(self, cache_dir=".cache/pages", ttl=24 * 3600, max_bytes=200 * 1024 * 1024, low_watermark=0.9):
+        """
+        Initialize the page cache.
+
+        Args:
+            cache_dir (str): Directory to store cached pages in (relative to the project root)
+            ttl (int): Seconds a cached page is served without revalidation
+            max_bytes (int): Maximum total size of the cache on disk
+            low_watermark (float): Fraction of max_bytes eviction frees space down to
+        """
+        self.cache_dir = os.path.join(PROJECT_ROOT, cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.low_watermark = low_watermark
+        self._lock = threading.Lock()
+        # Bytes on disk, scanned on the first write and tracked incrementally afterwards
+        self._size = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _paths(self, url):
+        key = self._key(url)
+        return (os.path.join(self.cache_dir, f"{key}.json"),
+                os.path.join(self.cache_dir, f"{key}.html"))
+
+    def _file_size(self, path):
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    def _track(self, delta):
+        """Account for bytes written or removed, evicting once the cache is over its limit."""
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += delta
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, url):
+        """
+        Look up a cached page and mark it as recently used.
+
+        Args:
+            url (str): URL of the page
+
+        Returns:
+            dict: Cache entry (url, content, etag, last_modified, fetched_at) or None
+        """
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(meta_path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+
+    def get_raw(self, url):
+        """
+        Get the raw HTML stored for a URL.
+
+        Args:
+            url (str): URL of the page
+
+        Returns:
+            str: Raw HTML or None if not cached
+        """
+        _, html_path = self._paths(url)
+        try:
+            with open(html_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def is_fresh(self, entry):
+        """
+        Check whether an entry can be served without revalidation.
+
+        Args:
+            entry (dict): Cache entry
+
+        Returns:
+            bool: True if the entry is younger than the TTL
+        """
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def validators(self, entry):
+        """
+        Build conditional request headers for a cached entry.
+
+        Args:
+            entry (dict): Cache entry (may be None)
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers
+        """
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, html, content, etag=None, last_modified=None):
+        """
+        Store a fetched page and its extracted text.
+
+        Args:
+            url (str): URL of the page
+            html (str): Raw HTML
+            content (str): Extracted text
+            etag (str): ETag response header
+            last_modified (str): Last-Modified response header
+        """
+        meta_path, html_path = self._paths(url)
+        entry = {
+            "url": url,
+            "content": content,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time()
+        }
+        try:
+            previous = self._file_size(meta_path) + self._file_size(html_path)
+            self._write_atomic(html_path, html)
+            self._write_atomic(meta_path, json.dumps(entry))
+            self._track(self._file_size(meta_path) + self._file_size(html_path) - previous)
+        except Exception as e:
+            logger.warning(f"Failed to cache {url}: {e}")
+
+    def touch(self, url, entry):
+        """
+        Mark an entry as revalidated (e.g. after a 304 Not Modified).
+
+        Args:
+            url (str): URL of the page
+            entry (dict): Cache entry to refresh
+        """
+        meta_path, _ = self._paths(url)
+        entry = dict(entry, fetched_at=time.time())
+        try:
+            previous = self._file_size(meta_path)
+            self._write_atomic(meta_path, json.dumps(entry))
+            self._track(self._file_size(meta_path) - previous)
+        except Exception as e:
+            logger.warning(f"Failed to refresh cache entry for {url}: {e}")
+
+    def _scan(self):
+        """
+        Measure the cache directory.
+
+        Returns:
+            tuple: (dict of key -> (size, last use time), total size in bytes)
+        """
+        entries = {}
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            key, ext = os.path.splitext(name)
+            if ext not in (".json", ".html"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            size, atime = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(atime, stat.st_mtime) if ext == ".json" else atime)
+            total += stat.st_size
+        return entries, total
+
+    def evict(self):
+        """Remove least recently used entries once the cache exceeds max_bytes."""
+        with self._lock:
+            # Rescan, as other processes may share the directory
+            entries, total = self._scan()
+            if total > self.max_bytes:
+                target = self.max_bytes * self.low_watermark
+                for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+                    for ext in (".json", ".html"):
+                        path = os.path.join(self.cache_dir, key + ext)
+                        if os.path.exists(path):
+                            os.remove(path)
+                    total -= size
+                    if total <= target:
+                        break
+                logger.info(f"Evicted page cache down to {total} bytes")
+            self._size = total
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_page_cache():
+    """
+    Get the process-wide page cache.
+
+    Returns:
+        PageCache: Shared page cache
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageCache()
+        return _default_cache
@@ -0,0 +1,107 @@
+# Process pool for CPU-bound HTML parsing
+import asyncio
+import multiprocessing
+import os
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .crawler import Crawler, resolve_parser
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('parse_pool')
+
+_worker_crawlers = {}
+
+def parse_page(url, html, parser):
+    """
+    Parse a page in a worker process.
+
+    Args:
+        url (str): URL the page was fetched from
+        html (str): Raw HTML of the page
+        parser (str): BeautifulSoup parser backend
+
+    Returns:
+        str: Cleaned content
+    """
+    crawler = _worker_crawlers.get(parser)
+    if crawler is None:
+        crawler = _worker_crawlers[parser] = Crawler(parser=parser)
+    return crawler.parse_html(url, html)
+
+class ParsePool:
+    """
+    Runs HTML parsing and text extraction in a ProcessPoolExecutor so it
+    scales across cores and never blocks the event loop.
+
+    Workers are started with forkserver (spawn where it is unavailable):
+    forking the threaded server process could copy locks held by other
+    threads into the workers.
+    """
+
+    def __init__(self, max_workers=None, parser="auto"):
+        """
+        Initialize the parse pool.
+
+        Args:
+            max_workers (int): Number of worker processes (defaults to the CPU count)
+            parser (str): BeautifulSoup parser backend ('auto' prefers lxml when installed)
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parser = resolve_parser(parser)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """Start the worker processes on first use."""
+        with self._lock:
+            if self._executor is None:
+                logger.info(f"Starting parse pool with {self.max_workers} workers ({self.parser})")
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(method))
+            return self._executor
+
+    async def parse(self, url, html):
+        """
+        Parse a page in the process pool.
+
+        Args:
+            url (str): URL the page was fetched from
+            html (str): Raw HTML of the page
+
+        Returns:
+            str: Cleaned content
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), parse_page, url, html, self.parser)
+        except BrokenProcessPool:
+            logger.error("Parse pool is broken, restarting it and parsing in a thread")
+            self.shutdown(wait=False)
+            return await loop.run_in_executor(None, parse_page, url, html, self.parser)
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """
+    Get the process-wide parse pool.
+
+    Returns:
+        ParsePool: Shared parse pool
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ParsePool()
+        return _default_pool
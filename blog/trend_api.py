@@ -1,7 +1,22 @@
 import os
 import json
+import threading
 from dotenv import dotenv_values
 from serpapi.google_search import GoogleSearch
+from .lookup_cache import LookupCache, SingleFlight, normalize_query
+from metrics import span
+
+# Related topics change slowly, so one SerpAPI call per query and day is enough
+_related_topics_cache = None
+_related_topics_cache_lock = threading.Lock()
+_related_topics_flight = SingleFlight()
+
+def get_related_topics_cache():
+    global _related_topics_cache
+    with _related_topics_cache_lock:
+        if _related_topics_cache is None:
+            _related_topics_cache = LookupCache("google_trends_related_topics")
+        return _related_topics_cache
 
 class GoogleTrendsScraper:
     def __init__(self):
@@ -12,7 +27,42 @@ class GoogleTrendsScraper:
         if not self.api_key:
             raise ValueError("❌ SERPAPI_KEY is missing in .env file!")
 
-    def fetch_related_topics(self, query):
+    def fetch_related_topics(self, query, use_cache=True, output_file=None):
+        """
+        Fetch Google Trends related topics for a query.
+
+        Results are cached per query, and concurrent calls for the same query
+        share one SerpAPI request.
+
+        Args:
+            query (str): Search query
+            use_cache (bool): Whether to serve and store results in the cache
+            output_file (str): Optional JSON file to also save the results to
+
+        Returns:
+            dict: Related topics ("top" and "rising" lists)
+        """
+        key = normalize_query(query)
+        cache = get_related_topics_cache() if use_cache else None
+        related_topics = cache.get(key) if cache else None
+
+        if related_topics is None:
+            related_topics = _related_topics_flight.do(key, self._fetch_and_cache, query, key, cache)
+        else:
+            print(f"✅ Using cached related topics for '{query}'")
+
+        if output_file:
+            self._save_to_json(related_topics, output_file)
+            print(f"✅ Saved {len(related_topics)} related topics to {output_file}")
+        return related_topics
+
+    def _fetch_and_cache(self, query, key, cache):
+        # A caller that waited for another request may find it cached now
+        if cache:
+            related_topics = cache.get(key)
+            if related_topics is not None:
+                return related_topics
+
         params = {
             "engine": "google_trends",
             "q": query,
@@ -20,19 +70,20 @@ class GoogleTrendsScraper:
             "api_key": self.api_key
         }
 
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        with span("trends.lookup"):
+            search = GoogleSearch(params)
+            results = search.get_dict()
         related_topics = results.get("related_topics", [])
 
-        # Save results to JSON
-        self._save_to_json(related_topics)
-
-        print(f"✅ Saved {len(related_topics)} related topics to related_topics.json")
+        # Don't cache empty answers (errors, quota) so the next call retries
+        if cache and related_topics:
+            cache.set(key, related_topics)
+        return related_topics
 
-    def _save_to_json(self, data):
-        with open("./blog/related_topics.json", "w", encoding="utf-8") as f:
+    def _save_to_json(self, data, output_file="./blog/related_topics.json"):
+        with open(output_file, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4, ensure_ascii=False)
 
 if __name__ == "__main__":
     scraper = GoogleTrendsScraper()
-    scraper.fetch_related_topics("personal loan")
+    scraper.fetch_related_topics("personal loan", output_file="./blog/related_topics.json")
@@ -1,78 +1,273 @@
 import asyncio
 import json
 import random
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from aiohttp import ClientSession
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 
-class GoogleTrendsScraper:
-    def __init__(self, keyword: str, headless: bool = True):
-        self.keyword = keyword
+RELATED_SEARCHES_API = 'widgetdata/relatedsearches'
+
+
+def _user_agents():
+    return [
+        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36',
+        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.1 Safari/605.1.15',
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36',
+    ]
+
+
+class BrowserPool:
+    """
+    Long-lived Chromium instance with a pool of reusable browser contexts.
+
+    The browser is launched on first use and kept open; each scrape borrows a
+    context, opens a fresh page in it and returns the context afterwards, so
+    launching Chromium and creating contexts is paid once per process instead
+    of once per keyword.
+    """
+
+    def __init__(self, headless: bool = True, max_contexts: int = 4):
+        """
+        Initialize the browser pool.
+
+        Args:
+            headless (bool): Whether to run Chromium headless
+            max_contexts (int): Maximum number of contexts (and concurrent pages)
+        """
         self.headless = headless
+        self.max_contexts = max_contexts
         self.playwright = None
         self.browser = None
-        self.context = None
-        self.page = None
-        self.related_searches_api_url = None
+        self._contexts = []
+        self._idle = asyncio.Queue()
+        self._start_lock = asyncio.Lock()
 
-    async def _init_browser(self):
-        self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=self.headless,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-infobars',
-            ]
-        )
+    async def start(self):
+        async with self._start_lock:
+            if self.browser is not None:
+                return
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(
+                headless=self.headless,
+                args=[
+                    '--disable-blink-features=AutomationControlled',
+                    '--disable-infobars',
+                ]
+            )
 
-        self.context = await self.browser.new_context(
-            user_agent=random.choice(self._user_agents()),
-            viewport={"width": 1280, "height": 800},
-            locale='en-US'
-        )
-        self.page = await self.context.new_page()
+    async def _acquire_context(self):
+        await self.start()
+        if self._idle.empty() and len(self._contexts) < self.max_contexts:
+            # Reserve the slot before awaiting so concurrent callers respect the limit
+            self._contexts.append(None)
+            try:
+                context = await self.browser.new_context(
+                    user_agent=random.choice(_user_agents()),
+                    viewport={"width": 1280, "height": 800},
+                    locale='en-US'
+                )
+            except Exception:
+                self._contexts.remove(None)
+                raise
+            self._contexts[self._contexts.index(None)] = context
+            return context
+        return await self._idle.get()
 
-    async def _capture_api_call(self):
-        async def route_handler(route, request):
-            if 'widgetdata/relatedsearches' in request.url:
-                self.related_searches_api_url = request.url
-                # print(f"[Captured] {self.related_searches_api_url}")
-            await route.continue_()
+    @asynccontextmanager
+    async def page(self):
+        """
+        Borrow a new page in a pooled context.
 
-        await self.page.route("**/*", route_handler)
+        Yields:
+            Page: Playwright page, closed when the block exits
+        """
+        context = await self._acquire_context()
+        page = None
+        try:
+            page = await context.new_page()
+            yield page
+        finally:
+            if page is not None:
+                await page.close()
+            self._idle.put_nowait(context)
 
-    async def _visit_embed_page(self):
-        embed_url = self._generate_embed_url()
-        print(f"Navigating to: {embed_url}")
-        await self.page.goto(embed_url, timeout=60000)
-        await self.page.wait_for_selector("body", timeout=10000)
-        await self.page.reload()  # Ensure network calls are made
-        await asyncio.sleep(5)  # Give time for the API to fire
+    async def close(self):
+        for context in self._contexts:
+            if context is not None:
+                await context.close()
+        self._contexts = []
+        self._idle = asyncio.Queue()
+        if self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+        print("Browser closed.")
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+# Process-wide pools by headless flag, each with the event loop it belongs to
+_shared_pools = {}
+
+
+def get_browser_pool(headless: bool = True) -> BrowserPool:
+    """
+    Get the process-wide browser pool, so every scraper shares one Chromium.
+
+    The browser stays open between scrapes; call close_browser_pools() at
+    shutdown. Playwright objects are bound to an event loop, so a new pool is
+    created when called from a different loop, and the previous one is closed
+    on its own loop.
+
+    Args:
+        headless (bool): Whether to run Chromium headless
+
+    Returns:
+        BrowserPool: Shared pool for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    shared = _shared_pools.get(headless)
+    if shared is None or shared[0] is not loop:
+        if shared is not None:
+            _close_on_loop(*shared)
+        shared = _shared_pools[headless] = (loop, BrowserPool(headless=headless))
+    return shared[1]
+
+
+def _close_on_loop(loop, pool):
+    """Close a pool belonging to another event loop, which is the only one that can drive it."""
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(pool.close(), loop)
+    elif pool.browser is not None:
+        print("Warning: the event loop of a browser pool has stopped, it cannot be closed anymore. "
+              "Call close_browser_pools() before the loop ends.")
+
+
+async def close_browser_pools():
+    """Close the process-wide browser pools."""
+    current = asyncio.get_running_loop()
+    pools = list(_shared_pools.values())
+    _shared_pools.clear()
+    for loop, pool in pools:
+        if loop is current:
+            await pool.close()
+        else:
+            _close_on_loop(loop, pool)
 
-    async def _download_related_searches_json(self):
-        if not self.related_searches_api_url:
-            print("Related searches API URL not found.")
-            return
 
+class GoogleTrendsScraper:
+    def __init__(self, keyword: str = None, headless: bool = True, pool: BrowserPool = None, timeout: float = 30):
+        self.keyword = keyword
+        self.headless = headless
+        self.pool = pool
+        self.timeout = timeout
+        self.related_searches_api_url = None
+
+    def _get_pool(self):
+        if self.pool is None:
+            return get_browser_pool(self.headless)
+        return self.pool
+
+    async def _wait_for_related_searches(self, page, action):
+        # Resolves as soon as the widget's data call completes instead of sleeping
+        async with page.expect_response(
+            lambda response: RELATED_SEARCHES_API in response.url,
+            timeout=self.timeout * 1000
+        ) as response_info:
+            await action()
+        return await response_info.value
+
+    async def _visit_embed_page(self, page, keyword):
+        embed_url = self._generate_embed_url(keyword)
+        print(f"Navigating to: {embed_url}")
+        try:
+            return await self._wait_for_related_searches(page, lambda: page.goto(embed_url, timeout=60000))
+        except PlaywrightTimeoutError:
+            # The widget sometimes only fires its API call after a reload
+            return await self._wait_for_related_searches(page, page.reload)
+
+    async def _download_related_searches_json(self, url):
         async with ClientSession() as session:
-            async with session.get(self.related_searches_api_url, headers={"User-Agent": "Mozilla/5.0"}) as resp:
+            async with session.get(url, headers={"User-Agent": "Mozilla/5.0"}) as resp:
                 if resp.status != 200:
                     print(f"Failed to fetch JSON. Status: {resp.status}")
-                    return
+                    return None
+                return await resp.text()
+
+    def _parse(self, raw_data: str):
+        clean_data = raw_data.split("\n", 1)[1] if raw_data.startswith(")]}',") else raw_data
+        return json.loads(clean_data)
+
+    async def scrape(self, keyword: str = None):
+        """
+        Scrape related searches for a keyword using a pooled browser page.
+
+        Args:
+            keyword (str): Keyword to scrape (defaults to the scraper's keyword)
 
-                raw_data = await resp.text()
-                clean_data = raw_data.split("\n", 1)[1] if raw_data.startswith(")]}',") else raw_data
-                self._save_json(clean_data)
-                print(f"Saved: related_searches.json")
+        Returns:
+            dict: Parsed related searches data, or None if it could not be fetched
+        """
+        keyword = keyword or self.keyword
+        async with self._get_pool().page() as page:
+            try:
+                response = await self._visit_embed_page(page, keyword)
+            except PlaywrightTimeoutError:
+                print(f"Timeout while loading the page or API for: {keyword}")
+                return None
 
-    def _save_json(self, data: str):
-        Path(f"related_searches.json").write_text(data)
+            self.related_searches_api_url = response.url
+            try:
+                raw_data = await response.text()
+            except Exception:
+                # Body no longer available from the browser, fetch it directly
+                raw_data = await self._download_related_searches_json(response.url)
 
-    def _generate_embed_url(self) -> str:
+        if not raw_data:
+            return None
+        return self._parse(raw_data)
+
+    async def scrape_many(self, keywords, concurrency: int = None):
+        """
+        Scrape several keywords concurrently across pooled pages.
+
+        Args:
+            keywords (list): Keywords to scrape
+            concurrency (int): Maximum concurrent pages (defaults to the pool's context count)
+
+        Returns:
+            dict: Keyword -> parsed data (None for keywords that failed)
+        """
+        pool = self._get_pool()
+        semaphore = asyncio.Semaphore(concurrency or pool.max_contexts)
+
+        async def scrape_one(keyword):
+            async with semaphore:
+                try:
+                    return await self.scrape(keyword)
+                except Exception as e:
+                    print(f"Failed to scrape {keyword}: {e}")
+                    return None
+
+        results = await asyncio.gather(*(scrape_one(keyword) for keyword in keywords))
+        return dict(zip(keywords, results))
+
+    def _save_json(self, data):
+        Path(f"related_searches.json").write_text(json.dumps(data))
+
+    def _generate_embed_url(self, keyword: str = None) -> str:
         payload = {
-            "comparisonItem": [{"keyword": self.keyword, "geo": "IN", "time": "today 12-m"}],
+            "comparisonItem": [{"keyword": keyword or self.keyword, "geo": "IN", "time": "today 12-m"}],
             "category": 0,
             "property": ""
         }
@@ -81,35 +276,26 @@ class GoogleTrendsScraper:
             f"?hl=en&tz=420&req={json.dumps(payload)}"
         )
 
-    def _user_agents(self):
-        return [
-            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36',
-            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.1 Safari/605.1.15',
-            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36',
-        ]
-
-    async def run(self):
-        await self._init_browser()
-        try:
-            await self._capture_api_call()
-            await self._visit_embed_page()
-            await self._download_related_searches_json()
-        except PlaywrightTimeoutError:
-            print("Timeout while loading the page or API.")
-        finally:
-            await self._cleanup()
-
-    async def _cleanup(self):
-        await self.context.close()
-        await self.browser.close()
-        await self.playwright.stop()
-        print("Browser closed.")
+    async def run(self, save: bool = False):
+        """Scrape the scraper's keyword, optionally saving related_searches.json."""
+        data = await self.scrape()
+        if data is not None and save:
+            self._save_json(data)
+            print(f"Saved: related_searches.json")
+        return data
 
 
 async def main():
     keyword = "personal loan"
     scraper = GoogleTrendsScraper(keyword, headless=False)
-    await scraper.run()
+    try:
+        await scraper.run(save=True)
+
+        # Many keywords sharing one browser
+        results = await GoogleTrendsScraper().scrape_many(["personal loan", "home loan", "car loan"])
+        print({keyword: data is not None for keyword, data in results.items()})
+    finally:
+        await close_browser_pools()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,189 @@
+#Stage latency metrics
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('metrics')
+
+# Histogram bucket upper bounds in seconds, from cache hits to full generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+class Histogram:
+    """Cumulative-bucket latency histogram for one stage."""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            buckets: Sorted bucket upper bounds in seconds
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+class MetricsRegistry:
+    """
+    Per-stage latency histograms and error counts.
+
+    Stages are timed with `span`, which also opens an OpenTelemetry span when
+    the opentelemetry API is installed (a no-op until an SDK and exporter are
+    configured). `render` produces the Prometheus text exposition format.
+    """
+    def __init__(self, namespace="blog", buckets=DEFAULT_BUCKETS):
+        """
+        Initialize the registry.
+
+        Args:
+            namespace: Prefix of the exported metric names
+            buckets: Histogram bucket upper bounds in seconds
+        """
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self.histograms = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+        self.tracer = trace.get_tracer(f"{namespace}-generation") if trace is not None else None
+
+    def observe(self, stage, seconds, **labels):
+        """
+        Record one duration.
+
+        Args:
+            stage: Stage name
+            seconds: Duration in seconds
+            **labels: Extra low-cardinality labels (e.g. cache="hit")
+        """
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """
+        Time a block as a stage. Works inside sync and async code.
+
+        Args:
+            stage: Stage name
+            **labels: Extra low-cardinality labels, also set as span attributes
+
+        Yields:
+            dict: Labels; keys added inside the block are recorded too
+        """
+        labels = dict(labels)
+        start_time = time.perf_counter()
+        span_context = self.tracer.start_as_current_span(stage, attributes=labels) if self.tracer else None
+        otel_span = span_context.__enter__() if span_context else None
+        try:
+            yield labels
+        except BaseException as e:
+            with self._lock:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+            if span_context:
+                span_context.__exit__(type(e), e, e.__traceback__)
+                span_context = None
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start_time, **labels)
+            if span_context:
+                for key, value in labels.items():
+                    otel_span.set_attribute(key, value)
+                span_context.__exit__(None, None, None)
+
+    def snapshot(self):
+        """
+        Summary of the recorded stages.
+
+        Returns:
+            dict: Stage (with labels) -> count, total and mean seconds
+        """
+        with self._lock:
+            summary = {}
+            for (stage, labels), histogram in sorted(self.histograms.items()):
+                name = stage + _format_labels(dict(labels))
+                summary[name] = {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 4),
+                    "mean": round(histogram.sum / histogram.count, 4) if histogram.count else 0.0
+                }
+            return summary
+
+    def render(self):
+        """
+        Export the metrics in the Prometheus text format.
+
+        Returns:
+            str: Exposition text with a stage duration histogram and an error counter
+        """
+        name = f"{self.namespace}_stage_duration_seconds"
+        lines = [f"# HELP {name} Duration of blog generation stages.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for (stage, labels), histogram in sorted(self.histograms.items()):
+                labels = dict(labels, stage=stage)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=repr(float(bound))))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+            errors = f"{self.namespace}_stage_errors_total"
+            lines += [f"# HELP {errors} Blog generation stages that raised.", f"# TYPE {errors} counter"]
+            for stage, count in sorted(self.errors.items()):
+                lines.append(f"{errors}{_format_labels({'stage': stage})} {count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drop all recorded metrics."""
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
+
+# Process-wide registry used by all instrumented stages
+registry = MetricsRegistry()
+
+def span(stage, **labels):
+    """
+    Time a block as a stage in the process-wide registry.
+
+    Args:
+        stage: Stage name
+        **labels: Extra low-cardinality labels
+
+    Returns:
+        Context manager yielding the labels dict
+    """
+    return registry.span(stage, **labels)
+
+def observe(stage, seconds, **labels):
+    """Record a duration measured elsewhere in the process-wide registry."""
+    registry.observe(stage, seconds, **labels)
@@ -0,0 +1,167 @@
+#BM25 inverted index over the chunk store
+from collections import Counter
+import os
+import re
+import json
+import math
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('bm25')
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Words too common to carry any signal for ranking
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the this to was were what
+when where which who why will with you your
+""".split())
+
+def tokenize(text):
+    """
+    Split text into lowercase index terms.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        list: Terms, without stopwords
+    """
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over chunk texts, keyed by docstore id.
+
+    Term frequencies of every added chunk are appended as one JSON line to
+    `path`, so adding chunks costs only the new lines and other processes pick
+    them up with `refresh`. Postings are held in memory as term -> {id: tf}.
+    """
+    def __init__(self, path=None, k1=1.5, b=0.75):
+        """
+        Initialize the index, loading any postings already at `path`.
+
+        Args:
+            path: JSONL file the postings are persisted to (None for memory only)
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = {}
+        self.total_length = 0
+        self._offset = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def _index(self, doc_id, term_counts, length):
+        if doc_id in self.doc_lengths:
+            return
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+        for term, count in term_counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+    def refresh(self):
+        """Load postings appended to the file since the last read (including by other processes)."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with self._lock:
+            with open(self.path, "r", encoding="utf-8") as f:
+                f.seek(self._offset)
+                loaded = 0
+                while True:
+                    line = f.readline()
+                    # Stop at a line another process is still writing
+                    if not line or not line.endswith("\n"):
+                        break
+                    self._offset = f.tell()
+                    entry = json.loads(line)
+                    self._index(entry["id"], entry["tf"], entry["len"])
+                    loaded += 1
+            if loaded:
+                logger.info(f"Loaded {loaded} documents into the BM25 index")
+
+    def add(self, documents):
+        """
+        Index chunks and append their postings to the file.
+
+        Args:
+            documents: Iterable of (docstore id, text) pairs
+        """
+        lines = []
+        with self._lock:
+            for doc_id, text in documents:
+                if doc_id in self.doc_lengths:
+                    continue
+                terms = tokenize(text)
+                term_counts = dict(Counter(terms))
+                self._index(doc_id, term_counts, len(terms))
+                lines.append(json.dumps({"id": doc_id, "tf": term_counts, "len": len(terms)}, ensure_ascii=False) + "\n")
+
+            if lines and self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                # One append per batch keeps lines from concurrent writers intact. The
+                # offset is left alone: other processes may have appended since the last
+                # refresh, and our own lines are skipped as already indexed when re-read
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+
+    def search(self, query, k=10, doc_filter=None):
+        """
+        Rank indexed chunks against a query.
+
+        Args:
+            query: Query text
+            k: Number of results
+            doc_filter: Optional predicate on docstore ids; other chunks are not scored
+
+        Returns:
+            list: (docstore id, BM25 score) tuples, best first
+        """
+        with self._lock:
+            num_docs = len(self.doc_lengths)
+            if num_docs == 0:
+                return []
+            average_length = self.total_length / num_docs or 1.0
+
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if doc_filter is not None and not doc_filter(doc_id):
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Merge several rankings with reciprocal rank fusion.
+
+    Args:
+        rankings: Lists of ids, each best first
+        k: Damping constant; larger values flatten the contribution of top ranks
+
+    Returns:
+        list: (id, fused score) tuples, best first
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rag.rag import RAGSystem
+from rag.index_factory import INDEX_TYPES
+
+def main():
+    """Rebuild the vector store index as another ANN index type (run as: python -m rag.build_index)"""
+    parser = argparse.ArgumentParser(description='Build or migrate the RAG vector index')
+
+    parser.add_argument('--index-type', type=str, required=True, choices=INDEX_TYPES,
+                        help='Index type to build')
+    parser.add_argument('--db-path', type=str, default='vectorstore.pkl',
+                        help='Path of the vector store (default: vectorstore.pkl)')
+    parser.add_argument('--nlist', type=int, help='Number of IVF cells (default: ~4*sqrt(n))')
+    parser.add_argument('--nprobe', type=int, default=16, help='IVF cells searched per query (default: 16)')
+    parser.add_argument('--pq-m', type=int, default=64, help='PQ sub-quantizers for ivf_pq (default: 64)')
+    parser.add_argument('--hnsw-m', type=int, default=32, help='HNSW neighbors per node (default: 32)')
+    parser.add_argument('--ef-search', type=int, default=64, help='HNSW search depth (default: 64)')
+    parser.add_argument('--no-eval', action='store_true', help='Skip recall/latency evaluation')
+
+    args = parser.parse_args()
+
+    rag_system = RAGSystem(db_path=args.db_path)
+    if rag_system.db is None:
+        print(f"No vector store found at {args.db_path}")
+        return
+
+    params = {
+        "nprobe": args.nprobe,
+        "pq_m": args.pq_m,
+        "hnsw_m": args.hnsw_m,
+        "ef_search": args.ef_search
+    }
+    if args.nlist:
+        params["nlist"] = args.nlist
+
+    report = rag_system.rebuild_index(args.index_type, evaluate=not args.no_eval, **params)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
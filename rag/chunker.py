@@ -0,0 +1,193 @@
+#Structure-aware, token-sized chunking
+import re
+import logging
+from langchain_core.documents import Document
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('chunker')
+
+_BLOCK_PATTERN = re.compile(r"\S[^\n]*(?:\n(?!\s*\n)[^\n]*)*")
+_HEADING_PATTERN = re.compile(r"#{1,6}\s")
+_LIST_ITEM_PATTERN = re.compile(r"(?:[-*•]|\d+[.)])\s")
+_SENTENCE_PATTERN = re.compile(r"[^.!?]+(?:[.!?]+[\"')\]]*|$)\s*")
+
+# Loaded encodings (None if unavailable), shared by all chunkers
+_encodings = {}
+
+def iter_blocks(text):
+    """
+    Split text into structural blocks without copying it line by line.
+
+    Blocks are separated by blank lines, as produced by the crawler.
+
+    Args:
+        text: Text to split
+
+    Yields:
+        tuple: (kind, block text) with kind 'heading', 'list' or 'paragraph'
+    """
+    for match in _BLOCK_PATTERN.finditer(text):
+        block = match.group().strip()
+        if not block:
+            continue
+        if _HEADING_PATTERN.match(block) and "\n" not in block:
+            yield "heading", block
+        elif _LIST_ITEM_PATTERN.match(block):
+            yield "list", block
+        else:
+            yield "paragraph", block
+
+class StructuralChunker:
+    """
+    Token-sized chunker that splits on headings, paragraphs and list items.
+
+    Blocks are packed into chunks of at most `chunk_tokens` tokens. A heading
+    always starts a new chunk, and chunks continuing a long section repeat
+    its heading so they stay self-describing. Blocks larger than a chunk are
+    split at sentence boundaries, and sentences larger than a chunk by tokens.
+    Chunks are produced by generators, so a large page is never copied into
+    intermediate lists of pieces.
+    """
+    def __init__(self, chunk_tokens=400, min_chunk_tokens=50, encoding_name="cl100k_base"):
+        """
+        Initialize the chunker.
+
+        Args:
+            chunk_tokens: Maximum tokens per chunk
+            min_chunk_tokens: Chunks smaller than this are merged across headings
+            encoding_name: tiktoken encoding used to count tokens
+        """
+        self.chunk_tokens = chunk_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.encoding_name = encoding_name
+
+    def _get_encoding(self):
+        if self.encoding_name not in _encodings:
+            try:
+                import tiktoken
+                _encodings[self.encoding_name] = tiktoken.get_encoding(self.encoding_name)
+            except Exception as e:
+                logger.warning(f"tiktoken encoding '{self.encoding_name}' unavailable, estimating 4 characters per token: {e}")
+                _encodings[self.encoding_name] = None
+        return _encodings[self.encoding_name]
+
+    def count_tokens(self, text):
+        """
+        Count the tokens of a text.
+
+        Args:
+            text: Text to count
+
+        Returns:
+            int: Number of tokens
+        """
+        if not text:
+            return 0
+        encoding = self._get_encoding()
+        if encoding is None:
+            return (len(text) + 3) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def _split_tokens(self, text, max_tokens):
+        encoding = self._get_encoding()
+        if encoding is None:
+            step = max_tokens * 4
+            for start in range(0, len(text), step):
+                yield text[start:start + step]
+            return
+        tokens = encoding.encode(text, disallowed_special=())
+        for start in range(0, len(tokens), max_tokens):
+            yield encoding.decode(tokens[start:start + max_tokens])
+
+    def _pieces(self, kind, block, max_tokens):
+        # Yield (text, tokens) pieces of a block that each fit max_tokens
+        tokens = self.count_tokens(block)
+        if tokens <= max_tokens:
+            yield block, tokens
+            return
+        if kind == "list" and "\n" in block:
+            # Split long lists between items first
+            for item in block.split("\n"):
+                if item.strip():
+                    yield from self._pieces("paragraph", item.strip(), max_tokens)
+            return
+        for match in _SENTENCE_PATTERN.finditer(block):
+            sentence = match.group().strip()
+            if not sentence:
+                continue
+            tokens = self.count_tokens(sentence)
+            if tokens <= max_tokens:
+                yield sentence, tokens
+            else:
+                for part in self._split_tokens(sentence, max_tokens):
+                    yield part, self.count_tokens(part)
+
+    def iter_chunks(self, text):
+        """
+        Chunk a text.
+
+        Args:
+            text: Text to chunk, with blocks separated by blank lines
+
+        Yields:
+            tuple: (chunk text, section heading or None)
+        """
+        parts = []
+        used = 0
+        heading = None
+        heading_tokens = 0
+
+        for kind, block in iter_blocks(text):
+            if kind == "heading":
+                # Start a new section unless the current chunk is too small to stand alone
+                if parts and used >= self.min_chunk_tokens:
+                    yield "\n\n".join(parts), heading
+                    parts, used = [], 0
+                heading = block
+                heading_tokens = self.count_tokens(block)
+                parts.append(block)
+                used += heading_tokens + (1 if len(parts) > 1 else 0)
+                continue
+
+            # Leave room for the heading repeated at the top of continuation chunks
+            max_tokens = self.chunk_tokens - (heading_tokens + 1 if heading else 0)
+            for piece, tokens in self._pieces(kind, block, max(max_tokens, 1)):
+                if parts and used + tokens + 1 > self.chunk_tokens:
+                    yield "\n\n".join(parts), heading
+                    parts, used = ([heading], heading_tokens) if heading else ([], 0)
+                parts.append(piece)
+                used += tokens + (1 if len(parts) > 1 else 0)
+
+        # A trailing heading on its own carries no content
+        if parts and not (len(parts) == 1 and parts[0] == heading):
+            yield "\n\n".join(parts), heading
+
+    def iter_documents(self, documents):
+        """
+        Chunk documents lazily.
+
+        Args:
+            documents: Iterable of Documents
+
+        Yields:
+            Document: Chunks carrying the source metadata plus their section heading
+        """
+        for document in documents:
+            for text, heading in self.iter_chunks(document.page_content):
+                metadata = dict(document.metadata or {})
+                if heading:
+                    metadata["section"] = heading.lstrip("#").strip()
+                yield Document(page_content=text, metadata=metadata)
+
+    def split_documents(self, documents):
+        """
+        Chunk documents, with the same interface as LangChain text splitters.
+
+        Args:
+            documents: Iterable of Documents
+
+        Returns:
+            list: Chunk Documents
+        """
+        return list(self.iter_documents(documents))
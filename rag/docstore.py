@@ -0,0 +1,165 @@
+#Lazily-read docstore for vector store snapshots
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+from collections.abc import MutableMapping
+import json
+import sqlite3
+import threading
+
+class ReadOnlySnapshotError(ValueError):
+    """Raised on attempts to modify or delete data stored in a snapshot."""
+
+class SnapshotReader:
+    """
+    Read-only access to a snapshot's docstore.sqlite.
+
+    The file holds two tables: `docs` (docstore id -> content, metadata) and
+    `positions` (FAISS index position -> docstore id). Rows are read on demand,
+    so opening a snapshot costs the same regardless of corpus size.
+    """
+    def __init__(self, path):
+        """
+        Open a snapshot docstore.
+
+        Args:
+            path: Path to docstore.sqlite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def get_document(self, doc_id):
+        with self._lock:
+            row = self._conn.execute("SELECT content, metadata FROM docs WHERE id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return None
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def get_id(self, position):
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM positions WHERE pos = ?", (position,)).fetchone()
+        return row[0] if row else None
+
+    def items(self):
+        with self._lock:
+            return self._conn.execute("SELECT pos, id FROM positions ORDER BY pos").fetchall()
+
+def write_snapshot_docstore(path, index_to_docstore_id, docstore):
+    """
+    Write the docstore of a FAISS store to a new docstore.sqlite.
+
+    Args:
+        path: Path of the file to create
+        index_to_docstore_id: FAISS position -> docstore id mapping
+        docstore: Docstore holding the documents
+    """
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("CREATE TABLE docs (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+        conn.execute("CREATE TABLE positions (pos INTEGER PRIMARY KEY, id TEXT NOT NULL)")
+        positions = []
+        docs = []
+        for position, doc_id in index_to_docstore_id.items():
+            positions.append((position, doc_id))
+            doc = docstore.search(doc_id)
+            if not isinstance(doc, str):
+                docs.append((doc_id, doc.page_content, json.dumps(doc.metadata, default=str)))
+        conn.executemany("INSERT INTO positions VALUES (?, ?)", positions)
+        conn.executemany("INSERT OR IGNORE INTO docs VALUES (?, ?, ?)", docs)
+        conn.commit()
+    finally:
+        conn.close()
+
+class SnapshotDocstore(Docstore, AddableMixin):
+    """
+    Docstore that reads snapshot documents lazily from SQLite and keeps
+    documents added after the snapshot in memory.
+    """
+    def __init__(self, reader):
+        """
+        Initialize the docstore.
+
+        Args:
+            reader: SnapshotReader of the snapshot
+        """
+        self.reader = reader
+        self._added = {}
+
+    def search(self, search):
+        """
+        Look up a document by docstore id.
+
+        Args:
+            search: Docstore id
+
+        Returns:
+            Document, or an error string if not found (as InMemoryDocstore does)
+        """
+        if search in self._added:
+            return self._added[search]
+        doc = self.reader.get_document(search)
+        if doc is None:
+            return f"ID {search} not found."
+        return doc
+
+    def add(self, texts):
+        """
+        Add documents added after the snapshot.
+
+        Args:
+            texts: Mapping of docstore id -> Document
+        """
+        self._added.update(texts)
+
+    def delete(self, ids):
+        raise ReadOnlySnapshotError("Snapshot stores do not support deletes; rebuild the store instead")
+
+class SnapshotIndexMap(MutableMapping):
+    """
+    FAISS position -> docstore id mapping. Positions in the snapshot are read
+    lazily from SQLite; positions added afterwards live in memory.
+    """
+    def __init__(self, reader, base_count):
+        """
+        Initialize the mapping.
+
+        Args:
+            reader: SnapshotReader of the snapshot
+            base_count: Number of vectors in the snapshot index
+        """
+        self.reader = reader
+        self.base_count = base_count
+        self._added = {}
+
+    def __getitem__(self, position):
+        # FAISS hands back numpy integers, which sqlite3 cannot bind
+        position = int(position)
+        if position in self._added:
+            return self._added[position]
+        if 0 <= position < self.base_count:
+            doc_id = self.reader.get_id(position)
+            if doc_id is not None:
+                return doc_id
+        raise KeyError(position)
+
+    def __setitem__(self, position, doc_id):
+        if position < self.base_count:
+            raise ReadOnlySnapshotError("Snapshot positions are read-only")
+        self._added[position] = doc_id
+
+    def __delitem__(self, position):
+        raise ReadOnlySnapshotError("Snapshot stores do not support deletes; rebuild the store instead")
+
+    def __iter__(self):
+        for position, _ in self.reader.items():
+            yield position
+        yield from self._added
+
+    def __len__(self):
+        return self.base_count + len(self._added)
+
+    def items(self):
+        return self.reader.items() + list(self._added.items())
+
+    def values(self):
+        return [doc_id for _, doc_id in self.items()]
@@ -0,0 +1,165 @@
+#Embedding cache
+from langchain_core.embeddings import Embeddings
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('embedding_cache')
+
+# Root of the project, so the cache does not depend on the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SQLite limits the number of bound parameters per statement
+_BATCH_SIZE = 500
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that persists vectors in SQLite.
+
+    Vectors are keyed by (model, dimensions, text hash). Batch lookups fetch all
+    cached vectors in a few queries and only the misses are sent to the wrapped
+    provider in a single call. The least recently used vectors are evicted once
+    the cache holds more than `max_entries`.
+    """
+    def __init__(self, embeddings, model, dimensions, cache_path=".cache/embeddings.sqlite", max_entries=200000):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            embeddings: The embeddings provider to wrap
+            model: Name of the embedding model (part of the cache key)
+            dimensions: Vector dimensions (part of the cache key)
+            cache_path: Path to the SQLite database file, relative to the project root
+            max_entries: Maximum number of vectors to keep
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.dimensions = dimensions
+        self.cache_path = os.path.join(PROJECT_ROOT, cache_path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, dimensions, text_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+
+    def _hash(self, text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, hashes):
+        """Fetch cached vectors for the given hashes and mark them as used."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(hashes), _BATCH_SIZE):
+                batch = hashes[start:start + _BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dimensions = ? AND text_hash IN ({placeholders})",
+                    [self.model, self.dimensions, *batch]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? "
+                        f"WHERE model = ? AND dimensions = ? AND text_hash IN ({placeholders})",
+                        [now, self.model, self.dimensions, *batch]
+                    )
+            self._conn.commit()
+        return found
+
+    def _store(self, vectors_by_hash):
+        """Persist new vectors and evict the least recently used ones if needed."""
+        now = time.time()
+        rows = [
+            (self.model, self.dimensions, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text_hash, vector in vectors_by_hash.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                logger.info(f"Evicted {count - self.max_entries} cached embeddings")
+            self._conn.commit()
+
+    def embed_documents(self, texts):
+        """
+        Embed texts, only calling the provider for texts not in the cache.
+
+        Args:
+            texts: List of texts to embed
+
+        Returns:
+            list: One vector per text
+        """
+        hashes = [self._hash(text) for text in texts]
+        cached = self._lookup(list(set(hashes)))
+
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached:
+                missing.setdefault(text_hash, text)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            logger.info(f"Embedding {len(missing)} texts ({len(texts) - len(missing)} cached)")
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            # Round through float32 so hits and misses return identical vectors
+            computed = {
+                text_hash: np.asarray(vector, dtype=np.float32).tolist()
+                for text_hash, vector in zip(missing.keys(), vectors)
+            }
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text):
+        """
+        Embed a query, using the cache when possible.
+
+        Args:
+            text: Query text
+
+        Returns:
+            list: The query vector
+        """
+        text_hash = self._hash(text)
+        cached = self._lookup([text_hash])
+        if text_hash in cached:
+            self.hits += 1
+            return cached[text_hash]
+
+        self.misses += 1
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32).tolist()
+        self._store({text_hash: vector})
+        return vector
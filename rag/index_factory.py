@@ -0,0 +1,171 @@
+#ANN index construction
+import math
+import time
+import logging
+import faiss
+import numpy as np
+from rag.layered_index import LayeredIndex
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('index_factory')
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+def describe_index(index):
+    """
+    Get the index type name of a FAISS index.
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        str: One of INDEX_TYPES, or the class name for anything else
+    """
+    if isinstance(index, LayeredIndex):
+        index = index.base
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    return type(index).__name__
+
+def factory_string(index_type, dimension, ntotal, nlist=None, pq_m=64, hnsw_m=32):
+    """
+    Build the faiss.index_factory description for an index type.
+
+    Args:
+        index_type: One of INDEX_TYPES
+        dimension: Vector dimension
+        ntotal: Number of vectors the index will be trained on
+        nlist: Number of IVF cells (defaults to ~4*sqrt(ntotal))
+        pq_m: Number of PQ sub-quantizers (must divide the dimension)
+        hnsw_m: Number of HNSW neighbors per node
+
+    Returns:
+        str: Factory string
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+
+    # IVF needs roughly 39 training points per cell
+    nlist = nlist or max(1, min(int(4 * math.sqrt(ntotal)), ntotal // 39))
+    if ntotal < nlist:
+        raise ValueError(f"Need at least {nlist} vectors to train {index_type}, have {ntotal}")
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+
+    if dimension % pq_m != 0:
+        raise ValueError(f"pq_m={pq_m} must divide the vector dimension {dimension}")
+    if ntotal < 256:
+        raise ValueError(f"Need at least 256 vectors to train 8-bit PQ codes, have {ntotal}")
+    return f"IVF{nlist},PQ{pq_m}"
+
+def extract_vectors(index):
+    """
+    Reconstruct all vectors stored in an index.
+
+    Args:
+        index: FAISS index
+
+    Returns:
+        np.ndarray: float32 matrix of shape (ntotal, d)
+    """
+    if isinstance(index, LayeredIndex):
+        return np.vstack([extract_vectors(index.base), index.delta_vectors()])
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.make_direct_map()
+        if isinstance(ivf, faiss.IndexIVFPQ):
+            logger.warning("Reconstructing vectors from PQ codes is lossy")
+    except RuntimeError:
+        pass
+    return index.reconstruct_n(0, index.ntotal)
+
+def build_index(index_type, vectors, nprobe=16, ef_search=64, **params):
+    """
+    Train and fill an index of the given type.
+
+    Args:
+        index_type: One of INDEX_TYPES
+        vectors: float32 matrix of vectors, in docstore position order
+        nprobe: IVF cells visited per query
+        ef_search: HNSW search depth
+        **params: Extra arguments for factory_string (nlist, pq_m, hnsw_m)
+
+    Returns:
+        faiss.Index: The populated index
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ntotal, dimension = vectors.shape
+    description = factory_string(index_type, dimension, ntotal, **params)
+
+    start_time = time.time()
+    index = faiss.index_factory(dimension, description, faiss.METRIC_L2)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+    else:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass
+
+    logger.info(f"Built {description} index over {ntotal} vectors in {time.time() - start_time:.2f}s")
+    return index
+
+def evaluate_index(index, vectors, k=10, num_queries=200, seed=0):
+    """
+    Compare an index against exact flat search over the same vectors.
+
+    Args:
+        index: Index to evaluate
+        vectors: The vectors stored in the index
+        k: Neighbors per query
+        num_queries: Number of stored vectors sampled as queries
+        seed: Random seed for sampling
+
+    Returns:
+        dict: Recall@k and per-query latency of the index and the flat baseline
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ntotal, dimension = vectors.shape
+    k = min(k, ntotal)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(ntotal, size=min(num_queries, ntotal), replace=False)]
+
+    flat = faiss.IndexFlatL2(dimension)
+    flat.add(vectors)
+
+    start_time = time.perf_counter()
+    _, expected = flat.search(queries, k)
+    flat_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    _, found = index.search(queries, k)
+    index_time = time.perf_counter() - start_time
+
+    hits = sum(len(set(row_expected) & set(row_found)) for row_expected, row_found in zip(expected, found))
+    return {
+        "index_type": describe_index(index),
+        "ntotal": ntotal,
+        "k": k,
+        "queries": len(queries),
+        "recall_at_k": hits / (len(queries) * k),
+        "flat_ms_per_query": 1000 * flat_time / len(queries),
+        "index_ms_per_query": 1000 * index_time / len(queries)
+    }
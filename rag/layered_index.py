@@ -0,0 +1,104 @@
+#Snapshot index with an in-memory side index for new vectors
+import faiss
+import numpy as np
+
+class LayeredIndex:
+    """
+    A read-only (memory-mapped) snapshot index plus a small flat side index
+    holding the vectors added since the snapshot.
+
+    Positions continue across both layers: snapshot vectors keep positions
+    0..base.ntotal-1 and added vectors follow. Searches query both layers and
+    merge the hits by distance, so adding vectors never copies the snapshot
+    into process memory. Compaction folds the side index into the next
+    snapshot.
+    """
+    def __init__(self, base):
+        """
+        Initialize the layered index.
+
+        Args:
+            base: Snapshot index, never modified
+        """
+        self.base = base
+        self.delta_flat = faiss.IndexFlat(base.d, base.metric_type)
+        # Side vectors are stored under their global positions, so search
+        # parameters with a position selector apply to both layers
+        self.delta = faiss.IndexIDMap(self.delta_flat)
+
+    @property
+    def d(self):
+        return self.base.d
+
+    @property
+    def metric_type(self):
+        return self.base.metric_type
+
+    @property
+    def is_trained(self):
+        return True
+
+    @property
+    def ntotal(self):
+        return self.base.ntotal + self.delta.ntotal
+
+    def add(self, vectors):
+        """
+        Add vectors to the side index.
+
+        Args:
+            vectors: float32 matrix of shape (n, d)
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        positions = np.arange(self.ntotal, self.ntotal + len(vectors), dtype=np.int64)
+        self.delta.add_with_ids(vectors, positions)
+
+    def search(self, vectors, k, params=None):
+        """
+        Search both layers and merge the results.
+
+        Args:
+            vectors: float32 query matrix
+            k: Number of neighbors per query
+            params: Optional SearchParameters (e.g. a position selector) built for the base index
+
+        Returns:
+            tuple: (distances, positions) of shape (len(vectors), k), padded with -1 like FAISS
+        """
+        distances, positions = self.base.search(vectors, k, params=params)
+        if self.delta.ntotal == 0:
+            return distances, positions
+        delta_distances, delta_positions = self.delta.search(vectors, k, params=params)
+
+        distances = np.hstack([distances, delta_distances])
+        positions = np.hstack([positions, delta_positions])
+        descending = self.metric_type == faiss.METRIC_INNER_PRODUCT
+        # Rank padding last regardless of the metric
+        keys = np.where(positions == -1, np.inf, -distances if descending else distances)
+        order = np.argsort(keys, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, axis=1), np.take_along_axis(positions, order, axis=1)
+
+    def reconstruct(self, position):
+        position = int(position)
+        if position < self.base.ntotal:
+            return self.base.reconstruct(position)
+        return self.delta_flat.reconstruct(position - self.base.ntotal)
+
+    def delta_vectors(self):
+        """Vectors of the side index in position order."""
+        if self.delta.ntotal == 0:
+            return np.zeros((0, self.d), dtype=np.float32)
+        return self.delta_flat.reconstruct_n(0, self.delta.ntotal)
+
+    def merged(self):
+        """
+        Copy both layers into one writable index of the snapshot's type, e.g. to
+        write the next snapshot.
+
+        Returns:
+            faiss.Index: Index holding all vectors in position order
+        """
+        index = faiss.deserialize_index(faiss.serialize_index(self.base))
+        if self.delta.ntotal:
+            index.add(self.delta_vectors())
+        return index
@@ -0,0 +1,175 @@
+#Metadata index for filtered vector search
+import time
+import threading
+import numpy as np
+import faiss
+from rag.layered_index import LayeredIndex
+
+# Metadata fields indexed for exact-match filters
+INDEXED_FIELDS = ("topic", "keyword", "domain")
+
+# Fields that accumulate values when the same chunk is ingested again
+MERGED_FIELDS = ("topic", "keyword")
+
+def merge_metadata(existing, update):
+    """
+    Combine the metadata of a stored chunk with that of the same chunk seen again
+    (e.g. the page was crawled for another topic, or re-crawled later).
+
+    Topic and keyword values accumulate (as a list once there are several) and
+    crawled_at keeps the latest crawl; other fields keep their first value.
+
+    Args:
+        existing: Metadata dict of the stored chunk
+        update: Metadata dict of the new occurrence
+
+    Returns:
+        dict: The merged metadata, or None if nothing changed
+    """
+    merged = dict(existing)
+    for field in MERGED_FIELDS:
+        if update.get(field) is None:
+            continue
+        current = existing.get(field)
+        values = list(current) if isinstance(current, list) else ([] if current is None else [current])
+        known = {str(value).lower() for value in values}
+        added = update[field] if isinstance(update[field], list) else [update[field]]
+        for value in added:
+            if str(value).lower() not in known:
+                known.add(str(value).lower())
+                values.append(value)
+        if len(values) > 1:
+            merged[field] = values
+        elif values:
+            merged[field] = values[0]
+
+    crawled_at = update.get("crawled_at")
+    if isinstance(crawled_at, (int, float)):
+        previous = existing.get("crawled_at")
+        if not isinstance(previous, (int, float)) or crawled_at > previous:
+            merged["crawled_at"] = crawled_at
+    return merged if merged != existing else None
+
+class MetadataIndex:
+    """
+    Precomputed FAISS position sets per metadata value.
+
+    Exact-match fields (topic, keyword, domain) map each value to the positions
+    holding it, and crawl timestamps are kept in an array, so a filter resolves
+    to an id set without touching the documents. The result is handed to FAISS
+    as an IDSelector, so filtering happens inside the search instead of
+    discarding results afterwards.
+    """
+    def __init__(self):
+        """Initialize an empty index."""
+        self.values = {field: {} for field in INDEXED_FIELDS}
+        self.ids = {}
+        self._positions = []
+        self._crawled_at = []
+        self._lock = threading.Lock()
+
+    def add(self, position, metadata, doc_id=None):
+        """
+        Index the metadata of one vector. Adding a position again indexes the
+        new values as well, so merged metadata can be indexed incrementally.
+
+        Args:
+            position: FAISS position of the vector
+            metadata: Metadata dict of its document
+            doc_id: Docstore id of the document, to find the position by id later
+        """
+        with self._lock:
+            if doc_id is not None:
+                self.ids[doc_id] = int(position)
+            for field in INDEXED_FIELDS:
+                value = metadata.get(field)
+                if value is None:
+                    continue
+                for item in (value if isinstance(value, list) else [value]):
+                    self.values[field].setdefault(str(item).lower(), set()).add(int(position))
+            crawled_at = metadata.get("crawled_at")
+            if isinstance(crawled_at, (int, float)):
+                self._positions.append(int(position))
+                self._crawled_at.append(float(crawled_at))
+
+    def _matching(self, field, values):
+        if isinstance(values, str):
+            values = [values]
+        matched = set()
+        for value in values:
+            matched |= self.values[field].get(str(value).lower(), set())
+        return matched
+
+    def select(self, topic=None, keyword=None, domains=None, exclude_domains=None, max_age=None, since=None):
+        """
+        Resolve a filter to the FAISS positions that satisfy it.
+
+        Args:
+            topic: Topic (or list of topics) the document must have
+            keyword: Keyword (or list of keywords) the document must have
+            domains: Allowed source domains
+            exclude_domains: Denied source domains
+            max_age: Maximum age in seconds since the page was crawled
+            since: Earliest allowed crawl time (Unix time)
+
+        Returns:
+            tuple: (sorted int64 positions, whether they are excluded rather than allowed),
+                   or None if the filter does not restrict anything
+        """
+        if max_age is not None:
+            since = max(since or 0, time.time() - max_age)
+
+        with self._lock:
+            allowed = None
+            for field, values in (("topic", topic), ("keyword", keyword), ("domain", domains)):
+                if values is None:
+                    continue
+                matched = self._matching(field, values)
+                allowed = matched if allowed is None else allowed & matched
+
+            if since is not None:
+                crawled_at = np.asarray(self._crawled_at, dtype=np.float64)
+                positions = np.asarray(self._positions, dtype=np.int64)
+                fresh = set(positions[crawled_at >= since].tolist())
+                allowed = fresh if allowed is None else allowed & fresh
+
+            denied = self._matching("domain", exclude_domains) if exclude_domains is not None else set()
+
+        if allowed is None:
+            # Only a deny list (or nothing): search everything except the denied positions
+            if not denied:
+                return None
+            return np.fromiter(sorted(denied), dtype=np.int64, count=len(denied)), True
+        allowed -= denied
+        return np.fromiter(sorted(allowed), dtype=np.int64, count=len(allowed)), False
+
+def search_parameters(index, ids, exclude=False):
+    """
+    Build FAISS search parameters restricting a search to (or away from) ids.
+
+    Args:
+        index: Index to be searched
+        ids: int64 positions
+        exclude: Whether the ids are excluded instead of allowed
+
+    Returns:
+        tuple: (SearchParameters, selector objects that must stay alive during the search)
+    """
+    selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+    keep_alive = [ids, selector]
+    if exclude:
+        selector = faiss.IDSelectorNot(selector)
+        keep_alive.append(selector)
+
+    # The side index of a LayeredIndex maps the same positions, so the base's parameters cover both
+    if isinstance(index, LayeredIndex):
+        index = index.base
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        except RuntimeError:
+            params = faiss.SearchParameters(sel=selector)
+    return params, keep_alive
@@ -0,0 +1,83 @@
+#Maximal marginal relevance reranking
+from urllib.parse import urlparse
+import numpy as np
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def mmr_select(query_vector, candidate_vectors, k, lambda_mult=0.5, groups=None, max_per_group=None):
+    """
+    Pick k diverse candidates with maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+        lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, selected))
+    using cosine similarity. All similarities come from two matrix products
+    and each step is a vectorized update, so the cost is dominated by one
+    (n x n) product over the candidates.
+
+    Args:
+        query_vector: Query embedding of shape (d,)
+        candidate_vectors: Candidate embeddings of shape (n, d), in nearest-first order
+        k: Number of candidates to select
+        lambda_mult: 1 ranks by relevance only, 0 by diversity only
+        groups: Optional group label per candidate (e.g. source domain, None for no group)
+        max_per_group: Maximum number of selected candidates per group
+
+    Returns:
+        list: Indices of the selected candidates, in selection order
+    """
+    candidates = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+    n = len(candidates)
+    if n == 0 or k <= 0:
+        return []
+    query = _normalize(np.asarray(query_vector, dtype=np.float32).reshape(1, -1))[0]
+
+    query_similarity = candidates @ query
+    pairwise_similarity = candidates @ candidates.T
+
+    available = np.ones(n, dtype=bool)
+    # Highest similarity to anything selected so far
+    redundancy = np.full(n, -np.inf, dtype=np.float32)
+    group_counts = {}
+    selected = []
+
+    while len(selected) < k and available.any():
+        if selected:
+            scores = lambda_mult * query_similarity - (1 - lambda_mult) * redundancy
+        else:
+            scores = query_similarity.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, pairwise_similarity[best])
+
+        if groups is not None and max_per_group and groups[best] is not None:
+            group = groups[best]
+            group_counts[group] = group_counts.get(group, 0) + 1
+            if group_counts[group] >= max_per_group:
+                available &= np.array([label != group for label in groups])
+
+    return selected
+
+def document_domain(doc):
+    """
+    Source domain of a document, taken from its metadata.
+
+    Args:
+        doc: Document with optional domain, url or source metadata
+
+    Returns:
+        str: The domain, or None if the document has no source information
+    """
+    metadata = doc.metadata or {}
+    if metadata.get("domain"):
+        return metadata["domain"]
+    for key in ("url", "source"):
+        value = metadata.get(key)
+        if value:
+            return urlparse(value).netloc or value
+    return None
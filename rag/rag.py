@@ -3,11 +3,24 @@ from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
+from rag.embedding_cache import CachedEmbeddings
+from rag.segment_store import SegmentStore
+from rag.index_factory import describe_index, evaluate_index
+from rag.mmr import mmr_select, document_domain
+from rag.bm25 import BM25Index, reciprocal_rank_fusion
+from rag.metadata_index import MetadataIndex, search_parameters
+from rag.chunker import StructuralChunker
+from metrics import span
 import os
+import hashlib
 import pickle
+import threading
+import time
 import warnings
 import traceback
 import logging
+import faiss
+import numpy as np
 from dotenv import load_dotenv
 
 # Configure logging
@@ -20,6 +33,9 @@ warnings.filterwarnings("ignore", category=UserWarning)
 # Load environment variables
 load_dotenv()
 
+class VectorStoreEmptyError(ValueError):
+    """Raised when searching a vector store no documents were added to yet."""
+
 # Define RAGSystem class
 class RAGSystem:
     """
@@ -31,21 +47,53 @@ class RAGSystem:
                  db_path="vectorstore.pkl",
                  chunk_size=500,
                  chunk_overlap=50,
-                 auto_initialize=True):
+                 chunker="structural",
+                 chunk_tokens=400,
+                 auto_initialize=True,
+                 embedding_cache_path=".cache/embeddings.sqlite",
+                 compact_after=8,
+                 index_type=None,
+                 index_params=None):
         """
         Initialize the RAG system.
         
         Args:
             embedding_model: The embedding model to use
             db_path: Path to store/load the vector database
-            chunk_size: Size of text chunks for splitting documents
-            chunk_overlap: Overlap between chunks
+            chunk_size: Size of text chunks in characters (recursive chunker only)
+            chunk_overlap: Overlap between chunks in characters (recursive chunker only)
+            chunker: 'structural' for token-sized chunks split on headings, paragraphs and
+                list items, or 'recursive' for LangChain's character splitter
+            chunk_tokens: Maximum tokens per chunk (structural chunker only)
             auto_initialize: Whether to automatically initialize the system
+            embedding_cache_path: SQLite file for caching embeddings, relative to the project root
+                (None to disable)
+            compact_after: Number of pending segments that triggers background compaction
+            index_type: FAISS index type - 'flat', 'ivf_flat', 'hnsw' or 'ivf_pq' (None keeps the
+                store's current type). New stores start flat and are migrated on compaction
+                once there is enough data to train
+            index_params: Extra index settings (nlist, pq_m, hnsw_m, nprobe, ef_search)
         """
         self.db_path = db_path
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunker = chunker
+        self.chunk_tokens = chunk_tokens
         self.db = None
+        self.chunk_index = None
+        self.bm25 = None
+        self.metadata_index = None
+        self.last_ingest_stats = None
+        
+        # Snapshot + append-only segment persistence
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.store = SegmentStore(db_path, compact_after=compact_after,
+                                  index_type=index_type, index_params=self.index_params)
+        self._snapshot = None
+        self._applied_segments = set()
+        self._lock = threading.RLock()
+        self._compaction_thread = None
         
         # Initialize OpenAI embeddings if API key is available
         api_key = os.getenv("OPENAI_API_KEY", "").strip()
@@ -61,11 +109,25 @@ class RAGSystem:
                 tiktoken_model_name="cl100k_base"  # Explicitly set tokenizer
             )
             
+            # Cache vectors so repeated chunks and queries skip the provider
+            if embedding_cache_path:
+                self.embeddings = CachedEmbeddings(
+                    self.embeddings,
+                    model=embedding_model,
+                    dimensions=1536,
+                    cache_path=embedding_cache_path
+                )
+            
             # Text splitter for processing documents
-            self.text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap
-            )
+            if chunker == "structural":
+                self.text_splitter = StructuralChunker(chunk_tokens=self.chunk_tokens)
+            elif chunker == "recursive":
+                self.text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=self.chunk_size,
+                    chunk_overlap=self.chunk_overlap
+                )
+            else:
+                raise ValueError(f"Unknown chunker: {chunker}")
             
             if auto_initialize:
                 self._initialize_db()
@@ -89,51 +151,206 @@ class RAGSystem:
             logger.error(f"Failed to load database: {e}")
             raise
             
+    def _chunk_hash(self, text):
+        """Content hash of a chunk, insensitive to whitespace differences."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _chunk_index_path(self):
+        return os.path.join(self.db_path, "chunk_hashes.tsv")
+
+    def _load_chunk_index(self):
+        """
+        Load the persistent chunk hash -> docstore id index.
+        
+        Builds it from the loaded vector store the first time, so stores created
+        before deduplication existed are covered as well. A leftover index of a
+        store whose snapshot and segments are gone is discarded; the index is
+        kept while the store is merely not loaded yet.
+        
+        Returns:
+            dict: Mapping of chunk hash to docstore id
+        """
+        if self.chunk_index is not None:
+            return self.chunk_index
+            
+        self.chunk_index = {}
+        index_path = self._chunk_index_path()
+        if self.db is None:
+            store_empty = self.store.current_snapshot() is None and not self.store.list_segments()
+        else:
+            store_empty = self.db.index.ntotal == 0
+        if os.path.exists(index_path) and store_empty:
+            logger.warning(f"Vector store is empty, discarding stale chunk hashes in {index_path}")
+            os.remove(index_path)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    chunk_hash, _, doc_id = line.rstrip("\n").partition("\t")
+                    if chunk_hash and doc_id:
+                        self.chunk_index[chunk_hash] = doc_id
+            logger.info(f"Loaded {len(self.chunk_index)} chunk hashes from {index_path}")
+        elif self.db is not None:
+            for doc_id in self.db.index_to_docstore_id.values():
+                doc = self.db.docstore.search(doc_id)
+                # Docstores return an error string for unknown ids
+                if not isinstance(doc, str):
+                    self.chunk_index.setdefault(self._chunk_hash(doc.page_content), doc_id)
+            self._append_chunk_index(self.chunk_index)
+            logger.info(f"Built chunk hash index for {len(self.chunk_index)} existing chunks")
+        return self.chunk_index
+
+    def _is_indexed(self, chunk_hash):
+        """
+        Whether a chunk is already in the vector store.
+        
+        Entries whose chunk is missing from the store (e.g. its segment was
+        lost) are dropped, so the chunk is embedded again.
+        """
+        chunk_index = self._load_chunk_index()
+        doc_id = chunk_index.get(chunk_hash)
+        if doc_id is None:
+            return False
+        if self.db is None or isinstance(self.db.docstore.search(doc_id), str):
+            del chunk_index[chunk_hash]
+            return False
+        return True
+
+    def _append_chunk_index(self, entries):
+        """Append hash -> docstore id entries to the persistent index."""
+        os.makedirs(self.db_path, exist_ok=True)
+        with open(self._chunk_index_path(), "a", encoding="utf-8") as f:
+            for chunk_hash, doc_id in entries.items():
+                f.write(f"{chunk_hash}\t{doc_id}\n")
+
+    def _load_bm25(self):
+        """
+        Load the persistent BM25 index, building it from the vector store the
+        first time so stores created before it existed are searchable too.
+        
+        Returns:
+            BM25Index: The lexical index
+        """
+        if self.bm25 is not None:
+            return self.bm25
+        
+        bm25_path = os.path.join(self.db_path, "bm25_postings.jsonl")
+        exists = os.path.exists(bm25_path)
+        self.bm25 = BM25Index(bm25_path)
+        if not exists and self.db is not None:
+            documents = []
+            for doc_id in self.db.index_to_docstore_id.values():
+                doc = self.db.docstore.search(doc_id)
+                if not isinstance(doc, str):
+                    documents.append((doc_id, doc.page_content))
+            self.bm25.add(documents)
+            logger.info(f"Built BM25 index for {len(documents)} existing chunks")
+        return self.bm25
+
     def add_documents(self, texts):
         """
         Add new documents to the existing database
         
+        Chunks whose content hash is already in the store are skipped, so only
+        new chunks are embedded. Counts of new and reused chunks are logged and
+        kept in `last_ingest_stats`. Documents keep their metadata (e.g. url,
+        domain, crawled_at, topic, keyword) on every chunk.
+        
         Args:
-            texts: Text document(s) to add (string or list of strings)
+            texts: Text document(s) to add (string, Document, or a list of either)
             
         Returns:
             list: The processed chunks
         """
         try:
             logger.info("Starting to add documents to RAG system")
-            # Handle both single string and list of strings
-            if isinstance(texts, str):
+            # Handle both single items and lists
+            if isinstance(texts, str) or hasattr(texts, "page_content"):
                 texts = [texts]
                 
             if not texts:
                 raise ValueError("Empty text provided to add_documents")
                 
-            # Convert texts to Document objects
-            documents = [Document(page_content=text) for text in texts if text.strip()]
+            # Convert texts to Document objects, keeping metadata of given Documents
+            documents = []
+            for text in texts:
+                if isinstance(text, str):
+                    if text.strip():
+                        documents.append(Document(page_content=text))
+                elif text.page_content.strip():
+                    documents.append(Document(page_content=text.page_content, metadata=dict(text.metadata or {})))
             
             if not documents:
                 raise ValueError("No valid documents to add")
                 
             # Split documents into chunks
-            chunks = self.text_splitter.split_documents(documents)
+            with span("rag.chunk"):
+                chunks = self.text_splitter.split_documents(documents)
             logger.info(f"Created {len(chunks)} chunks from {len(documents)} documents")
             
             if not chunks:
                 raise ValueError("No chunks created from documents")
             
-            # Create or update vector store
-            if self.db is None:
-                logger.info("Creating new vector store as none exists")
-                self.db = FAISS.from_documents(chunks, self.embeddings)
-                logger.info(f"Vector store created with {len(chunks)} chunks")
-            else:
-                logger.info(f"Adding {len(chunks)} chunks to existing vector store")
-                self.db.add_documents(chunks)
+            # Skip chunks that are already embedded (including by other processes)
+            self.refresh()
+            new_entries = {}
+            new_chunks = []
+            reused = {}
+            for chunk in chunks:
+                chunk_hash = self._chunk_hash(chunk.page_content)
+                if chunk_hash in new_entries:
+                    continue
+                if self._is_indexed(chunk_hash):
+                    # Topic, keyword and crawl time of this occurrence are merged into the stored chunk
+                    reused.setdefault(chunk_hash, chunk.metadata)
+                    continue
+                new_entries[chunk_hash] = chunk_hash
+                new_chunks.append(chunk)
             
-            # Save the updated vector store
-            logger.info("Saving vector store to disk")
-            self._save_db()
-            logger.info("Successfully saved vector store")
+            self.last_ingest_stats = {
+                "total": len(chunks),
+                "new": len(new_chunks),
+                "reused": len(chunks) - len(new_chunks)
+            }
+            logger.info(f"Chunks: {self.last_ingest_stats['new']} new, {self.last_ingest_stats['reused']} already indexed")
+            
+            # Embed outside the lock so concurrent searches are not blocked
+            ids = list(new_entries.values())
+            chunk_texts = [chunk.page_content for chunk in new_chunks]
+            metadatas = [chunk.metadata for chunk in new_chunks]
+            vectors = []
+            if new_chunks:
+                with span("rag.embed"):
+                    vectors = self.embeddings.embed_documents(chunk_texts)
+            
+            # Create or update vector store (content hashes double as docstore ids)
+            with self._lock, span("rag.index_add"):
+                # Other threads or processes may have added the same chunks while we embedded
+                self.refresh()
+                if self.db is None:
+                    logger.info("Creating new vector store as none exists")
+                segment, updates = self._apply_segment({
+                    "ids": ids, "texts": chunk_texts, "metadatas": metadatas, "vectors": vectors, "updates": reused
+                })
+                if len(segment["ids"]) < len(ids):
+                    logger.info(f"{len(ids) - len(segment['ids'])} chunks were added concurrently, skipping them")
+                    self.last_ingest_stats["new"] = len(segment["ids"])
+                    self.last_ingest_stats["reused"] = len(chunks) - len(segment["ids"])
+                if not segment["ids"] and not updates:
+                    return chunks
+                logger.info(f"Added {len(segment['ids'])} chunks, updated metadata of {len(updates)} reused chunks")
+                
+                # Persist only the new chunks and the metadata updates as a segment
+                name = self.store.append_segment(segment["ids"], segment["texts"], segment["metadatas"],
+                                                 segment["vectors"], updates=updates)
+                self._applied_segments.add(name)
+                new_entries = {doc_id: doc_id for doc_id in segment["ids"]}
+                self._append_chunk_index(new_entries)
+                self._load_chunk_index().update(new_entries)
+                self._load_bm25().add(zip(segment["ids"], segment["texts"]))
+            
+            logger.info("Successfully persisted new chunks")
+            self._maybe_compact()
             return chunks
             
         except Exception as e:
@@ -142,18 +359,177 @@ class RAGSystem:
                 traceback.print_exc()
             raise
     
+    def _apply_segment(self, segment):
+        """
+        Add a segment to the in-memory store and index its metadata. Call with the lock held.
+        
+        Returns:
+            tuple: (the chunks actually added as a segment dict, docstore id -> metadata
+                    merged into chunks already stored)
+        """
+        start = self.db.index.ntotal if self.db is not None else 0
+        self.db, segment, updates = self.store.apply_segment(self.db, segment, self.embeddings)
+        if self.metadata_index is not None:
+            for offset, (doc_id, metadata) in enumerate(zip(segment["ids"], segment["metadatas"])):
+                self.metadata_index.add(start + offset, metadata or {}, doc_id=doc_id)
+            for doc_id, metadata in updates.items():
+                position = self.metadata_index.ids.get(doc_id)
+                if position is not None:
+                    self.metadata_index.add(position, metadata)
+        return segment, updates
+
+    def _load_metadata_index(self):
+        """
+        Build the metadata index over all vectors on first use; later segments
+        are indexed as they are applied.
+        
+        Returns:
+            MetadataIndex: The metadata index
+        """
+        if self.metadata_index is None:
+            self.metadata_index = MetadataIndex()
+            if self.db is not None:
+                for position, doc_id in self.db.index_to_docstore_id.items():
+                    doc = self.db.docstore.search(doc_id)
+                    if not isinstance(doc, str):
+                        self.metadata_index.add(position, doc.metadata or {}, doc_id=doc_id)
+                logger.info(f"Built metadata index over {self.db.index.ntotal} vectors")
+        return self.metadata_index
+
+    def _select(self, filter):
+        """
+        Resolve a metadata filter to FAISS positions. Call with the lock held.
+        
+        Args:
+            filter: Dict with any of topic, keyword, domains, exclude_domains, max_age, since
+            
+        Returns:
+            tuple: (positions, exclude) as returned by MetadataIndex.select, or None for no filter
+        """
+        if not filter:
+            return None
+        unknown = set(filter) - {"topic", "keyword", "domains", "exclude_domains", "max_age", "since"}
+        if unknown:
+            raise ValueError(f"Unknown filter fields: {sorted(unknown)}")
+        return self._load_metadata_index().select(**filter)
+
+    def _doc_id_filter(self, filter):
+        """Docstore-id predicate for a metadata filter (None for no filter). Call with the lock held."""
+        selection = self._select(filter)
+        if selection is None:
+            return None
+        positions, exclude = selection
+        doc_ids = {self.db.index_to_docstore_id[position] for position in positions.tolist()}
+        if exclude:
+            return lambda doc_id: doc_id not in doc_ids
+        return lambda doc_id: doc_id in doc_ids
+
     def _save_db(self):
-        """Save the vector database to disk."""
+        """Write the in-memory vector database to disk as a full snapshot."""
         if self.db is None:
             raise ValueError("No vector store to save")
 
         try:
-            self.db.save_local(folder_path=self.db_path)
-            logger.info(f"Vector store saved to {self.db_path}")
+            # Hold the compaction lock so a concurrent compaction cannot swap CURRENT underneath
+            with self._lock, self.store.lock():
+                folded = [name for name in self.store.list_segments() if name in self._applied_segments]
+                self._snapshot = self.store.write_snapshot(self.db, folded)
+            logger.info(f"Vector store saved to {self._snapshot}")
         except Exception as e:
             logger.error(f"Error saving vector store: {e}")
             raise
 
+    def _maybe_compact(self):
+        """Fold pending segments into a new snapshot in a background thread."""
+        if not self.store.needs_compaction():
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self._compact, name="rag-compaction", daemon=True)
+        self._compaction_thread.start()
+
+    def _compact(self):
+        try:
+            self.store.compact(self.embeddings)
+        except Exception as e:
+            logger.error(f"Error compacting vector store: {e}")
+
+    def rebuild_index(self, index_type=None, evaluate=True, **params):
+        """
+        Rebuild the vector index as another type and save it as a new snapshot.
+        
+        Args:
+            index_type: Target index type (defaults to the configured one)
+            evaluate: Whether to measure recall and latency against exact flat search
+            **params: Index settings overriding index_params
+            
+        Returns:
+            dict: Report with index type, size, build time and (optionally) recall@k
+                  and per-query latency of the new index vs. the flat baseline
+        """
+        index_type = index_type or self.index_type
+        if not index_type:
+            raise ValueError("No index type given")
+        params = {**self.index_params, **params}
+        
+        self.refresh()
+        if self.db is None:
+            raise VectorStoreEmptyError("Vector store not initialized. Please add documents first.")
+        
+        with self._lock:
+            previous_type = describe_index(self.db.index)
+            start_time = time.time()
+            vectors = self.store.convert_index(self.db, index_type, **params)
+            report = {"previous_index_type": previous_type, "build_seconds": time.time() - start_time}
+            if evaluate:
+                report.update(evaluate_index(self.db.index, vectors))
+            else:
+                report.update({"index_type": describe_index(self.db.index), "ntotal": self.db.index.ntotal})
+            
+            self.index_type = self.store.index_type = index_type
+            self.index_params = self.store.index_params = params
+            self._save_db()
+        
+        logger.info(f"Rebuilt index: {report}")
+        return report
+
+    def refresh(self):
+        """
+        Apply segments written by other processes since the store was loaded.
+        
+        Reloads the whole store only if another process compacted segments
+        this process has not seen, and loads it if it was not loaded yet
+        (e.g. with auto_initialize=False).
+        """
+        with self._lock:
+            snapshot = self.store.current_snapshot()
+            if self.db is None and snapshot is not None:
+                # Segments alone are replayed below, but a snapshot is only read by a full load
+                self.load_db()
+                return
+            if snapshot != self._snapshot:
+                if not self.store.folded_segments(snapshot) <= self._applied_segments:
+                    logger.info("Vector store was compacted by another process, reloading")
+                    self.load_db()
+                    return
+                self._snapshot = snapshot
+            
+            for name in self.store.list_segments():
+                if name in self._applied_segments:
+                    continue
+                try:
+                    segment = self.store.read_segment(name)
+                except FileNotFoundError:
+                    # Compacted meanwhile; picked up through the new snapshot next time
+                    continue
+                self._apply_segment(segment)
+                self._applied_segments.add(name)
+                if self.chunk_index is not None:
+                    self.chunk_index.update({doc_id: doc_id for doc_id in segment["ids"]})
+            
+            # Other processes append their chunks' postings next to their segments
+            if self.bm25 is not None:
+                self.bm25.refresh()
     
     def load_db(self):
         """
@@ -162,47 +538,272 @@ class RAGSystem:
             bool: True if loaded successfully, False otherwise
         """
         try:
-            if os.path.exists(os.path.join(self.db_path, "index.faiss")):
-                self.db = FAISS.load_local(folder_path=self.db_path, embeddings=self.embeddings)
+            with self._lock:
+                if self.store.current_snapshot() is None and not self.store.list_segments():
+                    logger.info(f"Vector store folder not found or missing index.faiss: {self.db_path}")
+                    return False
+                self.db, self._snapshot, self._applied_segments = self.store.load(self.embeddings)
+                self.chunk_index = None
+                self.bm25 = None
+                self.metadata_index = None
                 logger.info(f"Loaded vector store from {self.db_path}")
                 return True
-            else:
-                logger.info(f"Vector store folder not found or missing index.faiss: {self.db_path}")
-                return False
         except Exception as e:
             logger.error(f"Error loading vector store: {e}")
             raise
 
     
-    def similarity_search(self, query, k=3):
+    def similarity_search(self, query, k=3, filter=None):
         """
         Find similar documents to the query
         
         Args:
             query: The query to search for
             k: Number of results to return
+            filter: Optional metadata filter with any of topic, keyword, domains (allow list),
+                exclude_domains (deny list), max_age (seconds since crawl) and since (Unix time).
+                It is resolved through the metadata index and applied inside the FAISS search
             
         Returns:
             list: List of Document objects similar to the query
         """
+        self.refresh()
         if self.db is None:
-            raise ValueError("Vector store not initialized. Please add documents first.")
+            raise VectorStoreEmptyError("Vector store not initialized. Please add documents first.")
         
         try:
-            docs = self.db.similarity_search(query, k=k)
+            with span("rag.embed_query"):
+                embedding = self.embeddings.embed_query(query)
+            with self._lock:
+                if filter:
+                    vectors = np.asarray([embedding], dtype=np.float32)
+                    docs = [doc for _, doc, _ in self._search_vectors(vectors, k, filter=filter)[0]]
+                else:
+                    with span("rag.faiss_search"):
+                        docs = self.db.similarity_search_by_vector(embedding, k=k)
             logger.info(f"Found {len(docs)} relevant documents for query")
             return docs
         except Exception as e:
             logger.error(f"Error during similarity search: {e}")
             raise
-    
-    def retrieve_relevant_content(self, query, k=3):
+
+    def similarity_search_batch(self, queries, k=3, filter=None):
+        """
+        Find similar documents for several queries at once
+
+        All queries are embedded in one provider call and searched with a single
+        FAISS search over the query matrix.
+
+        Args:
+            queries: List of queries to search for
+            k: Number of results to return per query
+            filter: Optional metadata filter (see similarity_search)
+
+        Returns:
+            list: One list of (Document, score) tuples per query, in query order.
+                  Scores are L2 distances, lower is more similar
+        """
+        if not queries:
+            return []
+        if any(not query or not query.strip() for query in queries):
+            raise ValueError("Empty query provided")
+
+        self.refresh()
+        if self.db is None:
+            raise VectorStoreEmptyError("Vector store not initialized. Please add documents first.")
+
+        try:
+            vectors = np.asarray(self.embeddings.embed_documents(list(queries)), dtype=np.float32)
+            with self._lock:
+                results = [
+                    [(doc, score) for _, doc, score in hits]
+                    for hits in self._search_vectors(vectors, k, filter=filter)
+                ]
+            logger.info(f"Found {sum(len(docs) for docs in results)} relevant documents for {len(queries)} queries")
+            return results
+        except Exception as e:
+            logger.error(f"Error during batch similarity search: {e}")
+            raise
+
+    def _search_vectors(self, vectors, k, filter=None):
+        """
+        Search the index for a matrix of query vectors. Call with the lock held.
+
+        Args:
+            vectors: float32 query matrix
+            k: Number of neighbors per query
+            filter: Optional metadata filter (see similarity_search)
+
+        Returns:
+            list: One list of (position, Document, score) tuples per query
+        """
+        if self.db._normalize_L2:
+            faiss.normalize_L2(vectors)
+        
+        with span("rag.faiss_search", filtered=bool(filter)):
+            selection = self._select(filter)
+            if selection is None:
+                scores, indices = self.db.index.search(vectors, k)
+            else:
+                positions, exclude = selection
+                if not exclude and len(positions) == 0:
+                    return [[] for _ in range(len(vectors))]
+                params, keep_alive = search_parameters(self.db.index, positions, exclude=exclude)
+                scores, indices = self.db.index.search(vectors, k, params=params)
+
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            hits = []
+            for score, position in zip(row_scores, row_indices):
+                # FAISS pads with -1 when fewer than k vectors exist
+                if position == -1:
+                    continue
+                doc = self.db.docstore.search(self.db.index_to_docstore_id[position])
+                if isinstance(doc, str):
+                    continue
+                hits.append((int(position), doc, float(score)))
+            results.append(hits)
+        return results
+
+    def _candidate_vectors(self, positions, docs):
+        """Stored vectors of search hits (re-embedded from the cache if the index cannot reconstruct them)."""
+        try:
+            return np.vstack([self.db.index.reconstruct(position) for position in positions])
+        except RuntimeError:
+            # IVF indexes without a direct map cannot reconstruct
+            return np.asarray(self.embeddings.embed_documents([doc.page_content for doc in docs]), dtype=np.float32)
+
+    def mmr_search(self, query, k=5, fetch_k=20, lambda_mult=0.5, max_per_domain=None, filter=None):
+        """
+        Find relevant but mutually diverse documents for the query
+        
+        Fetches the `fetch_k` nearest chunks and reranks them with maximal
+        marginal relevance over their stored vectors, so near-duplicates of an
+        already selected chunk are skipped. Optionally caps how many chunks may
+        come from the same source domain.
+        
+        Args:
+            query: The query to search for
+            k: Number of results to return
+            fetch_k: Number of nearest candidates to rerank
+            lambda_mult: Trade-off between relevance (1) and diversity (0)
+            max_per_domain: Maximum results per source domain (None for no cap)
+            filter: Optional metadata filter (see similarity_search)
+            
+        Returns:
+            list: (Document, score) tuples in MMR order. Scores are L2 distances
+        """
+        if not query or query.strip() == "":
+            raise ValueError("Empty query provided")
+        
+        self.refresh()
+        if self.db is None:
+            raise VectorStoreEmptyError("Vector store not initialized. Please add documents first.")
+        
+        try:
+            with span("rag.embed_query"):
+                query_vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+            with self._lock:
+                hits = self._search_vectors(query_vector, max(fetch_k, k), filter=filter)[0]
+                if not hits:
+                    return []
+                positions, docs, scores = zip(*hits)
+                candidates = self._candidate_vectors(positions, docs)
+            
+            domains = [document_domain(doc) for doc in docs]
+            selected = mmr_select(query_vector[0], candidates, k, lambda_mult=lambda_mult,
+                                  groups=domains, max_per_group=max_per_domain)
+            logger.info(f"Selected {len(selected)} of {len(hits)} candidates with MMR")
+            return [(docs[i], scores[i]) for i in selected]
+        except Exception as e:
+            logger.error(f"Error during MMR search: {e}")
+            raise
+
+    def lexical_search(self, query, k=5, filter=None):
+        """
+        Find documents matching the query terms with BM25, without an embedding call
+        
+        Args:
+            query: The query to search for
+            k: Number of results to return
+            filter: Optional metadata filter (see similarity_search)
+            
+        Returns:
+            list: (Document, score) tuples, best first. Scores are BM25 scores, higher is better
+        """
+        if not query or query.strip() == "":
+            raise ValueError("Empty query provided")
+        
+        self.refresh()
+        if self.db is None:
+            raise VectorStoreEmptyError("Vector store not initialized. Please add documents first.")
+        
+        with self._lock:
+            results = []
+            for doc_id, score in self._load_bm25().search(query, k=k, doc_filter=self._doc_id_filter(filter)):
+                doc = self.db.docstore.search(doc_id)
+                if not isinstance(doc, str):
+                    results.append((doc, score))
+        logger.info(f"Found {len(results)} documents with lexical search")
+        return results
+
+    def hybrid_search(self, query, k=5, fetch_k=20, rrf_k=60, filter=None):
+        """
+        Combine dense and BM25 retrieval with reciprocal rank fusion
+        
+        Exact term matches (product, bank or loan names) that dense search ranks
+        low are pulled up by the lexical ranking, and vice versa.
+        
+        Args:
+            query: The query to search for
+            k: Number of results to return
+            fetch_k: Candidates taken from each ranking
+            rrf_k: Reciprocal rank fusion damping constant
+            filter: Optional metadata filter (see similarity_search)
+            
+        Returns:
+            list: (Document, score) tuples, best first. Scores are fused RRF scores, higher is better
+        """
+        if not query or query.strip() == "":
+            raise ValueError("Empty query provided")
+        
+        self.refresh()
+        if self.db is None:
+            raise VectorStoreEmptyError("Vector store not initialized. Please add documents first.")
+        
+        try:
+            with span("rag.embed_query"):
+                query_vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+            with self._lock:
+                dense_hits = self._search_vectors(query_vector, fetch_k, filter=filter)[0]
+                dense_ranking = [self.db.index_to_docstore_id[position] for position, _, _ in dense_hits]
+                lexical_ranking = [doc_id for doc_id, _ in self._load_bm25().search(query, k=fetch_k, doc_filter=self._doc_id_filter(filter))]
+                
+                docs = {self.db.index_to_docstore_id[position]: doc for position, doc, _ in dense_hits}
+                results = []
+                for doc_id, score in reciprocal_rank_fusion([dense_ranking, lexical_ranking], k=rrf_k)[:k]:
+                    doc = docs.get(doc_id) or self.db.docstore.search(doc_id)
+                    if not isinstance(doc, str):
+                        results.append((doc, score))
+            logger.info(f"Fused {len(dense_ranking)} dense and {len(lexical_ranking)} lexical candidates into {len(results)} results")
+            return results
+        except Exception as e:
+            logger.error(f"Error during hybrid search: {e}")
+            raise
+
+    def retrieve_relevant_content(self, query, k=3, mode="mmr", fetch_k=None, lambda_mult=0.5, max_per_domain=2, filter=None):
         """
         Retrieve relevant content based on the query
         
         Args:
             query: The query to search for
             k: Number of results to return
+            mode: 'mmr' (diverse dense results), 'similarity' (nearest chunks),
+                'hybrid' (dense + BM25 fused) or 'lexical' (BM25 only, no embedding call)
+            fetch_k: Candidates considered for reranking or fusion (default max(4 * k, 20))
+            lambda_mult: Trade-off between relevance (1) and diversity (0) for 'mmr'
+            max_per_domain: Maximum chunks per source domain for 'mmr'
+            filter: Optional metadata filter (see similarity_search)
             
         Returns:
             str: Formatted content from relevant documents
@@ -211,8 +812,19 @@ class RAGSystem:
             raise ValueError("Empty query provided")
         
         try:
-            # Increase k to get more diverse results
-            relevant_docs = self.similarity_search(query, k=k*2)
+            fetch_k = fetch_k or max(4 * k, 20)
+            if mode == "mmr":
+                results = self.mmr_search(query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult,
+                                          max_per_domain=max_per_domain, filter=filter)
+                relevant_docs = [doc for doc, _ in results]
+            elif mode == "hybrid":
+                relevant_docs = [doc for doc, _ in self.hybrid_search(query, k=k, fetch_k=fetch_k, filter=filter)]
+            elif mode == "lexical":
+                relevant_docs = [doc for doc, _ in self.lexical_search(query, k=k, filter=filter)]
+            elif mode == "similarity":
+                relevant_docs = self.similarity_search(query, k=k, filter=filter)
+            else:
+                raise ValueError(f"Unknown retrieval mode '{mode}'")
             if not relevant_docs:
                 return "No relevant content found for the query."
                 
@@ -0,0 +1,465 @@
+#Incremental vector store persistence
+from langchain_community.vectorstores import FAISS
+from rag.docstore import SnapshotReader, SnapshotDocstore, SnapshotIndexMap, write_snapshot_docstore
+from rag.index_factory import describe_index, extract_vectors, build_index
+from rag.layered_index import LayeredIndex
+from rag.metadata_index import merge_metadata
+import os
+import time
+import uuid
+import pickle
+import shutil
+import logging
+from contextlib import contextmanager
+import faiss
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('segment_store')
+
+class SegmentStore:
+    """
+    On-disk layout of a FAISS store as a snapshot plus append-only segments.
+
+    Layout under `db_path`:
+        CURRENT                 name of the active snapshot directory
+        snapshot-<n>/           index.faiss (vectors), docstore.sqlite (documents and
+                                position -> id map) and FOLDED, the names of the
+                                segments it already contains
+        segments/*.seg          chunks added since the snapshot (ids, texts, metadatas, vectors)
+                                and metadata updates of chunks ingested again
+
+    Adding chunks only writes a new segment file, so write cost is proportional
+    to the new chunks. Compaction folds all segments into a new snapshot and
+    switches CURRENT with an atomic rename. Snapshot vectors are memory-mapped
+    and documents are read lazily, so loading does not depend on corpus size and
+    processes share pages through the OS cache. Vectors added on top of a mapped
+    snapshot go to a side index (see LayeredIndex), so the mapping stays shared. Stores saved by plain save_local
+    (index.faiss + index.pkl), including directly in `db_path`, are still read.
+    """
+    def __init__(self, db_path, compact_after=8, lock_timeout=600, index_type=None, index_params=None):
+        """
+        Initialize the segment store.
+
+        Args:
+            db_path: Directory holding the vector store
+            compact_after: Number of pending segments that triggers compaction
+            lock_timeout: Seconds after which a compaction lock is considered stale
+            index_type: Index type compaction migrates the snapshot to (None keeps the current one)
+            index_params: Extra arguments for build_index
+        """
+        self.db_path = db_path
+        self.segments_path = os.path.join(db_path, "segments")
+        self.compact_after = compact_after
+        self.lock_timeout = lock_timeout
+        self.index_type = index_type
+        self.index_params = index_params or {}
+
+    def _current_file(self):
+        return os.path.join(self.db_path, "CURRENT")
+
+    def _lock_file(self):
+        return os.path.join(self.db_path, ".compact.lock")
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def current_snapshot(self):
+        """
+        Get the directory of the active snapshot.
+
+        Returns:
+            str: Snapshot directory, or None if the store has no snapshot yet
+        """
+        try:
+            with open(self._current_file(), "r") as f:
+                name = f.read().strip()
+            if name:
+                return os.path.join(self.db_path, name)
+        except FileNotFoundError:
+            pass
+
+        # Legacy layout written by save_local directly into db_path
+        if os.path.exists(os.path.join(self.db_path, "index.faiss")):
+            return self.db_path
+        return None
+
+    def folded_segments(self, snapshot):
+        """
+        Get the names of the segments already contained in a snapshot.
+
+        Args:
+            snapshot: Snapshot directory
+
+        Returns:
+            set: Segment names
+        """
+        if not snapshot:
+            return set()
+        try:
+            with open(os.path.join(snapshot, "FOLDED"), "r") as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def list_segments(self):
+        """
+        List pending segment files in write order.
+
+        Returns:
+            list: Segment file names
+        """
+        if not os.path.isdir(self.segments_path):
+            return []
+        return sorted(name for name in os.listdir(self.segments_path) if name.endswith(".seg"))
+
+    def read_segment(self, name):
+        """
+        Read a segment file.
+
+        Args:
+            name: Segment file name
+
+        Returns:
+            dict: ids, texts, metadatas and vectors of the segment
+        """
+        with open(os.path.join(self.segments_path, name), "rb") as f:
+            return pickle.load(f)
+
+    def append_segment(self, ids, texts, metadatas, vectors, updates=None):
+        """
+        Persist newly added chunks as a segment file.
+
+        Args:
+            ids: Docstore ids of the chunks
+            texts: Chunk texts
+            metadatas: Chunk metadata dicts
+            vectors: Chunk embeddings
+            updates: Docstore id -> metadata of reused chunks, merged into the stored ones
+
+        Returns:
+            str: Name of the written segment
+        """
+        os.makedirs(self.segments_path, exist_ok=True)
+        name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.seg"
+        segment = {
+            "ids": list(ids),
+            "texts": list(texts),
+            "metadatas": list(metadatas),
+            "vectors": np.asarray(vectors, dtype=np.float32),
+            "updates": dict(updates or {})
+        }
+        self._write_atomic(os.path.join(self.segments_path, name), pickle.dumps(segment))
+        logger.info(f"Appended segment {name} with {len(ids)} chunks and {len(segment['updates'])} metadata updates")
+        return name
+
+    def load_snapshot(self, snapshot, embeddings):
+        """
+        Open a snapshot as a FAISS store.
+
+        Args:
+            snapshot: Snapshot directory
+            embeddings: Embeddings used by the store
+
+        Returns:
+            FAISS: Store with a memory-mapped index and lazily-read docstore
+        """
+        docstore_path = os.path.join(snapshot, "docstore.sqlite")
+        if not os.path.exists(docstore_path):
+            return FAISS.load_local(folder_path=snapshot, embeddings=embeddings)
+
+        index_path = os.path.join(snapshot, "index.faiss")
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if mmap_flag is None:
+            index = faiss.read_index(index_path)
+        else:
+            index = faiss.read_index(index_path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+
+        reader = SnapshotReader(docstore_path)
+        base_count = index.ntotal
+        if mmap_flag is not None:
+            # Keep the mapped pages shared and read-only; new vectors go to a side index
+            index = LayeredIndex(index)
+        return FAISS(embeddings, index, SnapshotDocstore(reader), SnapshotIndexMap(reader, base_count))
+
+    def convert_index(self, db, index_type, **params):
+        """
+        Replace a store's index with a newly built one of another type.
+
+        Args:
+            db: FAISS store to convert
+            index_type: Target index type
+            **params: Extra arguments for build_index
+
+        Returns:
+            np.ndarray: The vectors the new index was built from
+        """
+        vectors = extract_vectors(db.index)
+        db.index = build_index(index_type, vectors, **params)
+        return vectors
+
+    def new_chunks(self, db, segment):
+        """
+        Split a segment's chunks into those not yet in a store and those already in it.
+
+        Concurrent writers can persist the same chunk in two segments; adding
+        an id twice would leave the store's position -> id map inconsistent.
+
+        Args:
+            db: FAISS store (None if there is none yet)
+            segment: Segment dict as returned by read_segment
+
+        Returns:
+            tuple: (segment with only the chunks not yet in `db`, each id once,
+                    dict of docstore id -> metadata for the chunks already in `db`)
+        """
+        seen = set()
+        keep = []
+        existing = {}
+        for offset, (doc_id, metadata) in enumerate(zip(segment["ids"], segment["metadatas"])):
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            # Docstores return an error string for unknown ids
+            if db is not None and not isinstance(db.docstore.search(doc_id), str):
+                existing[doc_id] = metadata or {}
+                continue
+            keep.append(offset)
+        if len(keep) == len(segment["ids"]):
+            return segment, existing
+        vectors = np.asarray(segment["vectors"], dtype=np.float32)
+        return {
+            "ids": [segment["ids"][offset] for offset in keep],
+            "texts": [segment["texts"][offset] for offset in keep],
+            "metadatas": [segment["metadatas"][offset] for offset in keep],
+            "vectors": vectors[keep]
+        }, existing
+
+    def update_metadata(self, db, doc_id, metadata):
+        """
+        Merge the metadata of a chunk seen again into the stored document.
+
+        Args:
+            db: FAISS store holding the chunk
+            doc_id: Docstore id of the chunk
+            metadata: Metadata of the new occurrence
+
+        Returns:
+            dict: The merged metadata, or None if the chunk is unknown or nothing changed
+        """
+        doc = db.docstore.search(doc_id)
+        if isinstance(doc, str):
+            return None
+        merged = merge_metadata(doc.metadata or {}, metadata)
+        if merged is None:
+            return None
+        doc.metadata = merged
+        if isinstance(db.docstore, SnapshotDocstore):
+            # Snapshot documents are read from SQLite; keep the merged copy in memory
+            db.docstore.add({doc_id: doc})
+        return merged
+
+    def apply_segment(self, db, segment, embeddings):
+        """
+        Add a segment's chunks to an in-memory FAISS store.
+
+        Chunks already in the store are not added again, so stores holding the
+        same chunk in several segments still load; their metadata (and the
+        segment's `updates` for reused chunks) is merged into the stored
+        documents instead.
+
+        Args:
+            db: FAISS store to extend (None to create one)
+            segment: Segment dict as returned by read_segment
+            embeddings: Embeddings used by the store
+
+        Returns:
+            tuple: (the extended (or newly created) store, the chunks added as a segment dict,
+                    dict of docstore id -> metadata merged into chunks already stored)
+        """
+        explicit_updates = segment.get("updates") or {}
+        segment, updates = self.new_chunks(db, segment)
+        updates.update(explicit_updates)
+        if segment["ids"]:
+            vectors = np.asarray(segment["vectors"], dtype=np.float32).tolist()
+            text_embeddings = list(zip(segment["texts"], vectors))
+            if db is None:
+                db = FAISS.from_embeddings(text_embeddings, embeddings,
+                                           metadatas=segment["metadatas"], ids=segment["ids"])
+            else:
+                db.add_embeddings(text_embeddings, metadatas=segment["metadatas"], ids=segment["ids"])
+
+        merged = {}
+        if db is not None:
+            for doc_id, metadata in updates.items():
+                if self.update_metadata(db, doc_id, metadata) is not None:
+                    merged[doc_id] = metadata
+        return db, segment, merged
+
+    def load(self, embeddings, retries=3):
+        """
+        Load the active snapshot and replay all pending segments.
+
+        Args:
+            embeddings: Embeddings used by the store
+            retries: Attempts if a concurrent compaction swaps the snapshot mid-load
+
+        Returns:
+            tuple: (FAISS store or None, snapshot directory, set of segment names contained in the store)
+        """
+        for attempt in range(retries):
+            snapshot = self.current_snapshot()
+            try:
+                db = self.load_snapshot(snapshot, embeddings) if snapshot else None
+                applied = self.folded_segments(snapshot)
+                replayed = 0
+                for name in self.list_segments():
+                    if name in applied:
+                        continue
+                    db, _, _ = self.apply_segment(db, self.read_segment(name), embeddings)
+                    applied.add(name)
+                    replayed += 1
+            except FileNotFoundError:
+                logger.info("Store changed while loading, retrying")
+                continue
+
+            if self.current_snapshot() == snapshot:
+                if replayed:
+                    logger.info(f"Replayed {replayed} segments on top of {snapshot}")
+                return db, snapshot, applied
+            logger.info("Snapshot was compacted while loading, retrying")
+        raise RuntimeError(f"Could not load a consistent vector store from {self.db_path}")
+
+    def needs_compaction(self):
+        """Whether enough segments are pending to warrant compaction."""
+        return len(self.list_segments()) >= self.compact_after
+
+    def _acquire_lock(self):
+        lock_file = self._lock_file()
+        try:
+            if time.time() - os.path.getmtime(lock_file) > self.lock_timeout:
+                logger.warning("Removing stale compaction lock")
+                os.remove(lock_file)
+        except FileNotFoundError:
+            pass
+        try:
+            fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return True
+        except FileExistsError:
+            return False
+
+    def _release_lock(self):
+        try:
+            os.remove(self._lock_file())
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, timeout=60):
+        """
+        Hold the compaction lock, waiting for a running compaction to finish.
+
+        Args:
+            timeout: Seconds to wait before giving up
+
+        Raises:
+            TimeoutError: If the lock is not acquired in time
+        """
+        os.makedirs(self.db_path, exist_ok=True)
+        deadline = time.time() + timeout
+        while not self._acquire_lock():
+            if time.time() > deadline:
+                raise TimeoutError(f"Timed out waiting for the lock on {self.db_path}")
+            time.sleep(0.1)
+        try:
+            yield
+        finally:
+            self._release_lock()
+
+    def write_snapshot(self, db, folded_segments=()):
+        """
+        Save a store as the new active snapshot and drop the segments it contains.
+
+        Args:
+            db: FAISS store to save
+            folded_segments: Segment names already contained in `db`
+
+        Returns:
+            str: Directory of the new snapshot
+        """
+        old_snapshot = self.current_snapshot()
+        name = f"snapshot-{time.time_ns():020d}"
+        tmp_path = os.path.join(self.db_path, f"{name}.tmp")
+        os.makedirs(tmp_path)
+        index = db.index.merged() if isinstance(db.index, LayeredIndex) else db.index
+        faiss.write_index(index, os.path.join(tmp_path, "index.faiss"))
+        write_snapshot_docstore(os.path.join(tmp_path, "docstore.sqlite"), db.index_to_docstore_id, db.docstore)
+        with open(os.path.join(tmp_path, "FOLDED"), "w") as f:
+            f.write("".join(f"{segment}\n" for segment in sorted(folded_segments)))
+        snapshot = os.path.join(self.db_path, name)
+        os.rename(tmp_path, snapshot)
+        self._write_atomic(self._current_file(), name.encode())
+
+        # Readers skip segments listed in FOLDED, so deleting them can lag the switch
+        for segment in folded_segments:
+            try:
+                os.remove(os.path.join(self.segments_path, segment))
+            except FileNotFoundError:
+                pass
+
+        # Remove the superseded snapshot
+        if old_snapshot == self.db_path:
+            for legacy_file in ("index.faiss", "index.pkl"):
+                path = os.path.join(self.db_path, legacy_file)
+                if os.path.exists(path):
+                    os.remove(path)
+        elif old_snapshot:
+            shutil.rmtree(old_snapshot, ignore_errors=True)
+        logger.info(f"Wrote snapshot {name} ({len(folded_segments)} segments folded)")
+        return snapshot
+
+    def compact(self, embeddings):
+        """
+        Fold all pending segments into a new snapshot.
+
+        The store is rebuilt from disk rather than from any process's in-memory
+        copy, so segments written by other processes are never lost.
+
+        Args:
+            embeddings: Embeddings used by the store
+
+        Returns:
+            bool: True if a new snapshot was written
+        """
+        os.makedirs(self.db_path, exist_ok=True)
+        if not self._acquire_lock():
+            logger.info("Compaction already running elsewhere, skipping")
+            return False
+        try:
+            start_time = time.time()
+            db, snapshot, applied = self.load(embeddings)
+            segments = [name for name in self.list_segments() if name in applied]
+            if db is None or not segments:
+                return False
+
+            # Migrate to the configured index type once there is enough data to train it
+            current_type = describe_index(db.index)
+            if self.index_type and current_type != self.index_type:
+                try:
+                    self.convert_index(db, self.index_type, **self.index_params)
+                    logger.info(f"Migrated index from {current_type} to {self.index_type}")
+                except ValueError as e:
+                    logger.info(f"Keeping {current_type} index: {e}")
+
+            self.write_snapshot(db, segments)
+            logger.info(f"Compacted {len(segments)} segments in {time.time() - start_time:.2f}s")
+            return True
+        finally:
+            self._release_lock()
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import pytest
+from langchain_core.embeddings import Embeddings
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class SlowFakeEmbeddings(Embeddings):
+    """Deterministic embeddings that take a while, so concurrent ingests overlap."""
+    def __init__(self, size=16, delay=0.05):
+        self.fake = DeterministicFakeEmbedding(size=size)
+        self.delay = delay
+
+    def embed_documents(self, texts):
+        time.sleep(self.delay)
+        return self.fake.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.fake.embed_query(text)
+
+@pytest.fixture
+def make_rag(tmp_path, monkeypatch):
+    """Factory for RAG systems sharing one store directory, with fake embeddings."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from rag.rag import RAGSystem
+
+    def factory(initialize=True, **kwargs):
+        kwargs.setdefault("chunker", "recursive")
+        kwargs.setdefault("compact_after", 100)
+        rag_system = RAGSystem(db_path=str(tmp_path / "store"), auto_initialize=False,
+                               embedding_cache_path=None, **kwargs)
+        rag_system.embeddings = SlowFakeEmbeddings()
+        if initialize:
+            rag_system._initialize_db()
+        return rag_system
+
+    return factory
@@ -0,0 +1,14 @@
+from langchain_core.documents import Document
+
+def pages(prefix, count, **metadata):
+    return [Document(page_content=f"{prefix} paragraph {i} about personal loans", metadata=dict(metadata))
+            for i in range(count)]
+
+def assert_consistent(rag_system, expected):
+    db = rag_system.db
+    assert db.index.ntotal == expected
+    assert len(db.index_to_docstore_id) == expected
+    doc_ids = [db.index_to_docstore_id[position] for position in range(expected)]
+    assert len(set(doc_ids)) == expected
+    for doc_id in doc_ids:
+        assert not isinstance(db.docstore.search(doc_id), str)
@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from langchain_community.llms.fake import FakeListLLM
+from langchain_core.documents import Document
+from agent.base import BlogAgent
+from agent.llm_cache import LLMResponseCache
+from rag.rag import VectorStoreEmptyError
+
+class StubRAG:
+    def __init__(self, results=None, error=None):
+        self.results = results or []
+        self.error = error
+        self.added = []
+
+    def add_documents(self, documents):
+        self.added.extend(documents)
+
+    def mmr_search(self, query, k=5, fetch_k=20, max_per_domain=None):
+        if self.error is not None:
+            raise self.error
+        return self.results
+
+def make_agent(responses, rag_system=None, **kwargs):
+    return BlogAgent(rag_system=rag_system or StubRAG(), llm=FakeListLLM(responses=responses), **kwargs)
+
+def test_sync_methods_wrap_the_async_ones():
+    agent = make_agent(["Personal Loans", "best personal loan rates", "home loan"])
+    assert agent.User_input("write about personal loans") == "Personal Loans"
+    assert agent.refine_query("Personal Loans") == "best personal loan rates"
+    assert agent.select_relevant_keyword("loans", ["car loan", "home loan"]) == "home loan"
+    with pytest.raises(ValueError, match="No topics"):
+        agent.generate_keyword_list("loans", [])
+
+def test_invalid_keyword_selection_is_not_cached():
+    cache = LLMResponseCache()
+    agent = make_agent(["bicycles", "home loan"], llm_cache=cache)
+    with pytest.raises(ValueError, match="Invalid keyword"):
+        agent.select_relevant_keyword("loans", ["car loan", "home loan"])
+    assert agent.select_relevant_keyword("loans", ["car loan", "home loan"]) == "home loan"
+    # The valid answer is served from the cache now
+    assert agent.select_relevant_keyword("loans", ["car loan", "home loan"]) == "home loan"
+    assert cache.stats()["hits"] == 1
+
+def test_retrieval_keeps_the_mmr_order():
+    results = [(Document(page_content="first"), 0.1), (Document(page_content="second"), 0.3)]
+    agent = make_agent([], rag_system=StubRAG(results=results))
+    chunks = agent._retrieve_chunks("loans")
+    assert [text for text, _ in chunks] == ["first", "second"]
+    assert chunks[0][1] > chunks[1][1]
+
+def test_empty_store_generates_without_retrieved_content():
+    agent = make_agent(["personal loan rates"], rag_system=StubRAG(error=VectorStoreEmptyError("empty")))
+    prompt = asyncio.run(agent.acreate_system_prompt("Personal Loans", [], "rates", "Helpful", "general", None))
+    assert "Personal Loans" in prompt
+    assert agent.last_context_report["chunks_used"] == 0
+
+def test_retrieval_errors_are_raised():
+    agent = make_agent([], rag_system=StubRAG(error=RuntimeError("embedding API unavailable")))
+    with pytest.raises(RuntimeError, match="embedding API"):
+        agent._retrieve_chunks("loans")
@@ -0,0 +1,66 @@
+import json
+import asyncio
+from batch_generate import BatchRunner, load_checkpoint, load_requests
+
+class FakeAgent:
+    def __init__(self, generated, fail_topics):
+        self.generated = generated
+        self.fail_topics = fail_topics
+        self.ingest_queue = None
+
+    async def agenerate_blog(self, user_input, extract_topic=True):
+        assert not extract_topic
+        self.generated.append(user_input)
+        await asyncio.sleep(0.01)
+        if user_input in self.fail_topics:
+            raise RuntimeError("search quota exceeded")
+        return {"topic": user_input, "content": f"blog about {user_input}", "user_input": user_input,
+                "timings": {"pipeline": 0.1}, "context": None}
+
+class FakePool:
+    background_ingest = False
+
+    def __init__(self, fail_topics=()):
+        self.generated = []
+        self.fail_topics = set(fail_topics)
+
+    def get_agent(self, model_name="gpt-4o", temperature=0.7, session_id=None):
+        return FakeAgent(self.generated, self.fail_topics)
+
+class FakeTools:
+    def save_blog(self, blog_data, output_dir=None):
+        return f"{output_dir}/{blog_data['topic']}.md"
+
+def write_requests(path, topics):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, topic in enumerate(topics, 1):
+            f.write(json.dumps({"id": f"r{i}", "topic": topic}) + "\n")
+
+def test_resume_skips_requests_done_in_the_checkpoint(tmp_path):
+    requests_path = tmp_path / "requests.jsonl"
+    write_requests(requests_path, ["loans", "mortgages", "cards"])
+    checkpoint_path = str(tmp_path / "out" / "checkpoint.jsonl")
+    requests = load_requests(str(requests_path))
+
+    first = FakePool(fail_topics={"mortgages"})
+    results = asyncio.run(BatchRunner(first, FakeTools(), checkpoint_path, concurrency=2).run(requests))
+    assert [(result["id"], result["status"]) for result in results] == [
+        ("r1", "done"), ("r2", "failed"), ("r3", "done")]
+    assert results[0]["file_path"] == "generated_blogs/loans.md"
+
+    # A crash while writing leaves a partial last line behind
+    with open(checkpoint_path, "a", encoding="utf-8") as f:
+        f.write('{"id": "r3", "status": "fail')
+
+    second = FakePool()
+    results = asyncio.run(BatchRunner(second, FakeTools(), checkpoint_path).run(requests))
+    # Only the failed request runs again
+    assert second.generated == ["mortgages"]
+    assert [(result["id"], result["status"]) for result in results] == [("r2", "done")]
+    assert {request_id: result["status"] for request_id, result in load_checkpoint(checkpoint_path).items()} == {
+        "r1": "done", "r2": "done", "r3": "done"}
+
+def test_load_requests_accepts_titles_and_skips_lines_without_a_topic(tmp_path):
+    path = tmp_path / "requests.jsonl"
+    path.write_text('{"title": "loans"}\n\n{"request_id": "x", "topic": "cards"}\n{"id": "y"}\n', encoding="utf-8")
+    assert [(request["id"], request["topic"]) for request in load_requests(str(path))] == [("1", "loans"), ("x", "cards")]
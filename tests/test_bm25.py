@@ -0,0 +1,34 @@
+from rag.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("What is the best Personal-Loan rate?") == ["best", "personal", "loan", "rate"]
+
+def test_search_ranks_matching_documents():
+    index = BM25Index()
+    index.add([("a", "personal loan interest rates"), ("b", "home loan tips"), ("c", "credit card rewards")])
+    ranked = [doc_id for doc_id, _ in index.search("personal loan", k=3)]
+    assert ranked[:2] == ["a", "b"]
+    assert "c" not in ranked
+    assert index.search("personal loan", doc_filter=lambda doc_id: doc_id != "a")[0][0] == "b"
+
+def test_refresh_sees_lines_appended_by_other_instances(tmp_path):
+    path = str(tmp_path / "bm25.jsonl")
+    first = BM25Index(path)
+    first.add([("a1", "apple orchard")])
+    second = BM25Index(path)
+    second.add([("b1", "zebra crossing")])
+
+    # first appends after second without refreshing in between
+    first.add([("a2", "banana plantation")])
+    first.refresh()
+    assert first.search("zebra") and first.search("zebra")[0][0] == "b1"
+    assert len(first) == 3
+
+    second.refresh()
+    assert second.search("banana")[0][0] == "a2"
+    assert len(BM25Index(path)) == 3
+
+def test_reciprocal_rank_fusion_prefers_ids_ranked_high_everywhere():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a", "d"]])
+    assert [doc_id for doc_id, _ in fused][:2] in (["a", "b"], ["b", "a"])
+    assert fused[-1][0] in ("c", "d")
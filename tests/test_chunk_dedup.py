@@ -0,0 +1,28 @@
+import os
+from store_helpers import pages, assert_consistent
+
+def test_stale_chunk_hashes_are_reembedded(make_rag):
+    rag_system = make_rag()
+    rag_system.add_documents(pages("lost", 4))
+    for name in rag_system.store.list_segments():
+        os.remove(os.path.join(rag_system.store.segments_path, name))
+
+    fresh = make_rag()
+    fresh.add_documents(pages("lost", 4))
+    assert fresh.last_ingest_stats["new"] == 4
+    assert_consistent(make_rag(), 4)
+
+def test_unloaded_snapshot_is_loaded_before_deduplicating(make_rag):
+    writer = make_rag()
+    writer.add_documents(pages("kept", 4))
+    assert writer.store.compact(writer.embeddings)
+    # Snapshots written before FOLDED existed list no segments
+    os.remove(os.path.join(writer.store.current_snapshot(), "FOLDED"))
+
+    rag_system = make_rag(initialize=False)
+    assert rag_system.db is None
+    rag_system.add_documents(pages("kept", 4) + pages("added", 2))
+    assert rag_system.last_ingest_stats["new"] == 2
+    assert os.path.exists(rag_system._chunk_index_path())
+    assert_consistent(rag_system, 6)
+    assert_consistent(make_rag(), 6)
@@ -0,0 +1,48 @@
+import pytest
+from langchain_core.documents import Document
+import rag.chunker as chunker_module
+from rag.chunker import StructuralChunker, iter_blocks
+
+@pytest.fixture
+def chunker(monkeypatch):
+    # Count tokens with the 4-characters-per-token estimate, so no encoding is downloaded
+    monkeypatch.setitem(chunker_module._encodings, "estimate", None)
+    return StructuralChunker(chunk_tokens=40, min_chunk_tokens=10, encoding_name="estimate")
+
+def page():
+    sentences = " ".join(f"Sentence {i} explains how personal loan rates are set." for i in range(12))
+    items = "\n".join(f"- Item {i} compares the fees of two lenders" for i in range(10))
+    return (f"# Personal loans\n\n{sentences}\n\n## Fees\n\n{items}\n\n"
+            f"## Glossary\n\n{'z' * 500}\n\n## Trailing")
+
+def test_iter_blocks_classifies_structure():
+    text = "# Title\n\nFirst line\nsecond line\n\n- one\n- two\n\n1. first"
+    assert list(iter_blocks(text)) == [
+        ("heading", "# Title"), ("paragraph", "First line\nsecond line"), ("list", "- one\n- two"), ("list", "1. first")]
+
+def test_chunks_stay_within_the_token_limit(chunker):
+    chunks = list(chunker.iter_chunks(page()))
+    assert len(chunks) > 5
+    for text, _ in chunks:
+        assert chunker.count_tokens(text) <= chunker.chunk_tokens
+    # Nothing is lost apart from whitespace
+    joined = "".join(text for text, _ in chunks)
+    assert joined.count("z") == 500
+    assert all(f"Sentence {i} " in joined for i in range(12))
+
+def test_continuation_chunks_repeat_their_heading(chunker):
+    chunks = list(chunker.iter_chunks(page()))
+    fees = [text for text, heading in chunks if heading == "## Fees"]
+    assert len(fees) > 1
+    assert all(text.startswith("## Fees\n\n- Item") for text in fees)
+    # A heading with nothing after it is dropped
+    assert all(heading != "## Trailing" for _, heading in chunks)
+
+def test_small_sections_are_merged(chunker):
+    text = "# A\n\nShort.\n\n# B\n\nAlso short."
+    assert list(chunker.iter_chunks(text)) == [("# A\n\nShort.\n\n# B\n\nAlso short.", "# B")]
+
+def test_split_documents_keeps_metadata_and_adds_the_section(chunker):
+    documents = chunker.split_documents([Document(page_content=page(), metadata={"url": "https://a.example"})])
+    assert {doc.metadata["url"] for doc in documents} == {"https://a.example"}
+    assert documents[0].metadata["section"] == "Personal loans"
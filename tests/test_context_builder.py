@@ -0,0 +1,49 @@
+import pytest
+import agent.context_builder as context_builder
+from agent.context_builder import ContextBuilder, MIN_CHUNK_TOKENS
+
+@pytest.fixture
+def builder(monkeypatch):
+    # Count tokens with the 4-characters-per-token estimate, so no encoding is downloaded
+    monkeypatch.setitem(context_builder._encodings, "estimate", None)
+    return ContextBuilder(max_tokens=400, urls_share=0.1, memory_share=0.2, encoding_name="estimate")
+
+def chunk(label, tokens):
+    return label + "a" * (tokens * 4 - len(label))
+
+def test_chunks_fill_the_budget_by_relevance(builder):
+    chunks = [(chunk("low", 100), 1), (chunk("high", 150), 3), (chunk("mid", 150), 2)]
+    context = builder.build(chunks)
+
+    assert context["tokens"]["total"] <= builder.max_tokens
+    assert builder.count_tokens(context["rag_content"]) <= context["tokens"]["rag"]
+    # The most relevant chunks come first; the first one that does not fit is truncated
+    parts = context["rag_content"].split("\n\n")
+    assert [part[:3] for part in parts] == ["hig", "mid", "low"]
+    assert len(parts[2]) < len(chunks[0][0])
+    assert (context["chunks_used"], context["chunks_truncated"], context["chunks_dropped"]) == (3, 1, 0)
+
+def test_chunks_too_short_after_truncation_are_dropped(builder):
+    # Leaves MIN_CHUNK_TOKENS - 1 tokens for the second chunk
+    chunks = [(chunk("first", builder.max_tokens - MIN_CHUNK_TOKENS + 1), 2), (chunk("second", 100), 1)]
+    context = builder.build(chunks)
+    assert context["rag_content"] == chunks[0][0]
+    assert (context["chunks_used"], context["chunks_truncated"], context["chunks_dropped"]) == (1, 0, 1)
+
+def test_urls_and_memory_keep_their_share_and_leave_the_rest_to_chunks(builder):
+    urls = [f"https://blog{i}.example/post" for i in range(20)]
+    messages = [{"role": "user", "content": f"message {i} " + "b" * 200} for i in range(5)]
+    context = builder.build([(chunk("only", 1000), 1)], urls, messages)
+    tokens = context["tokens"]
+
+    assert tokens["urls"] <= builder.max_tokens * builder.urls_share
+    assert 0 < len(context["blogs_urls"]) < len(urls)
+    assert context["urls_dropped"] == len(urls) - len(context["blogs_urls"])
+    assert tokens["memory"] <= builder.max_tokens * builder.memory_share
+    # The newest messages are kept
+    assert "message 4" in context["memory_context"] and "message 0" not in context["memory_context"]
+    assert tokens["rag"] == builder.max_tokens - tokens["urls"] - tokens["memory"]
+    assert tokens["total"] == builder.max_tokens
+
+    unused = builder.build([(chunk("only", 1000), 1)])
+    assert unused["tokens"]["rag"] == builder.max_tokens
@@ -0,0 +1,31 @@
+import os
+from langchain_community.embeddings import DeterministicFakeEmbedding
+import rag.embedding_cache as embedding_cache
+from rag.embedding_cache import CachedEmbeddings
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    texts: list = []
+
+    def embed_documents(self, texts):
+        self.texts.extend(texts)
+        return super().embed_documents(texts)
+
+def test_only_missing_texts_are_embedded(tmp_path):
+    provider = CountingEmbeddings(size=8, texts=[])
+    cache = CachedEmbeddings(provider, "fake", 8, cache_path=str(tmp_path / "embeddings.sqlite"))
+    first = cache.embed_documents(["a", "b", "a"])
+    assert provider.texts == ["a", "b"]
+
+    # A new instance reads the vectors persisted by the first one
+    cache = CachedEmbeddings(provider, "fake", 8, cache_path=str(tmp_path / "embeddings.sqlite"))
+    vectors = cache.embed_documents(["b", "c", "a"])
+    assert (vectors[0], vectors[2]) == (first[1], first[0])
+    assert provider.texts == ["a", "b", "c"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_relative_cache_path_is_resolved_against_the_project_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "PROJECT_ROOT", str(tmp_path))
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    cache = CachedEmbeddings(DeterministicFakeEmbedding(size=8), "fake", 8)
+    assert cache.cache_path == str(tmp_path / ".cache" / "embeddings.sqlite")
+    assert os.path.exists(cache.cache_path)
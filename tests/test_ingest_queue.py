@@ -0,0 +1,110 @@
+import os
+import json
+import asyncio
+from langchain.docstore.document import Document
+import agent.ingest_queue as ingest_queue
+from agent.ingest_queue import IngestQueue
+
+class FakeCrawler:
+    """Crawler returning one Document per URL without network access."""
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def crawl_documents(self, urls, **metadata):
+        return [Document(page_content=f"page {url}", metadata={"url": url, **metadata}) for url in urls]
+
+class RecordingRAG:
+    def __init__(self):
+        self.documents = []
+
+    def add_documents(self, documents):
+        self.documents.extend(documents)
+
+def read_log(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def write_log(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+def record(job_id, status, urls):
+    return {"id": job_id, "status": status, "urls": urls, "metadata": {"topic": "loans"}, "created_at": 1.0}
+
+def test_unfinished_jobs_are_replayed_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_queue, "AsyncCrawler", FakeCrawler)
+    log_path = str(tmp_path / "jobs.jsonl")
+    write_log(log_path, [
+        record("pending", "queued", ["https://a.example/1"]),
+        record("finished", "queued", ["https://b.example/1"]),
+        record("finished", "done", ["https://b.example/1"]),
+        record("pending", "crawling", ["https://a.example/1"]),
+    ])
+
+    async def run():
+        rag_system = RecordingRAG()
+        queue = IngestQueue(rag_system, log_path=log_path, batch_window=0.01)
+        other = IngestQueue(RecordingRAG(), log_path=log_path, batch_window=0.01)
+        await queue.start()
+        await other.start()
+        assert queue.owner and not other.owner
+        assert list(queue.jobs) == ["pending"] and not other.jobs
+
+        assert await queue.wait(queue.get("pending"), timeout=5)
+        await other.stop()
+        await queue.stop()
+        return rag_system
+
+    rag_system = asyncio.run(run())
+    assert [document.metadata["url"] for document in rag_system.documents] == ["https://a.example/1"]
+    assert rag_system.documents[0].metadata["topic"] == "loans"
+    # The log was rewritten with the resumed job, then its status changes were appended
+    assert [(line["id"], line["status"]) for line in read_log(log_path)] == [
+        ("pending", "queued"), ("pending", "crawling"), ("pending", "embedding"), ("pending", "done")]
+
+    # Nothing is left to resume
+    async def restart():
+        queue = IngestQueue(RecordingRAG(), log_path=log_path)
+        await queue.start()
+        jobs = dict(queue.jobs)
+        await queue.stop()
+        return jobs
+
+    assert asyncio.run(restart()) == {}
+
+def test_submitted_jobs_are_logged_and_survive_a_stop(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest_queue, "AsyncCrawler", FakeCrawler)
+    log_path = str(tmp_path / "jobs.jsonl")
+
+    async def submit_and_stop():
+        queue = IngestQueue(RecordingRAG(), log_path=log_path, crawl_workers=1)
+        # Concurrent submits share one start
+        jobs = await asyncio.gather(queue.submit(["https://a.example/1"]), queue.submit(["https://a.example/2"]))
+        assert len(queue._tasks) == queue.crawl_workers + 1
+        await queue.stop()
+        assert not queue.running
+        return jobs
+
+    jobs = asyncio.run(submit_and_stop())
+    assert {line["id"] for line in read_log(log_path)} == {job.id for job in jobs}
+
+    async def resume():
+        rag_system = RecordingRAG()
+        queue = IngestQueue(rag_system, log_path=log_path, batch_window=0.01)
+        await queue.start()
+        done = await asyncio.gather(*(queue.wait(queue.get(job.id), timeout=5) for job in jobs))
+        await queue.stop()
+        return done, rag_system
+
+    done, rag_system = asyncio.run(resume())
+    assert done == [True, True]
+    assert len(rag_system.documents) == 2
+
+def test_relative_log_path_is_resolved_against_the_project_root():
+    queue = IngestQueue(RecordingRAG(), log_path=".cache/jobs.jsonl")
+    assert queue.log_path == os.path.join(ingest_queue.PROJECT_ROOT, ".cache", "jobs.jsonl")
+    assert IngestQueue(RecordingRAG(), log_path=None).log_path is None
@@ -0,0 +1,45 @@
+import faiss
+import numpy as np
+from rag.layered_index import LayeredIndex
+from store_helpers import pages, assert_consistent
+
+def test_search_merges_base_and_side_index():
+    vectors = np.eye(4, dtype=np.float32)
+    base = faiss.IndexFlatL2(4)
+    base.add(vectors[:2])
+    index = LayeredIndex(base)
+    index.add(vectors[2:])
+
+    assert index.ntotal == 4 and base.ntotal == 2
+    distances, positions = index.search(vectors, 2)
+    assert positions[:, 0].tolist() == [0, 1, 2, 3]
+    assert np.allclose(index.reconstruct(3), vectors[3])
+    assert np.allclose(index.merged().reconstruct_n(0, 4), vectors)
+
+    # A position selector applies to both layers
+    params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(np.array([1, 3], dtype=np.int64)))
+    _, positions = index.search(vectors[:1], 4, params=params)
+    assert sorted(positions[0][positions[0] >= 0].tolist()) == [1, 3]
+
+def test_new_chunks_go_to_the_side_index_of_a_snapshot(make_rag):
+    writer = make_rag()
+    writer.add_documents(pages("first", 10, topic="loans"))
+    writer.add_documents(pages("second", 10, topic="mortgages"))
+    assert writer.store.compact(writer.embeddings)
+
+    # The snapshot is memory-mapped; new chunks go to the side index
+    compacted = make_rag()
+    assert isinstance(compacted.db.index, LayeredIndex)
+    assert_consistent(compacted, 20)
+    compacted.add_documents(pages("third", 5, topic="cards"))
+    assert compacted.db.index.base.ntotal == 20
+    assert_consistent(compacted, 25)
+
+    hits = compacted.similarity_search("third paragraph 2 about personal loans", k=3, filter={"topic": "cards"})
+    assert hits[0].page_content == "third paragraph 2 about personal loans"
+    assert {hit.metadata["topic"] for hit in hits} == {"cards"}
+    hits = compacted.similarity_search("first paragraph 1 about personal loans", k=3, filter={"topic": "loans"})
+    assert hits[0].page_content == "first paragraph 1 about personal loans"
+
+    compacted._save_db()
+    assert_consistent(make_rag(), 25)
@@ -0,0 +1,67 @@
+from agent.llm_cache import LLMResponseCache
+
+class TableEmbeddings:
+    """Embeddings looked up from a table, so similarities are known in advance."""
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        return self.vectors[text]
+
+def render(topic):
+    return f"Rewrite the topic below as a search query.\nTopic: {topic}\nQuery:"
+
+def test_exact_hit_and_miss():
+    cache = LLMResponseCache()
+    cache.put("gpt", 0.7, "prompt", "answer")
+    assert cache.get("gpt", 0.7, "prompt") == "answer"
+    assert cache.get("gpt", 0.7, "other prompt") is None
+    assert cache.get("gpt", 0.2, "prompt") is None
+    assert cache.get("other", 0.7, "prompt") is None
+
+    cache.discard("gpt", 0.7, "prompt")
+    assert cache.get("gpt", 0.7, "prompt") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 4, 0)
+
+def test_expired_and_least_recently_used_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("agent.llm_cache.time.time", lambda: now[0])
+    cache = LLMResponseCache(max_entries=2, ttl=10)
+    cache.put("gpt", 0.7, "a", "A")
+    cache.put("gpt", 0.7, "b", "B")
+    assert cache.get("gpt", 0.7, "a") == "A"
+    cache.put("gpt", 0.7, "c", "C")
+    assert cache.get("gpt", 0.7, "b") is None
+    assert cache.get("gpt", 0.7, "a") == "A"
+
+    now[0] += 11
+    assert cache.get("gpt", 0.7, "c") is None
+
+def test_similar_input_of_the_same_template_hits():
+    embeddings = TableEmbeddings({"home loan": [1.0, 0.0], "home loans": [0.99, 0.01]})
+    cache = LLMResponseCache(embeddings=embeddings)
+    cache.put("gpt", 0.7, render("home loan"), "home loan rates", template="refine_query", variable="home loan")
+
+    assert cache.get("gpt", 0.7, render("home loans"), template="refine_query", variable="home loans") == "home loan rates"
+    assert cache.stats()["semantic_hits"] == 1
+    # Only the variable input is embedded, never the rendered template
+    assert embeddings.calls == ["home loan", "home loans"]
+
+def test_different_topics_do_not_share_answers():
+    embeddings = TableEmbeddings({"home loan": [1.0, 0.0], "personal loan": [0.6, 0.8]})
+    cache = LLMResponseCache(embeddings=embeddings)
+    cache.put("gpt", 0.7, render("home loan"), "home loan rates", template="refine_query", variable="home loan")
+
+    assert cache.get("gpt", 0.7, render("personal loan"), template="refine_query", variable="personal loan") is None
+
+def test_semantic_hits_are_scoped_per_template():
+    embeddings = TableEmbeddings({"home loan": [1.0, 0.0]})
+    cache = LLMResponseCache(embeddings=embeddings)
+    cache.put("gpt", 0.7, render("home loan"), "home loan rates", template="refine_query", variable="home loan")
+
+    assert cache.get("gpt", 0.7, "Extract the topic: home loan", template="topic", variable="home loan") is None
+    # Without a variable input only the exact prompt may answer
+    assert cache.get("gpt", 0.7, render("home loan") + " ") is None
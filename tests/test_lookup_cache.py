@@ -0,0 +1,97 @@
+import os
+import time
+import threading
+import blog.lookup_cache as lookup_cache
+from blog.lookup_cache import LookupCache, SingleFlight, normalize_query
+
+def test_values_persist_across_instances_per_namespace(tmp_path):
+    path = str(tmp_path / "lookups.sqlite")
+    LookupCache("search", cache_path=path).set("loans", ["a", "b"])
+
+    assert LookupCache("search", cache_path=path).get("loans") == ["a", "b"]
+    assert LookupCache("trends", cache_path=path).get("loans") is None
+
+def test_expired_values_are_misses(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lookup_cache.time, "time", lambda: now[0])
+    cache = LookupCache("search", ttl=10, cache_path=str(tmp_path / "lookups.sqlite"))
+    cache.set("loans", {"count": 1})
+    assert cache.get("loans") == {"count": 1}
+
+    now[0] += 11
+    assert cache.get("loans") is None
+
+def test_memory_tier_is_bounded():
+    cache = LookupCache("search", cache_path=None, max_memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.upper())
+    assert [cache.get(key) for key in ("a", "b", "c")] == [None, "B", "C"]
+
+def test_relative_cache_path_is_resolved_against_the_project_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(lookup_cache, "PROJECT_ROOT", str(tmp_path))
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    cache = LookupCache("search")
+    assert cache.cache_path == str(tmp_path / ".cache" / "lookups.sqlite")
+    assert os.path.exists(cache.cache_path)
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def lookup(query):
+        calls.append(query)
+        started.set()
+        release.wait(5)
+        return f"result for {query}"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("loans", lookup, "loans")))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("loans", lookup, "loans")))
+                 for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    # Give the followers time to join the in-flight call
+    time.sleep(0.1)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == ["loans"]
+    assert results == ["result for loans"] * 4
+    # Once finished, the next call runs again
+    assert flight.do("loans", lambda: "fresh") == "fresh"
+
+def test_single_flight_shares_errors_with_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("quota exceeded")
+
+    def call():
+        try:
+            flight.do("loans", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["quota exceeded"] * 2
+
+def test_normalize_query():
+    assert normalize_query("  Personal   LOAN rates ") == "personal loan rates"
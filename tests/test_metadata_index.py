@@ -0,0 +1,44 @@
+import time
+from rag.metadata_index import MetadataIndex, merge_metadata
+from store_helpers import pages
+
+def test_merge_metadata_accumulates_topics_and_keeps_the_latest_crawl():
+    existing = {"topic": "loans", "keyword": "rates", "crawled_at": 100.0, "url": "https://a.example"}
+    merged = merge_metadata(existing, {"topic": "Mortgages", "keyword": "RATES", "crawled_at": 50.0,
+                                       "url": "https://b.example"})
+    assert merged == {"topic": ["loans", "Mortgages"], "keyword": "rates", "crawled_at": 100.0,
+                      "url": "https://a.example"}
+    assert merge_metadata(merged, {"topic": "LOANS", "crawled_at": 200.0})["crawled_at"] == 200.0
+    assert merge_metadata(merged, {"topic": "loans"}) is None
+
+def test_select_resolves_filters_to_positions():
+    index = MetadataIndex()
+    now = time.time()
+    index.add(0, {"topic": "loans", "domain": "a.example", "crawled_at": now})
+    index.add(1, {"topic": ["loans", "mortgages"], "domain": "b.example", "crawled_at": now - 10 * 86400})
+    index.add(2, {"topic": "cards", "domain": "a.example"})
+
+    def select(**filter):
+        positions, exclude = index.select(**filter)
+        return positions.tolist(), exclude
+
+    assert select(topic="Loans") == ([0, 1], False)
+    assert select(topic="loans", max_age=86400) == ([0], False)
+    assert select(topic=["mortgages", "cards"], exclude_domains=["a.example"]) == ([1], False)
+    assert select(exclude_domains=["a.example"]) == ([0, 2], True)
+    assert index.select() is None
+
+    # Merged metadata is indexed incrementally
+    index.add(2, {"topic": ["cards", "loans"]})
+    assert select(topic="loans") == ([0, 1, 2], False)
+
+def test_reused_chunks_merge_metadata(make_rag):
+    old = time.time() - 10 * 86400
+    rag_system = make_rag()
+    rag_system.add_documents(pages("crawl", 3, topic="loans", crawled_at=old))
+    rag_system.add_documents(pages("crawl", 3, topic="mortgages", crawled_at=time.time()))
+    assert rag_system.last_ingest_stats == {"total": 3, "new": 0, "reused": 3}
+
+    for rag in (rag_system, make_rag()):
+        for filter in ({"topic": "loans"}, {"topic": "mortgages"}, {"max_age": 86400}):
+            assert len(rag.similarity_search("crawl paragraph 0", k=5, filter=filter)) == 3
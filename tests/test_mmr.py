@@ -0,0 +1,44 @@
+import numpy as np
+from langchain_core.documents import Document
+from rag.mmr import mmr_select, document_domain
+
+QUERY = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+# Two near-duplicates close to the query and a less similar but different candidate
+CANDIDATES = np.array([
+    [1.0, 0.1, 0.0],
+    [1.0, 0.12, 0.0],
+    [0.7, 0.0, 0.7],
+], dtype=np.float32)
+
+def test_relevance_only_keeps_the_nearest_order():
+    assert mmr_select(QUERY, CANDIDATES, k=3, lambda_mult=1.0) == [0, 1, 2]
+
+def test_diversity_skips_near_duplicates():
+    assert mmr_select(QUERY, CANDIDATES, k=2, lambda_mult=0.5) == [0, 2]
+
+def test_group_cap_limits_candidates_per_domain():
+    groups = ["a.example", "a.example", "a.example"]
+    assert mmr_select(QUERY, CANDIDATES, k=3, lambda_mult=1.0, groups=groups, max_per_group=2) == [0, 1]
+    # Candidates without a group are never capped
+    groups = ["a.example", "a.example", None]
+    assert mmr_select(QUERY, CANDIDATES, k=3, lambda_mult=1.0, groups=groups, max_per_group=1) == [0, 2]
+
+def test_empty_candidates_and_k():
+    assert mmr_select(QUERY, np.zeros((0, 3)), k=3) == []
+    assert mmr_select(QUERY, CANDIDATES, k=0) == []
+
+def test_document_domain():
+    assert document_domain(Document(page_content="", metadata={"domain": "a.example", "url": "https://b.example"})) == "a.example"
+    assert document_domain(Document(page_content="", metadata={"url": "https://b.example/post"})) == "b.example"
+    assert document_domain(Document(page_content="", metadata={"source": "notes.txt"})) == "notes.txt"
+    assert document_domain(Document(page_content="")) is None
+
+def test_mmr_search_caps_chunks_per_domain(make_rag):
+    rag_system = make_rag()
+    documents = [Document(page_content=f"page {i} about personal loans",
+                          metadata={"url": f"https://{'a' if i < 6 else 'b'}.example/{i}"}) for i in range(8)]
+    rag_system.add_documents(documents)
+
+    results = rag_system.mmr_search("page 1 about personal loans", k=4, fetch_k=8, max_per_domain=2)
+    domains = [document_domain(doc) for doc, _ in results]
+    assert sorted(domains) == ["a.example", "a.example", "b.example", "b.example"]
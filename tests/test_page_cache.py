@@ -0,0 +1,79 @@
+import os
+import asyncio
+import blog.page_cache as page_cache
+from blog.page_cache import PageCache
+from blog.crawler import Crawler
+from blog.async_crawler import AsyncCrawler
+
+def test_put_and_get(tmp_path):
+    cache = PageCache(cache_dir=str(tmp_path))
+    assert cache.get("https://a.example/post") is None
+    cache.put("https://a.example/post", "<html>post</html>", "post", etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+    entry = cache.get("https://a.example/post")
+    assert (entry["content"], entry["etag"]) == ("post", '"v1"')
+    assert cache.get_raw("https://a.example/post") == "<html>post</html>"
+    assert cache.is_fresh(entry)
+    assert cache.validators(entry) == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    assert cache.validators(None) == {}
+
+def test_stale_entries_are_refreshed_by_touch(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(page_cache.time, "time", lambda: now[0])
+    cache = PageCache(cache_dir=str(tmp_path), ttl=60)
+    cache.put("https://a.example/post", "<html></html>", "post", etag='"v1"')
+
+    now[0] += 61
+    entry = cache.get("https://a.example/post")
+    assert not cache.is_fresh(entry)
+    cache.touch("https://a.example/post", entry)
+    assert cache.is_fresh(cache.get("https://a.example/post"))
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    cache = PageCache(cache_dir=str(tmp_path), max_bytes=5000, low_watermark=0.5)
+    for i in range(4):
+        cache.put(f"https://a.example/{i}", "x" * 1000, "content")
+        # Distinct last-use times, oldest first
+        meta_path, _ = cache._paths(f"https://a.example/{i}")
+        os.utime(meta_path, (1000 + i, 1000 + i))
+    cache.get("https://a.example/0")
+
+    cache.put("https://a.example/4", "x" * 1000, "content")
+    kept = [i for i in range(5) if cache.get(f"https://a.example/{i}") is not None]
+    assert 0 in kept and 4 in kept and 1 not in kept
+    assert cache._scan()[1] <= 5000 * 0.5
+
+def test_relative_cache_dir_is_resolved_against_the_project_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_cache, "PROJECT_ROOT", str(tmp_path))
+    monkeypatch.chdir(os.path.dirname(os.path.abspath(__file__)))
+    assert PageCache().cache_dir == str(tmp_path / ".cache" / "pages")
+
+class StubParsePool:
+    async def parse(self, url, html):
+        return f"parsed {html}"
+
+def test_crawler_serves_fresh_pages_and_revalidates_stale_ones(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(page_cache.time, "time", lambda: now[0])
+    cache = PageCache(cache_dir=str(tmp_path), ttl=60)
+    requests = []
+    responses = [(200, "v1", {"ETag": '"v1"'}), (304, None, {})]
+
+    async def fetch_html(url, headers=None):
+        requests.append(headers)
+        return responses.pop(0)
+
+    async def crawl_three_times():
+        crawler = AsyncCrawler(crawler=Crawler(cache=cache), parse_pool=StubParsePool())
+        crawler.fetch_html = fetch_html
+        contents = [await crawler.crawl_content("https://a.example/post")]
+        contents.append(await crawler.crawl_content("https://a.example/post"))
+        now[0] += 61
+        contents.append(await crawler.crawl_content("https://a.example/post"))
+        await crawler.close()
+        return contents
+
+    assert asyncio.run(crawl_three_times()) == ["parsed v1"] * 3
+    # The fresh copy was served without a request; the stale one was revalidated with its ETag
+    assert requests == [{}, {"If-None-Match": '"v1"'}]
+    assert cache.is_fresh(cache.get("https://a.example/post"))
@@ -0,0 +1,82 @@
+import time
+import asyncio
+import pytest
+from agent.pipeline import StageGraph
+
+def test_stages_run_after_their_dependencies_and_independent_ones_overlap():
+    order = []
+
+    async def slow(topic):
+        order.append("slow:start")
+        await asyncio.sleep(0.3)
+        order.append("slow:end")
+        return f"{topic} slow"
+
+    async def fast(topic):
+        order.append("fast:start")
+        await asyncio.sleep(0.3)
+        order.append("fast:end")
+        return f"{topic} fast"
+
+    def combine(slow, fast):
+        # Plain functions run in the thread pool
+        order.append("combine")
+        return f"{slow} + {fast}"
+
+    graph = StageGraph()
+    graph.add("slow", slow, ["topic"]).add("fast", fast, ["topic"]).add("combined", combine, ["slow", "fast"])
+    start = time.perf_counter()
+    results = asyncio.run(graph.run(topic="loans"))
+
+    assert results["combined"] == "loans slow + loans fast"
+    assert results["topic"] == "loans"
+    assert time.perf_counter() - start < 0.5
+    assert order[:2] == ["slow:start", "fast:start"] and order[-1] == "combine"
+    assert set(graph.timings) == {"slow", "fast", "combined", "total"}
+
+def test_only_the_stages_needed_for_the_targets_run():
+    calls = []
+    graph = StageGraph()
+    graph.add("a", lambda topic: calls.append("a") or 1, ["topic"])
+    graph.add("b", lambda a: calls.append("b") or a + 1, ["a"])
+    graph.add("c", lambda topic: calls.append("c") or 3, ["topic"])
+
+    results = asyncio.run(graph.run(targets=["b"], topic="loans"))
+    assert results["b"] == 2 and "c" not in results
+    assert sorted(calls) == ["a", "b"]
+    # Inputs stand in for stages
+    assert asyncio.run(graph.run(targets=["b"], a=10))["b"] == 11
+
+def test_a_failing_stage_cancels_the_others():
+    cancelled = asyncio.Event()
+    after_failure = []
+
+    async def failing(topic):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("search failed")
+
+    async def long_running(topic):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    graph = StageGraph()
+    graph.add("failing", failing, ["topic"])
+    graph.add("long_running", long_running, ["topic"])
+    graph.add("dependent", lambda failing: after_failure.append(failing), ["failing"])
+
+    with pytest.raises(RuntimeError, match="search failed"):
+        asyncio.run(graph.run(topic="loans"))
+    assert cancelled.is_set()
+    assert after_failure == []
+
+def test_invalid_graphs_are_rejected():
+    graph = StageGraph()
+    graph.add("a", lambda topic: 1, ["topic"])
+    with pytest.raises(ValueError):
+        graph.add("a", lambda topic: 2, ["topic"])
+    graph.add("b", lambda missing: 2, ["missing"])
+    with pytest.raises(ValueError, match="missing"):
+        asyncio.run(graph.run(topic="loans"))
@@ -0,0 +1,61 @@
+import threading
+from store_helpers import pages, assert_consistent
+
+def test_concurrent_add_documents(make_rag):
+    writers = [make_rag(), make_rag()]
+    documents = pages("shared", 20)
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def ingest(rag_system):
+        try:
+            barrier.wait()
+            rag_system.add_documents(documents)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest, args=(writer,)) for writer in writers * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    for writer in writers:
+        writer.refresh()
+        assert_consistent(writer, 20)
+
+    reader = make_rag()
+    assert_consistent(reader, 20)
+    assert reader.similarity_search("shared paragraph 3 about personal loans", k=1)[0].page_content == \
+        "shared paragraph 3 about personal loans"
+
+def test_duplicate_segments_still_load(make_rag):
+    rag_system = make_rag()
+    rag_system.add_documents(pages("dup", 5))
+    segment = rag_system.store.read_segment(rag_system.store.list_segments()[0])
+    # A second writer persisting the same chunks
+    rag_system.store.append_segment(segment["ids"], segment["texts"], segment["metadatas"], segment["vectors"])
+
+    reloaded = make_rag()
+    assert_consistent(reloaded, 5)
+    assert reloaded.store.compact(reloaded.embeddings)
+    assert_consistent(make_rag(), 5)
+
+def test_segment_replay_and_compaction_round_trip(make_rag):
+    writer = make_rag()
+    writer.add_documents(pages("first", 10, topic="loans"))
+    writer.add_documents(pages("second", 10, topic="mortgages"))
+    assert len(writer.store.list_segments()) == 2
+
+    replayed = make_rag()
+    assert_consistent(replayed, 20)
+
+    assert replayed.store.compact(replayed.embeddings)
+    assert replayed.store.list_segments() == []
+    assert_consistent(make_rag(), 20)
+
+    writer.refresh()
+    assert_consistent(writer, 20)
+    writer._save_db()
+    assert_consistent(make_rag(), 20)